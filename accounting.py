@@ -1,3 +1,4 @@
+import sqlite3
 from typing import List, Dict, Optional
 from db import get_conn
 from datetime import datetime
@@ -500,3 +501,34 @@ def get_cash_flow_statement(date_from: Optional[str] = None, date_to: Optional[s
         'net_change': net_change,
         'closing_balance': closing_balance,
     }
+
+
+# ═══════════════════════════════════════════════════════════════
+#  VERSIÓN DEL LIBRO (Ledger version stamp)
+# ═══════════════════════════════════════════════════════════════
+
+def get_ledger_version(up_to_date: Optional[str] = None) -> Optional[int]:
+    """
+    Return a stamp that changes whenever a ledger entry dated on or before
+    ``up_to_date`` (YYYY-MM-DD) is inserted, updated or deleted.
+
+    Per-month counters are maintained by triggers in ``ledger_period_versions``
+    (legacy migration 015). Entries without a date and master-data edits are
+    counted under '0000-00', which sorts before every month. Returns None when
+    the table does not exist yet so callers can skip caching.
+    """
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        if up_to_date:
+            cur.execute(
+                "SELECT COALESCE(SUM(version), 0) FROM ledger_period_versions WHERE period <= ?",
+                (up_to_date[:7],),
+            )
+        else:
+            cur.execute("SELECT COALESCE(SUM(version), 0) FROM ledger_period_versions")
+        return int(cur.fetchone()[0] or 0)
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
@@ -9,6 +9,7 @@ import logging
 from extensions import db
 from data_models.models import Apartment, Resident
 from sqlalchemy.exc import IntegrityError
+from utils.cache_versions import UNITS, invalidate
 
 logger = logging.getLogger(__name__)
 
@@ -85,6 +86,7 @@ def add_apartment(number: str, floor: Optional[str] = None, notes: Optional[str]
         conn.close()
     except Exception as e:
         logger.warning(f"Failed to dual-write apartment to legacy DB: {e}")
+    invalidate(UNITS)
 
     return apt.id
 
@@ -135,6 +137,7 @@ def save_extra_residents(apartment_id: int, residents_list: list) -> None:
         conn.close()
     except Exception as e:
         logger.warning(f"Failed to dual-write extra residents to legacy DB: {e}")
+    invalidate(UNITS)
 
 
 def get_apartment(apartment_id: int) -> Optional[Dict]:
@@ -191,6 +194,7 @@ def update_apartment(apartment_id: int, **fields) -> None:
         conn.close()
     except Exception as e:
         logger.warning(f"Failed to dual-write apartment update to legacy DB: {e}")
+    invalidate(UNITS)
 
 
 def delete_apartment(apartment_id: int) -> None:
@@ -217,4 +221,5 @@ def delete_apartment(apartment_id: int) -> None:
         conn.close()
     except Exception as e:
         logger.warning(f"Failed to dual-write apartment deletion to legacy DB: {e}")
+    invalidate(UNITS)
 
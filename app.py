@@ -2,6 +2,7 @@
 Aplicación principal Flask para gestión de edificios.
 """
 import os
+import hmac
 import secrets
 import logging
 from logging.handlers import RotatingFileHandler
@@ -9,7 +10,6 @@ from pathlib import Path
 from datetime import timedelta
 from typing import Any, Optional
 from dotenv import load_dotenv
-import requests
 
 # Cargar variables de entorno desde .env
 load_dotenv()
@@ -17,11 +17,20 @@ load_dotenv()
 from flask import Flask, redirect, url_for, render_template, jsonify, request, session, flash
 from flask_login import current_user, login_required
 
+import audit_trail
 import db
 import company
+import metrics
 import customization
 import residents
+import scheduler_lease
 from extensions import init_extensions, scheduler
+from utils.compression import init_compression
+from utils.query_profiler import init_query_profiler
+from utils.request_profiler import DEFAULT_PROFILE_DIR, init_request_profiler
+from utils.static_assets import init_static_assets
+from utils.lazy_imports import lazy_import
+from utils.template_cache import DEFAULT_BYTECODE_CACHE_DIR, init_template_cache
 from auth import auth_bp
 from blueprints.settings import settings_bp
 from blueprints.company import company_bp
@@ -34,6 +43,9 @@ from blueprints.reports import reports_bp
 from blueprints.resident_api import resident_api_bp
 from blueprints.suppliers import suppliers_bp
 
+# Solo lo usa el asistente IA externo; se importa en la primera llamada.
+requests = lazy_import('requests')
+
 
 def create_app(config_object: Optional[str] = None) -> Flask:
     """Factory para crear la aplicación Flask."""
@@ -62,6 +74,16 @@ def create_app(config_object: Optional[str] = None) -> Flask:
     app.config.setdefault('PERMANENT_SESSION_LIFETIME', timedelta(hours=8))
     app.config.setdefault('MAX_CONTENT_LENGTH', 16 * 1024 * 1024)  # 16MB max upload
     app.config.setdefault('SCHEDULER_TIMEZONE', 'America/Santo_Domingo')
+    # Lease del scheduler entre procesos: lease | off | always (ver scheduler_lease.py)
+    app.config.setdefault('SCHEDULER_MODE', os.environ.get('SCHEDULER_MODE', 'lease').strip().lower() or 'lease')
+    app.config.setdefault(
+        'SCHEDULER_LEASE_TTL_SECONDS',
+        float(os.environ.get('SCHEDULER_LEASE_TTL_SECONDS', '60')),
+    )
+    app.config.setdefault(
+        'SCHEDULER_LEASE_HEARTBEAT_SECONDS',
+        float(os.environ.get('SCHEDULER_LEASE_HEARTBEAT_SECONDS', '15')),
+    )
     app.config.setdefault(
         'RESIDENT_API_JWT_SECRET',
         os.environ.get('RESIDENT_API_JWT_SECRET', '').strip() or app.config['SECRET_KEY'],
@@ -78,12 +100,20 @@ def create_app(config_object: Optional[str] = None) -> Flask:
         'RESIDENT_API_REFRESH_TOKEN_DAYS',
         int(os.environ.get('RESIDENT_API_REFRESH_TOKEN_DAYS', '30')),
     )
+    app.config.setdefault(
+        'RESIDENT_API_TOKEN_VERSION_REFRESH_SECONDS',
+        int(os.environ.get('RESIDENT_API_TOKEN_VERSION_REFRESH_SECONDS', '30')),
+    )
     app.config.setdefault(
         'MONTHLY_FINANCIAL_REPORT_ENABLED',
         os.environ.get('MONTHLY_FINANCIAL_REPORT_ENABLED', '1').strip().lower() in {'1', 'true', 'yes', 'on'},
     )
     app.config.setdefault('MONTHLY_FINANCIAL_REPORT_HOUR', 6)
     app.config.setdefault('MONTHLY_FINANCIAL_REPORT_MINUTE', 0)
+    app.config.setdefault(
+        'MONTHLY_FINANCIAL_REPORT_MAX_WORKERS',
+        int(os.environ.get('MONTHLY_FINANCIAL_REPORT_MAX_WORKERS', '4')),
+    )
     app.config.setdefault(
         'MONTHLY_FINANCIAL_REPORT_ADMIN_ONLY',
         os.environ.get('MONTHLY_FINANCIAL_REPORT_ADMIN_ONLY', '').strip().lower() in {'1', 'true', 'yes', 'on'},
@@ -92,7 +122,76 @@ def create_app(config_object: Optional[str] = None) -> Flask:
         'MONTHLY_FINANCIAL_REPORT_ADMIN_EMAIL',
         os.environ.get('MONTHLY_FINANCIAL_REPORT_ADMIN_EMAIL', '').strip(),
     )
+    app.config.setdefault(
+        'LEDGER_INTEGRITY_INTERVAL_MINUTES',
+        int(os.environ.get('LEDGER_INTEGRITY_INTERVAL_MINUTES', '15')),
+    )
     restore_enabled_default = os.environ.get('FLASK_ENV') != 'production'
+    app.config.setdefault(
+        'SQL_PROFILING_ENABLED',
+        os.environ.get(
+            'SQL_PROFILING_ENABLED',
+            '1' if restore_enabled_default else '0',
+        ).strip().lower() in {'1', 'true', 'yes', 'on'},
+    )
+    app.config.setdefault(
+        'METRICS_ENABLED',
+        os.environ.get('METRICS_ENABLED', '1').strip().lower() in {'1', 'true', 'yes', 'on'},
+    )
+    app.config.setdefault('METRICS_DIR', os.environ.get('METRICS_DIR', '').strip() or str(metrics.DEFAULT_METRICS_DIR))
+    app.config.setdefault('METRICS_FLUSH_SECONDS', float(os.environ.get('METRICS_FLUSH_SECONDS', '10')))
+    app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN', '').strip())
+    # Detrás de un proxy en el mismo host todo request llega desde loopback: solo
+    # se confía en 127.0.0.1/::1 si se activa explícitamente.
+    app.config.setdefault(
+        'METRICS_ALLOW_LOOPBACK',
+        os.environ.get('METRICS_ALLOW_LOOPBACK', '0').strip().lower() in {'1', 'true', 'yes', 'on'},
+    )
+    app.config.setdefault(
+        'REQUEST_PROFILING_ENABLED',
+        os.environ.get('REQUEST_PROFILING_ENABLED', '0').strip().lower() in {'1', 'true', 'yes', 'on'},
+    )
+    app.config.setdefault(
+        'REQUEST_PROFILING_SAMPLE_RATE',
+        float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', '0')),
+    )
+    app.config.setdefault('REQUEST_PROFILING_MIN_MS', float(os.environ.get('REQUEST_PROFILING_MIN_MS', '500')))
+    app.config.setdefault('REQUEST_PROFILING_TOP_N', int(os.environ.get('REQUEST_PROFILING_TOP_N', '30')))
+    app.config.setdefault('REQUEST_PROFILING_KEEP', int(os.environ.get('REQUEST_PROFILING_KEEP', '50')))
+    app.config.setdefault(
+        'REQUEST_PROFILING_DIR',
+        os.environ.get('REQUEST_PROFILING_DIR', '').strip() or str(DEFAULT_PROFILE_DIR),
+    )
+    app.config.setdefault('SQL_SLOW_QUERY_MS', float(os.environ.get('SQL_SLOW_QUERY_MS', '100')))
+    app.config.setdefault('SQL_QUERY_COUNT_WARN', int(os.environ.get('SQL_QUERY_COUNT_WARN', '50')))
+    app.config.setdefault('USER_CACHE_TTL_SECONDS', float(os.environ.get('USER_CACHE_TTL_SECONDS', '30')))
+    app.config.setdefault(
+        'CONDITIONAL_GET_ENABLED',
+        os.environ.get('CONDITIONAL_GET_ENABLED', '1').strip().lower() in {'1', 'true', 'yes', 'on'},
+    )
+    app.config.setdefault('HTTP_CACHE_BUILD_ID', os.environ.get('APP_BUILD_ID'))
+    app.config.setdefault(
+        'COMPRESS_ENABLED',
+        os.environ.get('COMPRESS_ENABLED', '1').strip().lower() in {'1', 'true', 'yes', 'on'},
+    )
+    app.config.setdefault('COMPRESS_MIN_SIZE', int(os.environ.get('COMPRESS_MIN_SIZE', '500')))
+    app.config.setdefault('COMPRESS_LEVEL', int(os.environ.get('COMPRESS_LEVEL', '6')))
+    app.config.setdefault(
+        'COMPRESS_BROTLI',
+        os.environ.get('COMPRESS_BROTLI', '1').strip().lower() in {'1', 'true', 'yes', 'on'},
+    )
+    app.config.setdefault(
+        'JINJA_BYTECODE_CACHE_ENABLED',
+        os.environ.get('JINJA_BYTECODE_CACHE_ENABLED', '1').strip().lower() in {'1', 'true', 'yes', 'on'},
+    )
+    app.config.setdefault(
+        'JINJA_BYTECODE_CACHE_DIR',
+        os.environ.get('JINJA_BYTECODE_CACHE_DIR', '').strip() or str(DEFAULT_BYTECODE_CACHE_DIR),
+    )
+    app.config.setdefault(
+        'STATIC_FINGERPRINTS_ENABLED',
+        os.environ.get('STATIC_FINGERPRINTS_ENABLED', '1').strip().lower() in {'1', 'true', 'yes', 'on'},
+    )
     app.config.setdefault(
         'WEB_DB_BACKUP_ENABLED',
         os.environ.get('WEB_DB_BACKUP_ENABLED', '1').strip().lower() in {'1', 'true', 'yes', 'on'},
@@ -108,6 +207,17 @@ def create_app(config_object: Optional[str] = None) -> Flask:
         'WEB_DB_RESTORE_CONFIRM_TEXT',
         os.environ.get('WEB_DB_RESTORE_CONFIRM_TEXT', 'RESTAURAR').strip() or 'RESTAURAR',
     )
+    app.config.setdefault(
+        'RESIDENT_SYNC_RETENTION_DAYS',
+        int(os.environ.get('RESIDENT_SYNC_RETENTION_DAYS', '90')),
+    )
+    app.config.setdefault(
+        'AUDIT_TRAIL_ENABLED',
+        os.environ.get('AUDIT_TRAIL_ENABLED', '1').strip().lower() in {'1', 'true', 'yes', 'on'},
+    )
+    app.config.setdefault('AUDIT_BATCH_SIZE', int(os.environ.get('AUDIT_BATCH_SIZE', '100')))
+    app.config.setdefault('AUDIT_FLUSH_SECONDS', float(os.environ.get('AUDIT_FLUSH_SECONDS', '2')))
+    app.config.setdefault('AUDIT_RETENTION_MONTHS', int(os.environ.get('AUDIT_RETENTION_MONTHS', '12')))
     app.config.setdefault(
         'RESIDENT_AI_CHAT_ENABLED',
         os.environ.get('RESIDENT_AI_CHAT_ENABLED', '0').strip().lower() in {'1', 'true', 'yes', 'on'},
@@ -128,7 +238,12 @@ def create_app(config_object: Optional[str] = None) -> Flask:
         'RESIDENT_AI_TIMEOUT_SECONDS',
         int(os.environ.get('RESIDENT_AI_TIMEOUT_SECONDS', '20')),
     )
-    
+    # Espera máxima del request; después responde con las reglas y la IA sigue en segundo plano.
+    app.config.setdefault(
+        'RESIDENT_AI_WAIT_SECONDS',
+        float(os.environ.get('RESIDENT_AI_WAIT_SECONDS', '8')),
+    )
+
     # Configurar carpeta de uploads
     upload_folder = Path(__file__).parent / 'static' / 'uploads'
     upload_folder.mkdir(parents=True, exist_ok=True)
@@ -144,9 +259,37 @@ def create_app(config_object: Optional[str] = None) -> Flask:
     # Configurar logging
     _configure_logging(app)
     
+    # Registro de auditoría en audit_events (buffer por proceso, inserciones por lotes)
+    audit_trail.configure(
+        enabled=app.config['AUDIT_TRAIL_ENABLED'],
+        batch_size=app.config['AUDIT_BATCH_SIZE'],
+        flush_seconds=app.config['AUDIT_FLUSH_SECONDS'],
+    )
+
+    # Modo del scheduler antes de arrancarlo; un valor inválido detiene el arranque
+    scheduler_lease.configure(app.config['SCHEDULER_MODE'], app.config['SCHEDULER_LEASE_TTL_SECONDS'])
+
     # Inicializar extensiones (CSRF, login, cache, limiter...)
     init_extensions(app)
 
+    # Compresión gzip/brotli de respuestas (se registra primero para correr al final)
+    init_compression(app)
+
+    # Estáticos con huella y precomprimidos de static/dist (scripts/build_static.py)
+    init_static_assets(app)
+
+    # Bytecode de Jinja en disco y claves de fragmentos {% cache %} por versión de datos
+    init_template_cache(app)
+
+    # Contador de queries SQL por request y log de queries lentas
+    init_query_profiler(app)
+
+    # Perfilado opcional de requests (cProfile + pilas colapsadas)
+    init_request_profiler(app)
+
+    # Métricas Prometheus (latencia por endpoint, BD, cache, scheduler, servicios externos)
+    metrics.init_metrics(app)
+
     # Registrar tarea programada: generar facturas recurrentes cada día a las 00:05
     _register_scheduler_jobs(app)
 
@@ -202,12 +345,44 @@ def _configure_logging(app: Flask) -> None:
 def _register_scheduler_jobs(app: Flask) -> None:
     """Registra los trabajos periódicos del scheduler."""
     try:
+        if app.config.get('SCHEDULER_MODE') == 'lease':
+            from datetime import UTC, datetime
+
+            @scheduler.task(
+                'interval',
+                id='scheduler_lease_heartbeat',
+                seconds=app.config.get('SCHEDULER_LEASE_HEARTBEAT_SECONDS', 15),
+                next_run_time=datetime.now(UTC),
+                misfire_grace_time=30,
+            )
+            def _job_scheduler_lease_heartbeat():
+                """Toma o renueva el lease; solo el proceso líder ejecuta los trabajos."""
+                with app.app_context():
+                    was_leader = scheduler_lease.is_leader()
+                    try:
+                        leader = scheduler_lease.heartbeat()
+                    except Exception as exc:
+                        app.logger.error(f"[Scheduler] Fallo al renovar el lease del scheduler: {exc}")
+                        return
+                    if leader != was_leader:
+                        app.logger.info(
+                            "[Scheduler] %s el lease del scheduler (%s)",
+                            'Este proceso tomó' if leader else 'Este proceso perdió',
+                            scheduler_lease.holder_id(),
+                        )
+
+            app.logger.info(
+                "[OK] Tarea programada registrada: lease del scheduler entre procesos"
+            )
+
         @scheduler.task(
             'interval',
             id='process_recurring_invoices',
             minutes=1,
             misfire_grace_time=60,
         )
+        @scheduler_lease.leader_only('process_recurring_invoices')
+        @metrics.track_job('process_recurring_invoices')
         def _job_process_recurring():
             """Comprueba cada minuto si alguna factura recurrente debe generarse ahora."""
             with app.app_context():
@@ -239,6 +414,8 @@ def _register_scheduler_jobs(app: Flask) -> None:
             minute=app.config.get('MONTHLY_FINANCIAL_REPORT_MINUTE', 0),
             misfire_grace_time=43200,
         )
+        @scheduler_lease.leader_only('send_monthly_financial_report')
+        @metrics.track_job('send_monthly_financial_report')
         def _job_send_monthly_financial_report():
             """Envía el reporte financiero consolidado del mes anterior."""
             with app.app_context():
@@ -266,6 +443,104 @@ def _register_scheduler_jobs(app: Flask) -> None:
         app.logger.info(
             "[OK] Tarea programada registrada: reporte financiero mensual cada día 1 a las 06:00"
         )
+
+        @scheduler.task(
+            'interval',
+            id='check_ledger_integrity',
+            minutes=app.config.get('LEDGER_INTEGRITY_INTERVAL_MINUTES', 15),
+            misfire_grace_time=300,
+        )
+        @scheduler_lease.leader_only('check_ledger_integrity')
+        @metrics.track_job('check_ledger_integrity')
+        def _job_check_ledger_integrity():
+            """Verifica facturas, pagos y asientos modificados desde la última corrida."""
+            with app.app_context():
+                try:
+                    from ledger_integrity import run_integrity_check
+
+                    result = run_integrity_check()
+                    if result['violations']:
+                        app.logger.warning(
+                            "[Scheduler] Integridad del libro: %s violaciones en %s facturas revisadas",
+                            result['violations'],
+                            result['checked_invoices'],
+                        )
+                except Exception as exc:
+                    app.logger.error(f"[Scheduler] Fallo al verificar integridad del libro: {exc}")
+
+        app.logger.info(
+            "[OK] Tarea programada registrada: verificación de integridad del libro"
+        )
+
+        @scheduler.task(
+            'cron',
+            id='purge_resident_sync_log',
+            hour=3,
+            minute=30,
+            misfire_grace_time=3600,
+        )
+        @scheduler_lease.leader_only('purge_resident_sync_log')
+        @metrics.track_job('purge_resident_sync_log')
+        def _job_purge_resident_sync_log():
+            """Purga el registro de cambios de la sincronización delta de residentes."""
+            with app.app_context():
+                try:
+                    removed = residents.purge_sync_log(app.config.get('RESIDENT_SYNC_RETENTION_DAYS', 90))
+                    if removed:
+                        app.logger.info(f"[Scheduler] Registro de sincronización: {removed} cambios purgados")
+                except Exception as exc:
+                    app.logger.error(f"[Scheduler] Fallo al purgar el registro de sincronización: {exc}")
+
+        app.logger.info(
+            "[OK] Tarea programada registrada: purga diaria del registro de sincronización de residentes"
+        )
+
+        @scheduler.task(
+            'cron',
+            id='purge_resident_refresh_tokens',
+            hour=3,
+            minute=45,
+            misfire_grace_time=3600,
+        )
+        @scheduler_lease.leader_only('purge_resident_refresh_tokens')
+        @metrics.track_job('purge_resident_refresh_tokens')
+        def _job_purge_resident_refresh_tokens():
+            """Purga los refresh tokens vencidos de la API de residentes."""
+            with app.app_context():
+                try:
+                    import resident_auth
+                    removed = resident_auth.purge_expired_refresh_tokens()
+                    if removed:
+                        app.logger.info(f"[Scheduler] Refresh tokens vencidos purgados: {removed}")
+                except Exception as exc:
+                    app.logger.error(f"[Scheduler] Fallo al purgar refresh tokens vencidos: {exc}")
+
+        app.logger.info(
+            "[OK] Tarea programada registrada: purga diaria de refresh tokens vencidos"
+        )
+
+        @scheduler.task(
+            'cron',
+            id='purge_audit_events',
+            hour=4,
+            minute=0,
+            misfire_grace_time=3600,
+        )
+        @scheduler_lease.leader_only('purge_audit_events')
+        @metrics.track_job('purge_audit_events')
+        def _job_purge_audit_events():
+            """Borra los meses del registro de auditoría fuera de la retención."""
+            with app.app_context():
+                try:
+                    removed = audit_trail.purge_old_months(app.config.get('AUDIT_RETENTION_MONTHS', 12))
+                    if removed:
+                        app.logger.info(f"[Scheduler] Registro de auditoría: {removed} eventos purgados")
+                except Exception as exc:
+                    app.logger.error(f"[Scheduler] Fallo al purgar el registro de auditoría: {exc}")
+
+        app.logger.info(
+            "[OK] Tarea programada registrada: purga diaria del registro de auditoría"
+        )
     except Exception as e:
         app.logger.warning(f"[WARNING] No se pudo registrar la tarea del scheduler: {e}")
 
@@ -294,6 +569,109 @@ def _register_blueprints(app: Flask) -> None:
             app.logger.error(f"Error registrando blueprint {bp.name}: {e}")
 
 
+# Menú del sidebar para administradores y operadores; el orden lo define
+# customization.get_sidebar_menu_order. Se comparte entre requests: no modificar.
+DEFAULT_SIDEBAR_MENUS = [
+    {
+        "key": "gestion",
+        "label": "Gestión",
+        "icon": "bi bi-folder",
+        "type": "dropdown",
+        "children": [
+            {
+                "key": "gestion_apartamentos",
+                "label": "Apartamentos",
+                "icon": "bi bi-building",
+                "url": "/apartamentos/",
+                "endpoint": "apartments.list"
+            },
+            {
+                "key": "gestion_productos",
+                "label": "Productos/Servicios",
+                "icon": "bi bi-box-seam",
+                "url": "/productos/",
+                "endpoint": "products.list"
+            },
+            {
+                "key": "gestion_proveedores",
+                "label": "Proveedores",
+                "icon": "bi bi-truck",
+                "url": "/suplidores/",
+                "endpoint": "suppliers.list"
+            }
+        ]
+    },
+    {
+        "key": "billing",
+        "label": "Ventas",
+        "icon": "bi bi-receipt",
+        "type": "dropdown",
+        "children": [
+            {
+                "key": "billing_facturas",
+                "label": "Facturas",
+                "icon": "bi bi-file-earmark-text",
+                "url": "/ventas/facturas",
+                "endpoint": "billing.invoices"
+            },
+            {
+                "key": "billing_registrar_pago",
+                "label": "Registrar Pago",
+                "icon": "bi bi-cash-coin",
+                "url": "/ventas/registrar-pago",
+                "endpoint": "billing.register_payment"
+            },
+            {
+                "key": "billing_historial_pagos",
+                "label": "Historial de Pagos",
+                "icon": "bi bi-clock-history",
+                "url": "/ventas/pagos",
+                "endpoint": "billing.payments"
+            },
+            {
+                "key": "billing_recurrentes",
+                "label": "Facturas Recurrentes",
+                "icon": "bi bi-arrow-repeat",
+                "url": "/ventas/recurrentes",
+                "endpoint": "billing.recurring_sales"
+            }
+        ]
+    },
+    {
+        "key": "accounting",
+        "label": "Contabilidad",
+        "icon": "bi bi-calculator",
+        "url": "/contabilidad/",
+        "endpoint": "accounting.list",
+        "type": "single"
+    },
+    {
+        "key": "expenses",
+        "label": "Gastos",
+        "icon": "bi bi-cash-stack",
+        "url": "/gastos/",
+        "endpoint": "expenses.list",
+        "type": "single"
+    },
+    {
+        "key": "reports",
+        "label": "Reportes",
+        "icon": "bi bi-graph-up",
+        "url": "/reportes/",
+        "endpoint": "reports.list",
+        "type": "single"
+    },
+    {
+        "key": "settings",
+        "label": "Configuración",
+        "icon": "bi bi-gear",
+        "url": "/configuracion/",
+        "endpoint": "settings.view",
+        "type": "single"
+    }
+]
+
+
 def _register_context_processors(app: Flask) -> None:
     """Registra los context processors para templates."""
     
@@ -325,109 +703,10 @@ def _register_context_processors(app: Flask) -> None:
             if current_user.is_authenticated and current_user.role == 'resident':
                 return []
                 
-            default_menus = [
-                {
-                    "key": "gestion",
-                    "label": "Gestión",
-                    "icon": "bi bi-folder",
-                    "type": "dropdown",
-                    "children": [
-                        {
-                            "key": "gestion_apartamentos",
-                            "label": "Apartamentos",
-                            "icon": "bi bi-building",
-                            "url": "/apartamentos/",
-                            "endpoint": "apartments.list"
-                        },
-                        {
-                            "key": "gestion_productos",
-                            "label": "Productos/Servicios",
-                            "icon": "bi bi-box-seam",
-                            "url": "/productos/",
-                            "endpoint": "products.list"
-                        },
-                        {
-                            "key": "gestion_proveedores",
-                            "label": "Proveedores",
-                            "icon": "bi bi-truck",
-                            "url": "/suplidores/",
-                            "endpoint": "suppliers.list"
-                        }
-                    ]
-                },
-                {
-                    "key": "billing",
-                    "label": "Ventas",
-                    "icon": "bi bi-receipt",
-                    "type": "dropdown",
-                    "children": [
-                        {
-                            "key": "billing_facturas",
-                            "label": "Facturas",
-                            "icon": "bi bi-file-earmark-text",
-                            "url": "/ventas/facturas",
-                            "endpoint": "billing.invoices"
-                        },
-                        {
-                            "key": "billing_registrar_pago",
-                            "label": "Registrar Pago",
-                            "icon": "bi bi-cash-coin",
-                            "url": "/ventas/registrar-pago",
-                            "endpoint": "billing.register_payment"
-                        },
-                        {
-                            "key": "billing_historial_pagos",
-                            "label": "Historial de Pagos",
-                            "icon": "bi bi-clock-history",
-                            "url": "/ventas/pagos",
-                            "endpoint": "billing.payments"
-                        },
-                        {
-                            "key": "billing_recurrentes",
-                            "label": "Facturas Recurrentes",
-                            "icon": "bi bi-arrow-repeat",
-                            "url": "/ventas/recurrentes",
-                            "endpoint": "billing.recurring_sales"
-                        }
-                    ]
-                },
-                {
-                    "key": "accounting",
-                    "label": "Contabilidad",
-                    "icon": "bi bi-calculator",
-                    "url": "/contabilidad/",
-                    "endpoint": "accounting.list",
-                    "type": "single"
-                },
-                {
-                    "key": "expenses",
-                    "label": "Gastos",
-                    "icon": "bi bi-cash-stack",
-                    "url": "/gastos/",
-                    "endpoint": "expenses.list",
-                    "type": "single"
-                },
-                {
-                    "key": "reports",
-                    "label": "Reportes",
-                    "icon": "bi bi-graph-up",
-                    "url": "/reportes/",
-                    "endpoint": "reports.list",
-                    "type": "single"
-                },
-                {
-                    "key": "settings",
-                    "label": "Configuración",
-                    "icon": "bi bi-gear",
-                    "url": "/configuracion/",
-                    "endpoint": "settings.view",
-                    "type": "single"
-                }
-            ]
             try:
-                return customization.get_sidebar_menu_order(default_menus)
+                return customization.get_sidebar_menu_order(DEFAULT_SIDEBAR_MENUS)
             except Exception:
-                return default_menus
+                return DEFAULT_SIDEBAR_MENUS
         return dict(get_sidebar_menu=get_sidebar_menu)
 
     @app.context_processor
@@ -1981,6 +2260,36 @@ def _register_routes(app: Flask) -> None:
         status_code = 200 if status['status'] == 'healthy' else 503
         return jsonify(status), status_code
 
+    @app.route("/metrics")
+    def metrics_export():
+        """
+        Métricas en formato Prometheus (todos los workers).
+
+        Acceso con ``METRICS_TOKEN`` (Bearer) o sesión de administrador; sin token,
+        loopback solo si ``METRICS_ALLOW_LOOPBACK`` está activado.
+        """
+        if not app.config.get('METRICS_ENABLED', True):
+            return jsonify({'error': 'Métricas deshabilitadas'}), 404
+
+        token = app.config.get('METRICS_TOKEN') or ''
+        provided = (request.headers.get('Authorization') or '').removeprefix('Bearer ').strip()
+        authorized = (
+            (token and hmac.compare_digest(provided, token))
+            or (current_user.is_authenticated and current_user.is_admin())
+            or (
+                not token
+                and app.config.get('METRICS_ALLOW_LOOPBACK')
+                and request.remote_addr in {'127.0.0.1', '::1'}
+            )
+        )
+        if not authorized:
+            return jsonify({'error': 'No autorizado'}), 403
+
+        return app.response_class(
+            metrics.render_metrics(),
+            mimetype='text/plain; version=0.0.4; charset=utf-8',
+        )
+
 
 def _register_error_handlers(app: Flask) -> None:
     """Registra los manejadores de errores HTTP."""
@@ -0,0 +1,296 @@
+"""
+Módulo de Auditoría
+Registro de auditoría consultable en la tabla ``audit_events`` (migración 023).
+
+``audit.log`` (líneas de texto/JSON) no permite responder "quién borró el pago X
+el mes pasado" sin recorrer el archivo. Cada evento del logger ``audit``
+(``utils.decorators``) pasa también por ``AuditTrailHandler``, que solo lo
+agrega al buffer del proceso; un hilo en segundo plano lo vacía cada
+``AUDIT_FLUSH_SECONDS`` o al llegar a ``AUDIT_BATCH_SIZE`` eventos con un único
+``executemany`` por lote. Si la BD está bloqueada el lote se reintenta en el
+siguiente ciclo (el buffer está acotado a ``MAX_BUFFERED_EVENTS``).
+
+La tabla es de solo inserción y se particiona lógicamente por mes (columna
+``month``); ``purge_old_months`` borra los meses fuera de la retención. Las
+búsquedas paginan por id descendente (``before_id``) sobre los índices de
+usuario, acción, entidad y fecha.
+"""
+
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import db as legacy_db
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_SECONDS = 2.0
+DEFAULT_RETENTION_MONTHS = 12
+# Meses que la purga nunca toca: el actual y el anterior (ver el trigger de la migración).
+MIN_RETENTION_MONTHS = 2
+MAX_BUFFERED_EVENTS = 10000
+SEARCH_PAGE_SIZE = 50
+
+_EVENT_COLUMNS = (
+    'created_at', 'month', 'level', 'action', 'user_id', 'username',
+    'entity', 'entity_id', 'endpoint', 'description', 'ip',
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ========== BUFFER POR PROCESO ==========
+
+class _EventBuffer:
+    """Eventos pendientes de este proceso y el hilo que los inserta por lotes."""
+
+    def __init__(self):
+        self.enabled = True
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.flush_seconds = DEFAULT_FLUSH_SECONDS
+        self._events: deque = deque(maxlen=MAX_BUFFERED_EVENTS)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._table_missing = False
+
+    def add(self, event: tuple) -> None:
+        with self._lock:
+            self._events.append(event)
+            pending = len(self._events)
+        self._ensure_thread()
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def _ensure_thread(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid != pid or self._thread is None:
+                # Tras un fork el hilo del padre no existe en el hijo
+                self._wake = threading.Event()
+                self._thread = threading.Thread(target=self._run, name='audit-trail-writer', daemon=True)
+                self._pid = pid
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as exc:
+                logger.error(f"Error guardando eventos de auditoría: {exc}")
+
+    def _take(self) -> List[tuple]:
+        with self._lock:
+            batch = [self._events.popleft() for _ in range(min(len(self._events), self.batch_size))]
+        return batch
+
+    def _requeue(self, batch: List[tuple]) -> None:
+        with self._lock:
+            self._events.extendleft(reversed(batch))
+
+    def flush(self) -> int:
+        """Inserta todo lo pendiente; retorna cuántos eventos se guardaron."""
+        written = 0
+        with self._write_lock:
+            while True:
+                batch = self._take()
+                if not batch:
+                    return written
+                try:
+                    _insert_events(batch)
+                except sqlite3.OperationalError as exc:
+                    if 'no such table' in str(exc):
+                        # Migración sin aplicar: los eventos quedan solo en audit.log
+                        if not self._table_missing and Path(legacy_db.DB_PATH).exists():
+                            logger.warning("audit_events no existe; aplica legacy_migrations/023")
+                        self._table_missing = True
+                        continue
+                    self._requeue(batch)
+                    return written
+                except sqlite3.Error as exc:
+                    logger.error(f"Lote de auditoría descartado ({len(batch)} eventos): {exc}")
+                    continue
+                self._table_missing = False
+                written += len(batch)
+
+
+_buffer = _EventBuffer()
+atexit.register(_buffer.flush)
+
+
+def _insert_events(batch: List[tuple]) -> None:
+    if not Path(legacy_db.DB_PATH).exists():
+        # No crear una BD vacía solo para la auditoría (p. ej. al salir tras borrarla)
+        raise sqlite3.OperationalError('no such table: audit_events (sin base de datos)')
+    conn = legacy_db.get_conn()
+    try:
+        conn.executemany(
+            f"INSERT INTO audit_events ({', '.join(_EVENT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(_EVENT_COLUMNS))})",
+            batch,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def configure(enabled: bool = True, batch_size: int = DEFAULT_BATCH_SIZE,
+              flush_seconds: float = DEFAULT_FLUSH_SECONDS) -> None:
+    """Ajusta el buffer de este proceso (desde ``create_app``)."""
+    _buffer.enabled = bool(enabled)
+    _buffer.batch_size = max(1, int(batch_size))
+    _buffer.flush_seconds = max(0.1, float(flush_seconds))
+
+
+def flush() -> int:
+    return _buffer.flush()
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def record_event(action: str, *, user_id: Optional[int] = None, username: Optional[str] = None,
+                 entity: Optional[str] = None, entity_id=None, endpoint: Optional[str] = None,
+                 description: Optional[str] = None, ip: Optional[str] = None,
+                 level: str = 'INFO', created_at: Optional[datetime] = None) -> None:
+    """Agrega un evento al buffer; no toca la BD en el hilo que llama."""
+    if not _buffer.enabled or not action:
+        return
+    created = (created_at or _utc_now()).astimezone(timezone.utc)
+    stamp = created.strftime('%Y-%m-%d %H:%M:%S')
+    _buffer.add((
+        stamp,
+        stamp[:7],
+        level,
+        str(action)[:100],
+        user_id,
+        username,
+        entity,
+        None if entity_id is None else str(entity_id),
+        endpoint,
+        None if description is None else str(description)[:500],
+        ip,
+    ))
+
+
+class AuditTrailHandler(logging.Handler):
+    """Handler del logger ``audit``: copia cada registro con ``fields`` al buffer."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        fields = getattr(record, 'fields', None)
+        if not isinstance(fields, dict):
+            return
+        try:
+            record_event(
+                fields.get('action') or 'UNKNOWN',
+                user_id=fields.get('user_id'),
+                username=fields.get('user'),
+                entity=fields.get('entity'),
+                entity_id=fields.get('entity_id'),
+                endpoint=fields.get('endpoint'),
+                description=fields.get('description'),
+                ip=fields.get('ip'),
+                level=record.levelname,
+                created_at=datetime.fromtimestamp(record.created, timezone.utc),
+            )
+        except Exception:
+            self.handleError(record)
+
+
+# ========== CONSULTAS ==========
+
+def search_events(username: Optional[str] = None, action: Optional[str] = None,
+                  entity: Optional[str] = None, entity_id: Optional[str] = None,
+                  date_from: Optional[str] = None, date_to: Optional[str] = None,
+                  before_id: Optional[int] = None, limit: int = SEARCH_PAGE_SIZE) -> Dict:
+    """
+    Eventos que cumplen los filtros, más recientes primero.
+
+    ``date_from``/``date_to`` son fechas ``YYYY-MM-DD`` (UTC, ambas incluidas).
+    Retorna ``{'items', 'has_more', 'next_before_id', 'available'}``; la página
+    siguiente se pide con ``before_id=next_before_id``.
+    """
+    clauses: List[str] = []
+    params: List = []
+    if username:
+        clauses.append("username = ?")
+        params.append(username)
+    if action:
+        clauses.append("action = ?")
+        params.append(action)
+    if entity:
+        clauses.append("entity = ?")
+        params.append(entity)
+        if entity_id not in (None, ''):
+            clauses.append("entity_id = ?")
+            params.append(str(entity_id))
+    if date_from:
+        clauses.append("created_at >= ?")
+        params.append(f"{date_from} 00:00:00")
+    if date_to:
+        clauses.append("created_at <= ?")
+        params.append(f"{date_to} 23:59:59")
+    if before_id:
+        clauses.append("id < ?")
+        params.append(int(before_id))
+
+    limit = max(1, min(int(limit), 500))
+    query = f"SELECT id, {', '.join(_EVENT_COLUMNS)} FROM audit_events"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    conn = legacy_db.get_conn()
+    try:
+        rows = conn.execute(query, params).fetchall()
+    except sqlite3.OperationalError:
+        return {'items': [], 'has_more': False, 'next_before_id': None, 'available': False}
+    finally:
+        conn.close()
+
+    items = [dict(row) for row in rows[:limit]]
+    has_more = len(rows) > limit
+    return {
+        'items': items,
+        'has_more': has_more,
+        'next_before_id': items[-1]['id'] if has_more else None,
+        'available': True,
+    }
+
+
+# ========== RETENCIÓN ==========
+
+def _cutoff_month(retention_months: int, today: Optional[datetime] = None) -> str:
+    """Primer mes que se conserva (YYYY-MM)."""
+    today = today or _utc_now()
+    months = today.year * 12 + (today.month - 1) - (max(retention_months, MIN_RETENTION_MONTHS) - 1)
+    return f"{months // 12:04d}-{months % 12 + 1:02d}"
+
+
+def purge_old_months(retention_months: int = DEFAULT_RETENTION_MONTHS) -> int:
+    """Borra los meses completos anteriores a la retención; retorna cuántos eventos."""
+    conn = legacy_db.get_conn()
+    try:
+        cur = conn.execute(
+            "DELETE FROM audit_events WHERE month < ?",
+            (_cutoff_month(retention_months),),
+        )
+        conn.commit()
+        return cur.rowcount
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        conn.close()
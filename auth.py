@@ -112,7 +112,10 @@ def login():
         # Login exitoso
         login_user(user, remember=remember)
         user_model.update_last_login(user.id)
-        
+        if not user.is_admin():
+            # Precargar el conjunto de permisos: las verificaciones posteriores son O(1) en memoria
+            perm_module.get_user_permission_set(user.id)
+
         flash(f'Bienvenido, {user.full_name or user.username}!', 'success')
         
         # Redirigir a la página solicitada o al dashboard
@@ -401,6 +404,7 @@ def edit_profile():
             """, (full_name, phone, photo_url, current_user.id))
             conn.commit()
             conn.close()
+            user_model.invalidate_user_cache(current_user.id)
             
             # Actualizar el objeto current_user en memoria
             current_user.full_name = full_name
@@ -484,6 +488,7 @@ def edit_user(user_id):
             """, (full_name, email, role, user_id))
             conn.commit()
             conn.close()
+            user_model.invalidate_user_cache(user_id)
 
             residents.clear_user_apartment_links(user_id, clear_emails=[email, user.email])
             
@@ -560,6 +565,7 @@ def delete_user(user_id):
         cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
         conn.commit()
         conn.close()
+        user_model.invalidate_user_cache(user_id)
         
         flash('Usuario eliminado correctamente', 'success')
     except Exception as e:
@@ -11,6 +11,7 @@ from pathlib import Path
 
 from utils.decorators import permission_required, role_required, admin_required, audit_log
 from utils.pagination import paginate
+from utils.http_cache import conditional_get, versioned_cache_key
 from extensions import cache, csrf
 import models
 import apartments
@@ -19,6 +20,7 @@ import products_services
 import customization
 import db
 import billing
+import payment_import
 
 logger = logging.getLogger(__name__)
 
@@ -311,7 +313,8 @@ def _notify_admin_payment_change(action, payment, invoice, unit, previous_paymen
 @billing_bp.route('/facturas')
 @login_required
 @permission_required('facturacion.view')
-@cache.cached(timeout=60, query_string=True)
+@conditional_get()
+@cache.cached(timeout=60, query_string=True, make_cache_key=versioned_cache_key())
 def invoices():
     """Vista principal de facturación"""
     try:
@@ -407,7 +410,8 @@ def invoices():
 @billing_bp.route('/pagos')
 @login_required
 @permission_required('facturacion.view')
-@cache.cached(timeout=60, query_string=True)
+@conditional_get()
+@cache.cached(timeout=60, query_string=True, make_cache_key=versioned_cache_key())
 def payments():
     """Vista de Pagos Recibidos"""
     try:
@@ -602,6 +606,61 @@ def register_payment():
                          customization=custom_settings)
 
 
+@billing_bp.route('/pagos/importar', methods=['POST'])
+@login_required
+@permission_required('facturacion.create')
+@audit_log('facturacion.importar_pagos', 'Importar pagos desde estado de cuenta bancario')
+def import_payments():
+    """Importa depósitos de un estado de cuenta (CSV/OFX) y los concilia con facturas abiertas."""
+    upload = request.files.get('statement')
+    filename = (upload.filename or '') if upload else ''
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if not upload or extension not in payment_import.ALLOWED_STATEMENT_EXTENSIONS:
+        flash("Selecciona un archivo CSV u OFX del banco.", "error")
+        return redirect(url_for("billing.register_payment"))
+
+    dry_run = request.form.get('dry_run') in {'1', 'true', 'on'}
+    method = (request.form.get('method') or 'transferencia').strip() or 'transferencia'
+
+    try:
+        result = payment_import.import_bank_statement(
+            upload.read(),
+            filename=filename,
+            method=method,
+            dry_run=dry_run,
+        )
+    except ValueError as e:
+        flash(f"No se pudo leer el estado de cuenta: {e}", "error")
+        return redirect(url_for("billing.register_payment"))
+    except Exception as e:
+        logger.error(f"Error importing bank statement: {e}")
+        flash(f"Error al importar pagos: {e}", "error")
+        return redirect(url_for("billing.register_payment"))
+
+    matched = len(result['matched'])
+    if dry_run:
+        flash(f"Vista previa: {matched} depósito(s) coinciden con facturas abiertas.", "info")
+    else:
+        total = sum(item['amount'] for item in result['imported'])
+        flash(
+            f"{len(result['imported'])} pago(s) importados por RD${total:,.2f}. "
+            "Los comprobantes se enviarán en segundo plano.",
+            "success",
+        )
+        cache.clear()
+
+    if result['duplicates']:
+        flash(f"{len(result['duplicates'])} depósito(s) ya habían sido importados y se omitieron.", "warning")
+    if result['unmatched']:
+        detail = "; ".join(
+            f"línea {item['line']}: RD${(item['amount'] or 0):,.2f} ({item['reason']})"
+            for item in result['unmatched'][:10]
+        )
+        flash(f"{len(result['unmatched'])} depósito(s) sin conciliar: {detail}", "warning")
+
+    return redirect(url_for("billing.register_payment"))
+
+
 # ========== OPERACIONES DE FACTURAS ==========
 
 @billing_bp.route('/facturas/create', methods=['POST'], endpoint='create_factura')
@@ -6,12 +6,17 @@ import logging
 from datetime import datetime
 from pathlib import Path
 
-from flask import Blueprint, render_template, request, jsonify, send_file, flash, redirect, url_for
+from flask import (
+    Blueprint, Response, render_template, request, jsonify, send_file, flash, redirect,
+    stream_with_context, url_for,
+)
 from flask_login import login_required, current_user
 
 from utils.decorators import permission_required, admin_required, audit_log
+from utils.http_cache import conditional_get, versioned_cache_key
 from extensions import cache
 import reports
+import exports
 import customization
 from company import get_company_info
 from senders import generate_monthly_financial_report_html
@@ -61,7 +66,8 @@ def _resolve_preview_request(raw_reference_date: str, raw_period_mode: str):
 @reports_bp.route('/')
 @login_required
 @permission_required('reportes.view')
-@cache.cached(timeout=60, query_string=True)
+@conditional_get()
+@cache.cached(timeout=60, query_string=True, make_cache_key=versioned_cache_key())
 def list():
     """Vista principal de reportes y análisis"""
     try:
@@ -297,6 +303,39 @@ def monthly_view_html():
         return f"<h3>Error generando reporte HTML</h3><pre>{traceback.format_exc()}</pre>", 200
 
 
+# ========== EXPORTACIONES ==========
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+@reports_bp.route('/exportar/<dataset>.<fmt>')
+@login_required
+@permission_required('reportes.export')
+def export_dataset(dataset, fmt):
+    """Descarga en streaming de facturas, pagos, gastos, transacciones o estado de resultados."""
+    today = datetime.now()
+    date_from = request.args.get('date_from') or today.strftime('%Y-%m-01')
+    date_to = request.args.get('date_to') or today.strftime('%Y-%m-%d')
+
+    try:
+        body = exports.stream_export(dataset, date_from, date_to, fmt)
+    except ValueError as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 400
+
+    filename = exports.get_export_filename(dataset, date_from, date_to, fmt)
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no',
+        },
+    )
+
+
 # ========== API ENDPOINTS ==========
 
 @reports_bp.route('/api/sales-by-period')
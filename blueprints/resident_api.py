@@ -1,21 +1,33 @@
+import base64
+import binascii
+import hashlib
+import json
 import logging
-from typing import Optional
+import sqlite3
+from typing import Optional, Tuple
 
 from flask import Blueprint, jsonify, request, url_for, g
 from flask_login import current_user
 
+import db
 import models
 import residents
 import resident_auth
 import user_model
 from blueprints import billing
 from extensions import csrf, limiter
+from utils.http_cache import RESIDENT_API_NAMESPACES, conditional_get
 
 
 logger = logging.getLogger(__name__)
 
 resident_api_bp = Blueprint('resident_api', __name__, url_prefix='/api/resident')
 PUBLIC_ENDPOINTS = {'resident_api.auth_login', 'resident_api.auth_refresh'}
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_SYNC_CHANGES = 500
+BOOTSTRAP_PAGE_SIZE = 20
+SYNC_RESET_MESSAGE = 'Sincronizacion expirada; se requiere descarga completa'
 
 
 def _json_error(message: str, status_code: int):
@@ -56,14 +68,16 @@ def _get_allowed_unit_ids(include_invited: bool = False, user=None):
     )
 
 
-def _build_profile_payload(user=None) -> dict:
+def _build_profile_payload(user=None, linked_apartments=None, pending_invitations=None) -> dict:
     request_user = user or _get_request_user()
-    linked_apartments = residents.list_linked_apartments_for_user(
-        request_user.id,
-        fallback_email=request_user.email,
-        include_invited=True,
-    )
-    pending_invitations = residents.list_pending_invitations_for_user(request_user.id)
+    if linked_apartments is None:
+        linked_apartments = residents.list_linked_apartments_for_user(
+            request_user.id,
+            fallback_email=request_user.email,
+            include_invited=True,
+        )
+    if pending_invitations is None:
+        pending_invitations = residents.list_pending_invitations_for_user(request_user.id)
     return {
         'id': request_user.id,
         'username': request_user.username,
@@ -137,6 +151,82 @@ def _serialize_payment(payment: dict) -> dict:
     }
 
 
+def _is_paged_request() -> bool:
+    """Los clientes con cursores mandan ``cursor`` o ``limit``; los anteriores, ninguno."""
+    return bool(request.args.get('cursor') or request.args.get('limit'))
+
+
+def _page_limit() -> int:
+    raw_limit = request.args.get('limit')
+    if raw_limit in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw_limit)
+    except ValueError:
+        raise ValueError('Parametro limit invalido')
+    if limit <= 0:
+        raise ValueError('Parametro limit invalido')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def _encode_cursor(row: dict, date_field: str) -> str:
+    raw = json.dumps([row.get(date_field) or '', row.get('id')], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Cursor opaco ``(fecha, id)`` de la última fila de la página anterior."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return str(date_value), int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError('Parametro cursor invalido')
+
+
+def _units_digest(unit_ids) -> str:
+    return hashlib.sha1(','.join(str(unit_id) for unit_id in sorted(unit_ids)).encode('utf-8')).hexdigest()[:10]
+
+
+def _format_sync_token(position: int, unit_ids) -> str:
+    return f'{position}.{_units_digest(unit_ids)}'
+
+
+def _sync_token(unit_ids) -> Optional[str]:
+    """Token para ``updated_since``; se toma antes de leer las filas."""
+    try:
+        return _format_sync_token(residents.get_sync_position(), unit_ids)
+    except sqlite3.OperationalError:
+        return None
+
+
+def _changed_ids_since(token: str, unit_ids, entity: str):
+    """
+    ``(ids cambiados, posición actual)`` desde el token, o ``None`` si el cliente
+    debe descargar todo otra vez (token purgado, unidades distintas, demasiados
+    cambios o registro no disponible).
+    """
+    position_part, _, digest = token.partition('.')
+    try:
+        position = int(position_part)
+    except ValueError:
+        raise ValueError('Parametro updated_since invalido')
+    if position < 0 or digest != _units_digest(unit_ids):
+        return None
+    try:
+        if not residents.is_sync_position_available(position):
+            return None
+        current = residents.get_sync_position()
+        changed_ids = residents.list_changed_entity_ids(unit_ids, entity, position, current)
+    except sqlite3.OperationalError:
+        return None
+    if len(changed_ids) > MAX_SYNC_CHANGES:
+        return None
+    return changed_ids, current
+
+
 @resident_api_bp.before_request
 def require_authenticated_resident():
     if request.endpoint in PUBLIC_ENDPOINTS:
@@ -258,6 +348,7 @@ def auth_logout():
 
 
 @resident_api_bp.route('/profile', methods=['GET'])
+@conditional_get(*RESIDENT_API_NAMESPACES)
 def profile():
     request_user = _get_request_user()
     summary = residents.get_resident_statement_summary_for_user(
@@ -272,6 +363,7 @@ def profile():
 
 
 @resident_api_bp.route('/apartments', methods=['GET'])
+@conditional_get(*RESIDENT_API_NAMESPACES)
 def apartments():
     request_user = _get_request_user()
     linked_apartments = residents.list_linked_apartments_for_user(
@@ -286,6 +378,7 @@ def apartments():
 
 
 @resident_api_bp.route('/invitations', methods=['GET'])
+@conditional_get(*RESIDENT_API_NAMESPACES)
 def invitations():
     request_user = _get_request_user()
     invitations = residents.list_pending_invitations_for_user(request_user.id)
@@ -325,6 +418,7 @@ def activate_invitation():
 
 
 @resident_api_bp.route('/invoices', methods=['GET'])
+@conditional_get(*RESIDENT_API_NAMESPACES)
 def invoices():
     request_user = _get_request_user()
     status = (request.args.get('status') or 'all').strip().lower()
@@ -338,22 +432,134 @@ def invoices():
     else:
         return _json_error('Parametro status invalido', 400)
 
+    if request.args.get('updated_since'):
+        return _invoices_delta(request_user, paid_filter)
+
+    # Sin cursor ni limit (clientes anteriores) se devuelven todas las facturas.
+    try:
+        limit = _page_limit() if _is_paged_request() else None
+        after = _decode_cursor(request.args.get('cursor'))
+    except ValueError as exc:
+        return _json_error(str(exc), 400)
+
+    sync_token = _sync_token(_get_allowed_unit_ids(user=request_user))
+    page = _invoice_page(request_user, paid_filter, limit, after)
+    return jsonify({
+        'success': True,
+        'invoices': page['items'],
+        'pagination': page['pagination'],
+        'sync': {'token': sync_token},
+    })
+
+
+def _invoice_page(request_user, paid_filter: Optional[bool], limit: Optional[int],
+                  after: Optional[Tuple[str, int]] = None) -> dict:
     invoices = residents.list_resident_invoices_for_user(
         request_user.id,
         fallback_email=request_user.email,
         paid=paid_filter,
+        limit=limit + 1 if limit is not None else None,
+        after=after,
     )
+    has_more = limit is not None and len(invoices) > limit
+    invoices = invoices[:limit]
+    return {
+        'items': [_serialize_invoice(invoice) for invoice in invoices],
+        'pagination': {
+            'limit': limit,
+            'returned': len(invoices),
+            'has_more': has_more,
+            'next_cursor': _encode_cursor(invoices[-1], 'issued_date') if has_more else None,
+        },
+    }
+
+
+def _invoices_delta(request_user, paid_filter: Optional[bool]):
+    unit_ids = sorted(_get_allowed_unit_ids(user=request_user))
+    try:
+        changes = _changed_ids_since(request.args.get('updated_since'), unit_ids, 'invoice')
+    except ValueError as exc:
+        return _json_error(str(exc), 400)
+    if changes is None:
+        return _json_error(SYNC_RESET_MESSAGE, 410)
+
+    changed_ids, position = changes
+    invoices = residents.list_resident_invoices_for_user(
+        request_user.id,
+        fallback_email=request_user.email,
+        paid=paid_filter,
+        invoice_ids=changed_ids,
+    )
+    returned_ids = {invoice['id'] for invoice in invoices}
     return jsonify({
         'success': True,
         'invoices': [_serialize_invoice(invoice) for invoice in invoices],
+        'removed_ids': [invoice_id for invoice_id in changed_ids if invoice_id not in returned_ids],
+        'sync': {'token': _format_sync_token(position, unit_ids)},
     })
 
 
 @resident_api_bp.route('/payments', methods=['GET'])
+@conditional_get(*RESIDENT_API_NAMESPACES)
 def payments():
     request_user = _get_request_user()
     method = (request.args.get('method') or '').strip() or None
     month = (request.args.get('month') or '').strip() or None
+    if month and len(month) != 7:
+        return _json_error('Parametro month invalido', 400)
+
+    if request.args.get('updated_since'):
+        return _payments_delta(request_user, method, month)
+
+    # Paginación por offset (clientes anteriores): conserva el total y, sin
+    # cursor ni limit, devuelve todos los pagos como antes.
+    if 'offset' in request.args or not _is_paged_request():
+        return _payments_by_offset(request_user, method, month)
+
+    try:
+        limit = _page_limit()
+        after = _decode_cursor(request.args.get('cursor'))
+    except ValueError as exc:
+        return _json_error(str(exc), 400)
+
+    sync_token = _sync_token(_get_allowed_unit_ids(user=request_user))
+    page = _payment_page(request_user, method, month, limit, after)
+    return jsonify({
+        'success': True,
+        'payments': page['items'],
+        'pagination': page['pagination'],
+        'filters': page['filters'],
+        'sync': {'token': sync_token},
+    })
+
+
+def _payment_page(request_user, method: Optional[str], month: Optional[str], limit: int,
+                  after: Optional[Tuple[str, int]] = None) -> dict:
+    payment_history = residents.get_resident_payment_history_for_user(
+        request_user.id,
+        fallback_email=request_user.email,
+        method=method,
+        month=month,
+        limit=limit + 1,
+        after=after,
+        include_total=False,
+    )
+    payments = list(payment_history.get('items') or [])
+    has_more = len(payments) > limit
+    payments = payments[:limit]
+    return {
+        'items': [_serialize_payment(payment) for payment in payments],
+        'pagination': {
+            'limit': limit,
+            'returned': len(payments),
+            'has_more': has_more,
+            'next_cursor': _encode_cursor(payments[-1], 'paid_date') if has_more else None,
+        },
+        'filters': _payment_filters(payment_history, method, month),
+    }
+
+
+def _payments_by_offset(request_user, method: Optional[str], month: Optional[str]):
     limit = request.args.get('limit', type=int)
     offset = request.args.get('offset', type=int) or 0
 
@@ -361,9 +567,8 @@ def payments():
         return _json_error('Parametro limit invalido', 400)
     if offset < 0:
         return _json_error('Parametro offset invalido', 400)
-    if month and len(month) != 7:
-        return _json_error('Parametro month invalido', 400)
 
+    sync_token = _sync_token(_get_allowed_unit_ids(user=request_user))
     payment_history = residents.get_resident_payment_history_for_user(
         request_user.id,
         fallback_email=request_user.email,
@@ -385,20 +590,62 @@ def payments():
             'total': total,
             'has_more': offset + len(payments) < total,
         },
-        'filters': {
-            'applied': {
-                'method': method,
-                'month': month,
-            },
-            'methods': payment_history.get('methods') or [],
-            'months': payment_history.get('months') or [],
-        },
+        'filters': _payment_filters(payment_history, method, month),
+        'sync': {'token': sync_token},
+    })
+
+
+def _payments_delta(request_user, method: Optional[str], month: Optional[str]):
+    unit_ids = sorted(_get_allowed_unit_ids(user=request_user))
+    try:
+        changes = _changed_ids_since(request.args.get('updated_since'), unit_ids, 'payment')
+    except ValueError as exc:
+        return _json_error(str(exc), 400)
+    if changes is None:
+        return _json_error(SYNC_RESET_MESSAGE, 410)
+
+    changed_ids, position = changes
+    payment_history = residents.get_resident_payment_history_for_user(
+        request_user.id,
+        fallback_email=request_user.email,
+        method=method,
+        month=month,
+        payment_ids=changed_ids,
+        include_total=False,
+    )
+    payments = list(payment_history.get('items') or [])
+    returned_ids = {payment['id'] for payment in payments}
+    return jsonify({
+        'success': True,
+        'payments': [_serialize_payment(payment) for payment in payments],
+        'removed_ids': [payment_id for payment_id in changed_ids if payment_id not in returned_ids],
+        'filters': _payment_filters(payment_history, method, month),
+        'sync': {'token': _format_sync_token(position, unit_ids)},
     })
 
 
+def _payment_filters(payment_history: dict, method: Optional[str], month: Optional[str]) -> dict:
+    return {
+        'applied': {
+            'method': method,
+            'month': month,
+        },
+        'methods': payment_history.get('methods') or [],
+        'months': payment_history.get('months') or [],
+    }
+
+
 @resident_api_bp.route('/statement-summary', methods=['GET'])
+@conditional_get(*RESIDENT_API_NAMESPACES)
 def statement_summary():
     request_user = _get_request_user()
+    return jsonify({
+        'success': True,
+        'summary': _statement_summary_payload(request_user),
+    })
+
+
+def _statement_summary_payload(request_user) -> dict:
     summary = residents.get_resident_statement_summary_for_user(
         request_user.id,
         fallback_email=request_user.email,
@@ -408,13 +655,54 @@ def statement_summary():
         apartment_payload = dict(apartment)
         apartment_payload['statement_pdf_url'] = url_for('resident_api.statement_pdf', unit_id=apartment['unit_id'])
         apartments.append(apartment_payload)
+    return {
+        'apartments': apartments,
+        'totals': summary['totals'],
+    }
+
+
+@resident_api_bp.route('/bootstrap', methods=['GET'])
+@conditional_get(*RESIDENT_API_NAMESPACES)
+def bootstrap():
+    """
+    Datos de inicio de la app en una sola llamada: perfil, apartamentos,
+    invitaciones, estado de cuenta y la primera página de facturas y pagos.
+
+    Comparte la autenticación, la resolución de unidades y una conexión a la BD;
+    las páginas siguientes se piden con ``next_cursor`` a ``/invoices`` y
+    ``/payments``, y ``sync.token`` sirve para ambos en ``updated_since``.
+    """
+    request_user = _get_request_user()
+    try:
+        limit = _page_limit() if request.args.get('limit') else BOOTSTRAP_PAGE_SIZE
+    except ValueError as exc:
+        return _json_error(str(exc), 400)
+
+    with db.shared_connection():
+        linked_apartments = residents.list_linked_apartments_for_user(
+            request_user.id,
+            fallback_email=request_user.email,
+            include_invited=True,
+        )
+        pending_invitations = residents.list_pending_invitations_for_user(request_user.id)
+        sync_token = _sync_token(_get_allowed_unit_ids(user=request_user))
+        summary = _statement_summary_payload(request_user)
+        invoice_page = _invoice_page(request_user, None, limit)
+        payment_page = _payment_page(request_user, None, None, limit)
 
     return jsonify({
         'success': True,
-        'summary': {
-            'apartments': apartments,
-            'totals': summary['totals'],
-        },
+        'profile': _build_profile_payload(
+            request_user,
+            linked_apartments=linked_apartments,
+            pending_invitations=pending_invitations,
+        ),
+        'apartments': [_serialize_apartment(apartment) for apartment in linked_apartments],
+        'invitations': [_serialize_invitation(invitation) for invitation in pending_invitations],
+        'summary': summary,
+        'invoices': invoice_page,
+        'payments': payment_page,
+        'sync': {'token': sync_token},
     })
 
 
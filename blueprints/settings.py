@@ -5,15 +5,18 @@ Permite ver y editar la configuración general del sistema (empresa y personaliz
 from datetime import datetime
 from pathlib import Path
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_file, jsonify, abort
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 
+import audit_trail
 import db
 import company
 import customization
+import ledger_integrity
 import reports
 from extensions import cache
+from utils import request_profiler
 from utils.decorators import admin_required, audit_log
 
 settings_bp = Blueprint('settings', __name__, url_prefix='/configuracion')
@@ -235,6 +238,121 @@ def clear_cache():
     return redirect(url_for('settings.view'))
 
 
+@settings_bp.route('/integridad', methods=['GET'])
+@login_required
+@admin_required
+def integrity_view():
+    """Violaciones abiertas del verificador de integridad del libro."""
+    check_name = request.args.get('check') or None
+    return render_template(
+        'integridad.html',
+        violations=ledger_integrity.get_open_violations(check_name=check_name),
+        metrics=ledger_integrity.get_integrity_metrics(),
+        check_labels=ledger_integrity.CHECK_LABELS,
+        selected_check=check_name,
+    )
+
+
+@settings_bp.route('/integridad/run', methods=['POST'])
+@login_required
+@admin_required
+@audit_log('ledger.integrity.run', 'Ejecutar verificación de integridad del libro')
+def run_integrity_check():
+    """Ejecuta la verificación incremental (o completa con ``full=1``)."""
+    full = request.form.get('full') == '1' or request.args.get('full') == '1'
+    try:
+        result = ledger_integrity.run_integrity_check(full=full)
+    except Exception as exc:
+        current_app.logger.error('Error verificando integridad del libro: %s', exc)
+        flash(f'No se pudo verificar la integridad: {exc}', 'error')
+        return redirect(url_for('settings.integrity_view'))
+
+    flash(
+        f"Verificación {'completa' if full else 'incremental'}: {result['checked_invoices']} facturas revisadas, "
+        f"{result['violations']} violaciones, {result['resolved']} resueltas.",
+        'warning' if result['violations'] else 'success',
+    )
+    return redirect(url_for('settings.integrity_view'))
+
+
+@settings_bp.route('/integridad/metrics', methods=['GET'])
+@login_required
+@admin_required
+def integrity_metrics():
+    """Métricas del verificador en JSON para monitoreo."""
+    return jsonify(ledger_integrity.get_integrity_metrics())
+
+
+@settings_bp.route('/perfiles', methods=['GET'])
+@login_required
+@admin_required
+def request_profiles():
+    """Perfiles guardados de requests lentos o pedidos con ``X-Profile``."""
+    selected_id = request.args.get('id')
+    selected = request_profiler.load_profile(current_app, selected_id) if selected_id else None
+    if selected_id and selected is None:
+        flash('Perfil no encontrado.', 'warning')
+    return render_template(
+        'perfiles.html',
+        profiles=request_profiler.list_profiles(current_app),
+        selected=selected,
+        profiling_enabled=current_app.config.get('REQUEST_PROFILING_ENABLED', False),
+        sample_rate=current_app.config.get('REQUEST_PROFILING_SAMPLE_RATE', 0),
+        header_name=current_app.config.get('REQUEST_PROFILING_HEADER', 'X-Profile'),
+    )
+
+
+@settings_bp.route('/perfiles/<profile_id>.collapsed', methods=['GET'])
+@login_required
+@admin_required
+def download_request_profile(profile_id):
+    """Descarga las pilas colapsadas (flamegraph) de un perfil."""
+    path = request_profiler.get_collapsed_path(current_app, profile_id)
+    if path is None:
+        abort(404)
+    return send_file(path, as_attachment=True, download_name=path.name, mimetype='text/plain', max_age=0)
+
+
+@settings_bp.route('/auditoria', methods=['GET'])
+@login_required
+@admin_required
+def audit_view():
+    """Búsqueda en el registro de auditoría (audit_events), más recientes primero."""
+    filters = {
+        'username': request.args.get('usuario', '').strip(),
+        'action': request.args.get('accion', '').strip(),
+        'entity': request.args.get('entidad', '').strip(),
+        'entity_id': request.args.get('entidad_id', '').strip(),
+        'date_from': request.args.get('desde', '').strip(),
+        'date_to': request.args.get('hasta', '').strip(),
+    }
+    for key in ('date_from', 'date_to'):
+        if filters[key]:
+            try:
+                datetime.strptime(filters[key], '%Y-%m-%d')
+            except ValueError:
+                flash('Fecha inválida; usa el formato AAAA-MM-DD.', 'warning')
+                filters[key] = ''
+    before_id = request.args.get('antes', type=int)
+
+    # Los eventos de este proceso aún en el buffer aparecen de inmediato
+    audit_trail.flush()
+    result = audit_trail.search_events(
+        **{key: value or None for key, value in filters.items()},
+        before_id=before_id,
+    )
+    return render_template(
+        'auditoria.html',
+        events=result['items'],
+        has_more=result['has_more'],
+        next_before_id=result['next_before_id'],
+        available=result['available'],
+        filters=filters,
+        before_id=before_id,
+        retention_months=current_app.config.get('AUDIT_RETENTION_MONTHS', 12),
+    )
+
+
 @settings_bp.route('/database/backup', methods=['POST'])
 @login_required
 @admin_required
@@ -5,10 +5,15 @@ Handles CRUD operations for company/admin data
 import db
 from typing import Optional, Dict
 
+from utils.cache_versions import COMPANY_INFO, invalidate, memoized
+
+
+@memoized(COMPANY_INFO)
 def get_company_info() -> Optional[Dict]:
     """
     Get the company information from the database.
     Returns None if no company info exists.
+    Memoized per request and per process; invalidated by company_info writes.
     """
     conn = db.get_conn()
     cursor = conn.cursor()
@@ -95,6 +100,7 @@ def update_company_info(
     
     conn.commit()
     conn.close()
+    invalidate(COMPANY_INFO)
     return record_id
 
 def has_company_info() -> bool:
@@ -187,6 +187,8 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False  # Desactivar CSRF en tests
     DATABASE_PATH = os.getenv('BUILDING_MAINTENANCE_DB', 'test_data.db')
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{DATABASE_PATH}"
+    METRICS_DIR = None  # Métricas solo en memoria (un proceso)
+    JINJA_BYTECODE_CACHE_ENABLED = False  # Sin escribir bytecode en data/ durante los tests
 
 
 # Diccionario de configuraciones
@@ -24,23 +24,11 @@ def get_sidebar_menu_order(defaults):
     return ordered
 from typing import Dict, Optional
 from db import get_conn
+from utils.cache_versions import CUSTOMIZATION, invalidate, memoized
 
 def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
-    """Get a customization setting by key with request-level caching"""
-    try:
-        from flask import has_app_context, g
-        if has_app_context():
-            if 'customization_settings' not in g:
-                g.customization_settings = get_all_settings()
-            return g.customization_settings.get(key, default)
-    except Exception:
-        pass
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT setting_value FROM customization_settings WHERE setting_key=?", (key,))
-    row = cur.fetchone()
-    conn.close()
-    return row["setting_value"] if row else default
+    """Get a customization setting by key (served from the memoized settings map)"""
+    return get_all_settings().get(key, default)
 
 def set_setting(key: str, value: str) -> None:
     """Set a customization setting"""
@@ -54,34 +42,17 @@ def set_setting(key: str, value: str) -> None:
                 (key, value))
     conn.commit()
     conn.close()
-    try:
-        from flask import has_app_context, g
-        if has_app_context() and 'customization_settings' in g:
-            g.customization_settings[key] = value
-    except Exception:
-        pass
+    invalidate(CUSTOMIZATION)
 
+@memoized(CUSTOMIZATION)
 def get_all_settings() -> Dict[str, str]:
-    """Get all customization settings as a dictionary with request-level caching"""
-    try:
-        from flask import has_app_context, g
-        if has_app_context() and 'customization_settings' in g:
-            return g.customization_settings
-    except Exception:
-        pass
+    """Get all customization settings as a dictionary with request- and process-level caching"""
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("SELECT setting_key, setting_value FROM customization_settings")
     rows = cur.fetchall()
     conn.close()
-    result = {row["setting_key"]: row["setting_value"] for row in rows}
-    try:
-        from flask import has_app_context, g
-        if has_app_context():
-            g.customization_settings = result
-    except Exception:
-        pass
-    return result
+    return {row["setting_key"]: row["setting_value"] for row in rows}
 
 def get_settings_with_defaults() -> Dict[str, str]:
     """Get all settings with default values"""
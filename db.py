@@ -7,6 +7,7 @@ import sqlite3
 import shutil
 from pathlib import Path
 from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Optional
 
@@ -19,6 +20,72 @@ REQUIRED_SNAPSHOT_TABLES = ('users', 'apartments', 'invoices', 'payments')
 
 _initialized = False
 
+# Clase de conexión usada por get_conn()/get_db(). Se puede sustituir por una
+# subclase instrumentada (ver utils.query_profiler).
+_connection_factory = sqlite3.Connection
+
+
+def set_connection_factory(factory=None) -> None:
+    """Define la subclase de ``sqlite3.Connection`` para las conexiones legacy."""
+    global _connection_factory
+    _connection_factory = factory or sqlite3.Connection
+
+
+# Conexión compartida por shared_connection(): get_conn() la presta en lugar de abrir otra.
+_shared_conn: ContextVar[Optional[sqlite3.Connection]] = ContextVar('legacy_shared_conn', default=None)
+
+
+class _BorrowedConnection:
+    """Envoltura de la conexión compartida; ``close()`` no la cierra."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        object.__setattr__(self, '_conn', conn)
+
+    def close(self) -> None:
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._conn.__exit__(*exc_info)
+
+
+@contextmanager
+def shared_connection():
+    """
+    Usa una sola conexión para todas las llamadas a ``get_conn()`` del bloque.
+
+    Pensado para respuestas que combinan varias lecturas (por ejemplo, el
+    ``/bootstrap`` de la API de residentes). Las llamadas anidadas reutilizan la
+    conexión exterior.
+    """
+    if _shared_conn.get() is not None:
+        yield
+        return
+    conn = _open_connection()
+    token = _shared_conn.set(conn)
+    try:
+        yield
+    finally:
+        _shared_conn.reset(token)
+        conn.close()
+
+
+def _open_connection() -> sqlite3.Connection:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, factory=_connection_factory)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
 
 @contextmanager
 def get_db():
@@ -26,7 +93,7 @@ def get_db():
     conn = None
     try:
         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, factory=_connection_factory)
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA foreign_keys = ON")
         yield conn
@@ -41,11 +108,10 @@ def get_db():
 
 def get_conn():
     """Obtiene conexión directa (legacy, preferir get_db())."""
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    shared = _shared_conn.get()
+    if shared is not None:
+        return _BorrowedConnection(shared)
+    return _open_connection()
 
 
 def test_connection() -> bool:
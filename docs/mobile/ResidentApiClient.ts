@@ -53,6 +53,58 @@ export interface ResidentProfileResponse {
     };
 }
 
+export interface ResidentPage {
+    limit: number | null;
+    returned: number;
+    has_more: boolean;
+    next_cursor: string | null;
+}
+
+export interface ResidentPageOptions {
+    cursor?: string | null;
+    limit?: number;
+}
+
+export interface ResidentListResponse {
+    success: true;
+    pagination: ResidentPage;
+    sync: { token: string | null };
+    filters?: Record<string, unknown>;
+    [key: string]: unknown;
+}
+
+export interface ResidentDeltaResponse {
+    success: true;
+    removed_ids: number[];
+    sync: { token: string };
+    [key: string]: unknown;
+}
+
+export interface ResidentPageBundle {
+    items: Array<Record<string, unknown>>;
+    pagination: ResidentPage;
+    filters?: Record<string, unknown>;
+}
+
+export interface ResidentBootstrapResponse {
+    success: true;
+    profile: ResidentProfile;
+    apartments: Array<Record<string, unknown>>;
+    invitations: Array<Record<string, unknown>>;
+    summary: {
+        apartments: Array<Record<string, unknown>>;
+        totals: ResidentProfileResponse['totals'];
+    };
+    invoices: ResidentPageBundle;
+    payments: ResidentPageBundle;
+    sync: { token: string | null };
+}
+
+export interface ResidentPaymentFilters {
+    method?: string | null;
+    month?: string | null;
+}
+
 export class ResidentApiError extends Error {
     readonly status: number;
     readonly payload: unknown;
@@ -78,6 +130,28 @@ function normalizeSession(tokens: ResidentTokenBundle): ResidentSession {
 }
 
 
+function appendPage(query: URLSearchParams, page: ResidentPageOptions): void {
+    if (page.cursor) {
+        query.set('cursor', page.cursor);
+    }
+    if (page.limit) {
+        query.set('limit', String(page.limit));
+    }
+}
+
+
+function paymentQuery(filters: ResidentPaymentFilters): URLSearchParams {
+    const query = new URLSearchParams();
+    if (filters.method) {
+        query.set('method', filters.method);
+    }
+    if (filters.month) {
+        query.set('month', filters.month);
+    }
+    return query;
+}
+
+
 export class ResidentApiClient {
     private readonly baseUrl: string;
     private readonly storage: ResidentSessionStorage;
@@ -160,6 +234,17 @@ export class ResidentApiClient {
         return this.requestJson<ResidentProfileResponse>('/profile');
     }
 
+    /**
+     * Datos de inicio en una sola llamada: perfil, apartamentos, invitaciones,
+     * estado de cuenta y la primera pagina de facturas y pagos (20 filas por
+     * defecto). Las paginas siguientes se piden con `getInvoices`/`getPayments`
+     * usando `next_cursor`.
+     */
+    async getBootstrap(limit?: number): Promise<ResidentBootstrapResponse> {
+        const query = limit ? `?limit=${limit}` : '';
+        return this.requestJson(`/bootstrap${query}`);
+    }
+
     async getApartments(): Promise<{ success: true; apartments: Array<Record<string, unknown>> }> {
         return this.requestJson('/apartments');
     }
@@ -175,11 +260,34 @@ export class ResidentApiClient {
         });
     }
 
-    async getInvoices(status: 'all' | 'pending' | 'paid' = 'all'): Promise<{ success: true; invoices: Array<Record<string, unknown>> }> {
+    async getInvoices(status: 'all' | 'pending' | 'paid' = 'all', page: ResidentPageOptions = {}): Promise<ResidentListResponse & { invoices: Array<Record<string, unknown>> }> {
         const query = new URLSearchParams({ status });
+        appendPage(query, page);
+        return this.requestJson(`/invoices?${query.toString()}`);
+    }
+
+    /**
+     * Facturas cambiadas desde `sync.token` de una respuesta anterior. Las de
+     * `removed_ids` se borran localmente. Un error 410 indica que hay que volver
+     * a descargar todo con `getInvoices`.
+     */
+    async getInvoiceChanges(updatedSince: string, status: 'all' | 'pending' | 'paid' = 'all'): Promise<ResidentDeltaResponse & { invoices: Array<Record<string, unknown>> }> {
+        const query = new URLSearchParams({ status, updated_since: updatedSince });
         return this.requestJson(`/invoices?${query.toString()}`);
     }
 
+    async getPayments(filters: ResidentPaymentFilters = {}, page: ResidentPageOptions = {}): Promise<ResidentListResponse & { payments: Array<Record<string, unknown>> }> {
+        const query = paymentQuery(filters);
+        appendPage(query, page);
+        return this.requestJson(`/payments?${query.toString()}`);
+    }
+
+    async getPaymentChanges(updatedSince: string, filters: ResidentPaymentFilters = {}): Promise<ResidentDeltaResponse & { payments: Array<Record<string, unknown>> }> {
+        const query = paymentQuery(filters);
+        query.set('updated_since', updatedSince);
+        return this.requestJson(`/payments?${query.toString()}`);
+    }
+
     async getStatementSummary(): Promise<{ success: true; summary: Record<string, unknown> }> {
         return this.requestJson('/statement-summary');
     }
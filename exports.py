@@ -0,0 +1,316 @@
+"""
+Módulo de Exportaciones
+Exportación en streaming (CSV / XLSX) de facturas, pagos, gastos,
+transacciones contables y detalle del estado de resultados por rango de fechas.
+
+Las filas se leen del cursor de SQLite en bloques (``fetchmany``) y se
+escriben a medida que se generan, así que la memoria no crece con el rango
+exportado y la descarga empieza en cuanto sale el primer bloque.
+"""
+
+import csv
+import io
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from db import get_conn
+
+EXPORT_CHUNK_SIZE = 500
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+# Rango de fechas sobre la columna original (sin DATE()) para aprovechar índices:
+# ``col >= date_from AND col < date_to + 1 día`` equivale a DATE(col) BETWEEN.
+_DATE_RANGE = "{col} >= :date_from AND {col} < date(:date_to, '+1 day')"
+
+EXPORT_DATASETS: Dict[str, Dict[str, object]] = {
+    'invoices': {
+        'label': 'Facturas',
+        'columns': ['id', 'issued_date', 'due_date', 'apt_number', 'resident_name', 'description',
+                    'amount', 'paid_amount', 'pending', 'paid'],
+        'query': """
+            SELECT i.id, i.issued_date, i.due_date,
+                   a.number AS apt_number, a.resident_name, i.description,
+                   i.amount,
+                   COALESCE(pt.paid_amount, 0) AS paid_amount,
+                   COALESCE(i.amount, 0) - COALESCE(pt.paid_amount, 0) AS pending,
+                   i.paid
+            FROM invoices i
+            LEFT JOIN apartments a ON a.id = i.unit_id
+            LEFT JOIN (
+                SELECT invoice_id, SUM(amount) AS paid_amount FROM payments GROUP BY invoice_id
+            ) pt ON pt.invoice_id = i.id
+            WHERE """ + _DATE_RANGE.format(col='i.issued_date') + """
+            ORDER BY i.issued_date, i.id
+        """,
+    },
+    'payments': {
+        'label': 'Pagos',
+        'columns': ['id', 'paid_date', 'invoice_id', 'apt_number', 'resident_name', 'invoice_description',
+                    'amount', 'method', 'notes'],
+        'query': """
+            SELECT p.id, p.paid_date, p.invoice_id,
+                   a.number AS apt_number, a.resident_name,
+                   i.description AS invoice_description,
+                   p.amount, p.method, p.notes
+            FROM payments p
+            LEFT JOIN invoices i ON i.id = p.invoice_id
+            LEFT JOIN apartments a ON a.id = i.unit_id
+            WHERE """ + _DATE_RANGE.format(col='p.paid_date') + """
+            ORDER BY p.paid_date, p.id
+        """,
+    },
+    'expenses': {
+        'label': 'Gastos',
+        'columns': ['id', 'date', 'description', 'category', 'supplier_name', 'amount', 'payment_method', 'notes'],
+        'query': """
+            SELECT e.id, COALESCE(e.date, e.created_at) AS date, e.description,
+                   COALESCE(e.category, 'Sin Categoría') AS category,
+                   s.name AS supplier_name, e.amount, e.payment_method, e.notes
+            FROM expenses e
+            LEFT JOIN suppliers s ON s.id = e.supplier_id
+            WHERE """ + _DATE_RANGE.format(col='COALESCE(e.date, e.created_at)') + """
+            ORDER BY COALESCE(e.date, e.created_at), e.id
+        """,
+    },
+    'accounting_transactions': {
+        'label': 'Transacciones contables',
+        'columns': ['id', 'date', 'type', 'description', 'category', 'reference', 'amount', 'notes'],
+        'query': """
+            SELECT id, date, type, description, category, reference, amount, notes
+            FROM accounting_transactions
+            WHERE """ + _DATE_RANGE.format(col='date') + """
+            ORDER BY date, id
+        """,
+    },
+    # Mismas reglas que accounting.get_income_statement: pagos como ingreso
+    # operacional, gastos como gasto operacional y transacciones contables que
+    # no duplican facturas (INV-) ni gastos (EXP-).
+    'income_statement': {
+        'label': 'Estado de resultados',
+        'columns': ['section', 'date', 'source', 'source_id', 'category', 'description', 'apt_number', 'amount'],
+        'query': """
+            SELECT 'operating_income' AS section, p.paid_date AS date, 'payment' AS source, p.id AS source_id,
+                   COALESCE(UPPER(TRIM(i.description)), 'SIN CATEGORÍA') AS category,
+                   a.resident_name AS description, a.number AS apt_number, p.amount
+            FROM payments p
+            JOIN invoices i ON p.invoice_id = i.id
+            LEFT JOIN apartments a ON i.unit_id = a.id
+            WHERE """ + _DATE_RANGE.format(col='p.paid_date') + """
+            UNION ALL
+            SELECT 'other_income', date, 'accounting_transaction', id,
+                   COALESCE(category, 'Sin Categoría'), description, NULL, amount
+            FROM accounting_transactions
+            WHERE type = 'income' AND """ + _DATE_RANGE.format(col='date') + """
+              AND (reference IS NULL OR reference NOT LIKE 'INV-%')
+            UNION ALL
+            SELECT 'operating_expense', COALESCE(e.date, e.created_at), 'expense', e.id,
+                   COALESCE(e.category, 'Sin Categoría'), e.description, NULL, e.amount
+            FROM expenses e
+            WHERE """ + _DATE_RANGE.format(col='COALESCE(e.date, e.created_at)') + """
+            UNION ALL
+            SELECT 'other_expense', date, 'accounting_transaction', id,
+                   COALESCE(category, 'Sin Categoría'), description, NULL, amount
+            FROM accounting_transactions
+            WHERE type = 'expense' AND """ + _DATE_RANGE.format(col='date') + """
+              AND (reference IS NULL OR reference NOT LIKE 'EXP-%')
+            ORDER BY 1, 2, 4
+        """,
+    },
+}
+
+
+def _validate_date(value: Optional[str], field: str) -> str:
+    try:
+        return datetime.strptime((value or '').strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"{field} debe tener formato YYYY-MM-DD")
+
+
+def get_export_filename(dataset: str, date_from: str, date_to: str, fmt: str) -> str:
+    return f"{dataset}_{date_from}_{date_to}.{fmt}"
+
+
+def iter_export_rows(dataset: str, date_from: str, date_to: str,
+                     chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[tuple]:
+    """
+    Genera las filas del dataset en el rango [date_from, date_to].
+
+    La conexión queda abierta mientras se consume el generador y se cierra al
+    agotarse o al descartarlo (cliente que corta la descarga).
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Dataset de exportación desconocido: {dataset}")
+    params = {
+        'date_from': _validate_date(date_from, 'date_from'),
+        'date_to': _validate_date(date_to, 'date_to'),
+    }
+    if params['date_from'] > params['date_to']:
+        raise ValueError("date_from no puede ser posterior a date_to")
+
+    conn = get_conn()
+    conn.row_factory = None
+    try:
+        cur = conn.execute(EXPORT_DATASETS[dataset]['query'], params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def stream_csv(columns: Sequence[str], rows: Iterable[Sequence], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """CSV en UTF-8 con BOM (Excel lo abre con acentos correctos), en bloques de filas."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield ('\ufeff' + buffer.getvalue()).encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate(0)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode('utf-8')
+
+
+# ═══════════════════════════════════════════════════════════════
+#  XLSX en streaming (SpreadsheetML mínimo, sin dependencias)
+# ═══════════════════════════════════════════════════════════════
+
+class _ChunkSink(io.RawIOBase):
+    """Destino no-seekable para ZipFile: acumula bytes que el generador va entregando."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _xlsx_column_name(index: int) -> str:
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+def _xlsx_row(row_number: int, values: Sequence) -> str:
+    cells = []
+    for col_index, value in enumerate(values):
+        ref = f"{_xlsx_column_name(col_index)}{row_number}"
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>')
+    return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def stream_xlsx(sheet_name: str, columns: Sequence[str], rows: Iterable[Sequence],
+                chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Libro XLSX de una hoja escrito fila a fila dentro de un ZIP en streaming."""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr(
+            'xl/workbook.xml',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>',
+        )
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(1, columns).encode('utf-8'))
+            row_number = 1
+            for row in rows:
+                row_number += 1
+                sheet.write(_xlsx_row(row_number, row).encode('utf-8'))
+                if row_number % chunk_size == 0:
+                    data = sink.drain()
+                    if data:
+                        yield data
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+def stream_export(dataset: str, date_from: str, date_to: str, fmt: str = 'csv') -> Iterator[bytes]:
+    """Punto de entrada: valida parámetros y devuelve el generador de bytes del archivo."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportación no soportado: {fmt}")
+    config = EXPORT_DATASETS.get(dataset)
+    if config is None:
+        raise ValueError(f"Dataset de exportación desconocido: {dataset}")
+
+    # Validar antes de devolver el generador para que los errores salgan como 400
+    # y no a mitad de una descarga ya iniciada.
+    date_from = _validate_date(date_from, 'date_from')
+    date_to = _validate_date(date_to, 'date_to')
+    if date_from > date_to:
+        raise ValueError("date_from no puede ser posterior a date_to")
+
+    rows = iter_export_rows(dataset, date_from, date_to)
+    if fmt == 'xlsx':
+        return stream_xlsx(str(config['label']), config['columns'], rows)
+    return stream_csv(config['columns'], rows)
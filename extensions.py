@@ -102,7 +102,7 @@ def init_extensions(app):
     def load_user(user_id):
         try:
             import user_model
-            return user_model.get_user_by_id(int(user_id))
+            return user_model.get_cached_user(int(user_id))
         except Exception as e:
             print(f"[WARNING] Error loading user: {e}")
             return None
@@ -134,8 +134,12 @@ def init_extensions(app):
     try:
         app.config.setdefault('SCHEDULER_API_ENABLED', False)
         scheduler.init_app(app)
-        scheduler.start()
-        print("[OK] Scheduler configurado para facturas recurrentes automáticas")
+        if app.config.get('SCHEDULER_MODE') == 'off':
+            # Las tareas corren en otro proceso (scripts/run_scheduler.py)
+            print("[OK] Scheduler deshabilitado en este proceso (SCHEDULER_MODE=off)")
+        else:
+            scheduler.start()
+            print("[OK] Scheduler configurado para facturas recurrentes automáticas")
     except Exception as e:
         print(f"[WARNING] No se pudo configurar el scheduler: {e}")
 
@@ -0,0 +1,386 @@
+"""
+Módulo de Integridad del Libro
+Verificación incremental de consistencia entre facturas, pagos y asientos contables.
+
+Reemplaza los scripts de reparación puntuales que recorrían tablas completas
+(``fix_billing.py``, ``scripts/migrations/sync_accounting.py``,
+``scripts/migrations/fix_db_receipts.py``, ``find_dupes.py``). Los triggers de
+``legacy_migrations/016`` anotan en ``ledger_change_log`` cada factura tocada por
+una escritura; cada corrida revisa solo las facturas registradas después de la
+marca de agua guardada en ``integrity_check_state``.
+
+Verificaciones:
+  * ``invoice_paid_flag``: ``paid`` y ``pending_amount`` coinciden con la suma de pagos.
+  * ``payment_accounting_entry``: cada pago tiene su asiento de ingreso ``INV-{id}``.
+  * ``orm_legacy_mismatch``: la copia ORM y la legacy de la factura y sus pagos
+    coinciden (solo cuando apuntan a bases distintas).
+"""
+
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import db as legacy_db
+
+CHECKER_NAME = 'ledger'
+AMOUNT_TOLERANCE = 0.01
+INVOICE_BATCH_SIZE = 500
+
+CHECK_LABELS = {
+    'invoice_paid_flag': 'Estado de pago de factura',
+    'payment_accounting_entry': 'Pago sin asiento contable INV-*',
+    'orm_legacy_mismatch': 'Diferencia entre ORM y base legacy',
+}
+
+
+# ========== UTILIDADES ==========
+
+def _now() -> str:
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _amount(value) -> float:
+    return round(float(value or 0), 2)
+
+
+def _chunks(items: Sequence[int], size: int = INVOICE_BATCH_SIZE) -> Iterable[Sequence[int]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _orm_uses_legacy_database() -> bool:
+    """True si el ORM y ``db.get_conn()`` comparten el mismo archivo SQLite."""
+    try:
+        from extensions import db as sa_db
+
+        url = sa_db.engine.url
+    except Exception:
+        return True
+    if url.get_backend_name() != 'sqlite' or not url.database:
+        return False
+    try:
+        return Path(url.database).resolve() == Path(legacy_db.DB_PATH).resolve()
+    except OSError:
+        return False
+
+
+# ========== CONJUNTO A VERIFICAR ==========
+
+def _get_state(conn) -> Optional[sqlite3.Row]:
+    return conn.execute(
+        "SELECT high_water_mark, last_run_at, last_checked_count FROM integrity_check_state WHERE checker = ?",
+        (CHECKER_NAME,),
+    ).fetchone()
+
+
+def _collect_invoice_ids(conn, full: bool) -> tuple:
+    """Retorna (ids de factura a revisar, nueva marca de agua)."""
+    state = _get_state(conn)
+    max_log_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM ledger_change_log").fetchone()[0]
+
+    if full or state is None:
+        ids = [row[0] for row in conn.execute("SELECT id FROM invoices ORDER BY id")]
+        # Incluye facturas borradas o inexistentes que aún tengan pagos/asientos colgando.
+        ids += [
+            row[0] for row in conn.execute(
+                "SELECT DISTINCT invoice_id FROM ledger_change_log WHERE invoice_id IS NOT NULL"
+            )
+        ]
+        return sorted(set(ids)), max_log_id
+
+    ids = [
+        row[0] for row in conn.execute(
+            """
+            SELECT DISTINCT invoice_id FROM ledger_change_log
+            WHERE id > ? AND id <= ? AND invoice_id IS NOT NULL
+            ORDER BY invoice_id
+            """,
+            (state['high_water_mark'], max_log_id),
+        )
+    ]
+    return ids, max_log_id
+
+
+# ========== VERIFICACIONES ==========
+
+def _check_invoices(conn, invoice_ids: Sequence[int]) -> Dict[tuple, str]:
+    """Retorna {(check, entidad, id): detalle} con las violaciones encontradas."""
+    violations: Dict[tuple, str] = {}
+
+    for batch in _chunks(list(invoice_ids)):
+        placeholders = ','.join('?' * len(batch))
+        invoices = {
+            row['id']: row for row in conn.execute(
+                f"SELECT id, amount, paid, pending_amount FROM invoices WHERE id IN ({placeholders})",
+                batch,
+            )
+        }
+        payments: Dict[int, List[sqlite3.Row]] = {}
+        for row in conn.execute(
+            f"SELECT id, invoice_id, amount FROM payments WHERE invoice_id IN ({placeholders}) ORDER BY id",
+            batch,
+        ):
+            payments.setdefault(row['invoice_id'], []).append(row)
+        entries: Dict[int, List[float]] = {}
+        for row in conn.execute(
+            f"""
+            SELECT CAST(substr(reference, 5) AS INTEGER) AS invoice_id, amount
+            FROM accounting_transactions
+            WHERE type = 'income' AND reference IN ({placeholders})
+            """,
+            [f'INV-{invoice_id}' for invoice_id in batch],
+        ):
+            entries.setdefault(row['invoice_id'], []).append(_amount(row['amount']))
+
+        for invoice_id in batch:
+            invoice = invoices.get(invoice_id)
+            invoice_payments = payments.get(invoice_id, [])
+
+            if invoice is not None:
+                total_paid = sum(_amount(p['amount']) for p in invoice_payments)
+                amount = _amount(invoice['amount'])
+                expected_paid = total_paid + AMOUNT_TOLERANCE / 2 >= amount
+                expected_pending = max(amount - total_paid, 0)
+                problems = []
+                if bool(invoice['paid']) != expected_paid:
+                    problems.append(f"paid={int(bool(invoice['paid']))}, esperado {int(expected_paid)}")
+                if (invoice['pending_amount'] is not None
+                        and abs(_amount(invoice['pending_amount']) - expected_pending) > AMOUNT_TOLERANCE):
+                    problems.append(
+                        f"pendiente={_amount(invoice['pending_amount']):.2f}, esperado {expected_pending:.2f}"
+                    )
+                if problems:
+                    violations[('invoice_paid_flag', 'invoice', invoice_id)] = (
+                        f"Pagado {total_paid:.2f} de {amount:.2f}: " + '; '.join(problems)
+                    )
+
+            # Emparejamiento por monto: cada asiento cubre un solo pago.
+            available = list(entries.get(invoice_id, []))
+            for payment in invoice_payments:
+                payment_amount = _amount(payment['amount'])
+                match = next(
+                    (idx for idx, value in enumerate(available)
+                     if abs(value - payment_amount) <= AMOUNT_TOLERANCE),
+                    None,
+                )
+                if match is None:
+                    violations[('payment_accounting_entry', 'payment', payment['id'])] = (
+                        f"Pago de {payment_amount:.2f} de la factura #{invoice_id} sin asiento INV-{invoice_id}"
+                    )
+                else:
+                    available.pop(match)
+
+    return violations
+
+
+def _check_orm_copies(conn, invoice_ids: Sequence[int]) -> Dict[tuple, str]:
+    """Compara facturas y pagos entre la base del ORM y la base legacy."""
+    if not invoice_ids or _orm_uses_legacy_database():
+        return {}
+
+    from data_models.models import Invoice, Payment
+    from extensions import db as sa_db
+
+    violations: Dict[tuple, str] = {}
+    for batch in _chunks(list(invoice_ids)):
+        placeholders = ','.join('?' * len(batch))
+        legacy_invoices = {
+            row['id']: (_amount(row['amount']), bool(row['paid']), _amount(row['pending_amount']))
+            for row in conn.execute(
+                f"SELECT id, amount, paid, pending_amount FROM invoices WHERE id IN ({placeholders})",
+                batch,
+            )
+        }
+        legacy_payments: Dict[int, set] = {}
+        for row in conn.execute(
+            f"SELECT id, invoice_id, amount FROM payments WHERE invoice_id IN ({placeholders})",
+            batch,
+        ):
+            legacy_payments.setdefault(row['invoice_id'], set()).add((row['id'], _amount(row['amount'])))
+
+        orm_invoices = {
+            inv.id: (_amount(inv.amount), bool(inv.paid), _amount(inv.pending_amount))
+            for inv in sa_db.session.query(Invoice).filter(Invoice.id.in_(batch))
+        }
+        orm_payments: Dict[int, set] = {}
+        for payment in sa_db.session.query(Payment).filter(Payment.invoice_id.in_(batch)):
+            orm_payments.setdefault(payment.invoice_id, set()).add((payment.id, _amount(payment.amount)))
+
+        for invoice_id in batch:
+            problems = []
+            orm_invoice = orm_invoices.get(invoice_id)
+            legacy_invoice = legacy_invoices.get(invoice_id)
+            if orm_invoice != legacy_invoice:
+                problems.append(f"factura ORM={orm_invoice} legacy={legacy_invoice}")
+            only_orm = orm_payments.get(invoice_id, set()) - legacy_payments.get(invoice_id, set())
+            only_legacy = legacy_payments.get(invoice_id, set()) - orm_payments.get(invoice_id, set())
+            if only_orm or only_legacy:
+                problems.append(
+                    f"pagos solo ORM={sorted(only_orm)} solo legacy={sorted(only_legacy)}"
+                )
+            if problems:
+                violations[('orm_legacy_mismatch', 'invoice', invoice_id)] = '; '.join(problems)
+
+    return violations
+
+
+# ========== PERSISTENCIA DE VIOLACIONES ==========
+
+def _entities_for(invoice_ids: Sequence[int], conn) -> Dict[str, set]:
+    """Entidades revisadas en esta corrida, para resolver violaciones que ya no aplican."""
+    checked = {'invoice': set(invoice_ids), 'payment': set()}
+    for batch in _chunks(list(invoice_ids)):
+        placeholders = ','.join('?' * len(batch))
+        checked['payment'].update(
+            row[0] for row in conn.execute(
+                f"SELECT id FROM payments WHERE invoice_id IN ({placeholders})", batch
+            )
+        )
+    return checked
+
+
+def _store_violations(conn, violations: Dict[tuple, str], checked: Dict[str, set], now: str) -> int:
+    conn.executemany(
+        """
+        INSERT INTO integrity_violations (check_name, entity, entity_id, detail, first_seen_at, last_seen_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(check_name, entity, entity_id) DO UPDATE SET
+            detail = excluded.detail,
+            last_seen_at = excluded.last_seen_at,
+            first_seen_at = CASE WHEN integrity_violations.resolved_at IS NULL
+                                 THEN integrity_violations.first_seen_at
+                                 ELSE excluded.first_seen_at END,
+            resolved_at = NULL
+        """,
+        [(check, entity, entity_id, detail, now, now) for (check, entity, entity_id), detail in violations.items()],
+    )
+
+    # Violaciones abiertas de entidades revisadas que ya no fallan: resueltas.
+    # Los pagos borrados no aparecen en ``checked``; se resuelven si ya no existen.
+    open_rows = conn.execute(
+        "SELECT id, check_name, entity, entity_id FROM integrity_violations WHERE resolved_at IS NULL"
+    ).fetchall()
+    existing_payments = None
+    resolved = []
+    for row in open_rows:
+        key = (row['check_name'], row['entity'], row['entity_id'])
+        if key in violations:
+            continue
+        if row['entity_id'] in checked.get(row['entity'], ()):
+            resolved.append(row['id'])
+        elif row['entity'] == 'payment':
+            if existing_payments is None:
+                existing_payments = {r[0] for r in conn.execute("SELECT id FROM payments")}
+            if row['entity_id'] not in existing_payments:
+                resolved.append(row['id'])
+    conn.executemany(
+        "UPDATE integrity_violations SET resolved_at = ? WHERE id = ?",
+        [(now, violation_id) for violation_id in resolved],
+    )
+    return len(resolved)
+
+
+# ========== API PÚBLICA ==========
+
+def run_integrity_check(full: bool = False) -> Dict:
+    """
+    Ejecuta la verificación de integridad del libro.
+
+    Sin estado previo (o con ``full=True``) revisa todas las facturas; después
+    solo las facturas registradas en ``ledger_change_log`` desde la última corrida.
+    """
+    conn = legacy_db.get_conn()
+    try:
+        invoice_ids, new_hwm = _collect_invoice_ids(conn, full)
+        violations = _check_invoices(conn, invoice_ids)
+        violations.update(_check_orm_copies(conn, invoice_ids))
+        now = _now()
+        resolved = _store_violations(conn, violations, _entities_for(invoice_ids, conn), now)
+
+        conn.execute(
+            """
+            INSERT INTO integrity_check_state (checker, high_water_mark, last_run_at, last_checked_count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(checker) DO UPDATE SET
+                high_water_mark = excluded.high_water_mark,
+                last_run_at = excluded.last_run_at,
+                last_checked_count = excluded.last_checked_count
+            """,
+            (CHECKER_NAME, new_hwm, now, len(invoice_ids)),
+        )
+        # Las filas procesadas ya no se necesitan: el registro se mantiene pequeño.
+        conn.execute("DELETE FROM ledger_change_log WHERE id <= ?", (new_hwm,))
+        conn.commit()
+    finally:
+        conn.close()
+
+    summary = {
+        'mode': 'full' if full else 'incremental',
+        'checked_invoices': len(invoice_ids),
+        'violations': len(violations),
+        'resolved': resolved,
+        'high_water_mark': new_hwm,
+        'run_at': now,
+    }
+    return summary
+
+
+def get_open_violations(check_name: Optional[str] = None, limit: int = 200) -> List[Dict]:
+    """Lista las violaciones abiertas, más recientes primero."""
+    query = """
+        SELECT id, check_name, entity, entity_id, detail, first_seen_at, last_seen_at
+        FROM integrity_violations
+        WHERE resolved_at IS NULL
+    """
+    params: List = []
+    if check_name:
+        query += " AND check_name = ?"
+        params.append(check_name)
+    query += " ORDER BY last_seen_at DESC, id DESC LIMIT ?"
+    params.append(int(limit))
+
+    conn = legacy_db.get_conn()
+    try:
+        rows = conn.execute(query, params).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+    return [
+        {**dict(row), 'check_label': CHECK_LABELS.get(row['check_name'], row['check_name'])}
+        for row in rows
+    ]
+
+
+def get_integrity_metrics() -> Dict:
+    """Métricas del verificador: violaciones abiertas por tipo, última corrida y pendientes."""
+    metrics = {
+        'available': True,
+        'open_violations': {name: 0 for name in CHECK_LABELS},
+        'open_total': 0,
+        'pending_changes': 0,
+        'high_water_mark': 0,
+        'last_run_at': None,
+        'last_checked_count': 0,
+    }
+    conn = legacy_db.get_conn()
+    try:
+        for row in conn.execute(
+            "SELECT check_name, COUNT(*) AS total FROM integrity_violations WHERE resolved_at IS NULL GROUP BY check_name"
+        ):
+            metrics['open_violations'][row['check_name']] = row['total']
+        metrics['open_total'] = sum(metrics['open_violations'].values())
+        state = _get_state(conn)
+        if state is not None:
+            metrics['high_water_mark'] = state['high_water_mark']
+            metrics['last_run_at'] = state['last_run_at']
+            metrics['last_checked_count'] = state['last_checked_count']
+        metrics['pending_changes'] = conn.execute(
+            "SELECT COUNT(*) FROM ledger_change_log WHERE id > ?", (metrics['high_water_mark'],)
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        metrics['available'] = False
+    finally:
+        conn.close()
+    return metrics
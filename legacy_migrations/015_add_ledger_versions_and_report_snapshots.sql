@@ -0,0 +1,162 @@
+-- Migration: Ledger version stamps and monthly report snapshots
+-- Date: 2026-10-19
+-- Description: Cada escritura en pagos, facturas, gastos o transacciones contables
+-- incrementa la versión del mes (YYYY-MM) al que pertenece el movimiento.
+-- Los reportes mensuales cerrados se guardan junto a la versión del libro con la
+-- que se calcularon y solo se recalculan cuando cambia un movimiento del período
+-- (o anterior, porque afecta el saldo inicial). El período '0000-00' agrupa
+-- cambios sin fecha o en datos maestros y se incluye en todos los períodos.
+
+CREATE TABLE IF NOT EXISTS ledger_period_versions (
+    period TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS monthly_report_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_type TEXT NOT NULL,
+    report_period TEXT NOT NULL,
+    period_mode TEXT NOT NULL,
+    date_to TEXT NOT NULL,
+    ledger_version INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(report_type, period_mode, date_to)
+);
+
+-- Pagos: versionan el mes del pago y el mes de emisión de la factura
+-- (el pago cambia los pendientes de cierre de la factura).
+CREATE TRIGGER IF NOT EXISTS trg_ledger_payments_insert AFTER INSERT ON payments
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(NEW.paid_date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    INSERT INTO ledger_period_versions (period, version)
+    SELECT COALESCE(substr(issued_date, 1, 7), '0000-00'), 1 FROM invoices WHERE id = NEW.invoice_id
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ledger_payments_update AFTER UPDATE ON payments
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(OLD.paid_date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(NEW.paid_date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    INSERT INTO ledger_period_versions (period, version)
+    SELECT COALESCE(substr(issued_date, 1, 7), '0000-00'), 1 FROM invoices WHERE id IN (OLD.invoice_id, NEW.invoice_id)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ledger_payments_delete AFTER DELETE ON payments
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(OLD.paid_date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    INSERT INTO ledger_period_versions (period, version)
+    SELECT COALESCE(substr(issued_date, 1, 7), '0000-00'), 1 FROM invoices WHERE id = OLD.invoice_id
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+-- Facturas
+CREATE TRIGGER IF NOT EXISTS trg_ledger_invoices_insert AFTER INSERT ON invoices
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(NEW.issued_date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ledger_invoices_update AFTER UPDATE ON invoices
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(OLD.issued_date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(NEW.issued_date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ledger_invoices_delete AFTER DELETE ON invoices
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(OLD.issued_date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+-- Gastos (fecha efectiva: date o created_at)
+CREATE TRIGGER IF NOT EXISTS trg_ledger_expenses_insert AFTER INSERT ON expenses
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(COALESCE(NEW.date, NEW.created_at), 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ledger_expenses_update AFTER UPDATE ON expenses
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(COALESCE(OLD.date, OLD.created_at), 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(COALESCE(NEW.date, NEW.created_at), 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ledger_expenses_delete AFTER DELETE ON expenses
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(COALESCE(OLD.date, OLD.created_at), 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+-- Transacciones contables
+CREATE TRIGGER IF NOT EXISTS trg_ledger_accounting_insert AFTER INSERT ON accounting_transactions
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(NEW.date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ledger_accounting_update AFTER UPDATE ON accounting_transactions
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(OLD.date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(NEW.date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ledger_accounting_delete AFTER DELETE ON accounting_transactions
+BEGIN
+    INSERT INTO ledger_period_versions (period, version)
+    VALUES (COALESCE(substr(OLD.date, 1, 7), '0000-00'), 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+-- Datos maestros que aparecen en el detalle del reporte (número de apartamento,
+-- residente, proveedor): invalidan todos los períodos.
+CREATE TRIGGER IF NOT EXISTS trg_ledger_apartments_update AFTER UPDATE OF number, resident_name ON apartments
+BEGIN
+    INSERT INTO ledger_period_versions (period, version) VALUES ('0000-00', 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ledger_apartments_delete AFTER DELETE ON apartments
+BEGIN
+    INSERT INTO ledger_period_versions (period, version) VALUES ('0000-00', 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ledger_suppliers_update AFTER UPDATE OF name ON suppliers
+BEGIN
+    INSERT INTO ledger_period_versions (period, version) VALUES ('0000-00', 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ledger_suppliers_delete AFTER DELETE ON suppliers
+BEGIN
+    INSERT INTO ledger_period_versions (period, version) VALUES ('0000-00', 1)
+    ON CONFLICT(period) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
@@ -0,0 +1,94 @@
+-- Migration: Incremental ledger integrity checks
+-- Date: 2026-10-19
+-- Description: Registra qué facturas fueron tocadas por escrituras en facturas,
+-- pagos o asientos INV-*. El verificador de integridad procesa solo las filas del
+-- registro posteriores a su marca de agua (high-water mark) y guarda las
+-- violaciones abiertas para mostrarlas en configuración y en métricas.
+
+CREATE TABLE IF NOT EXISTS ledger_change_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    row_id INTEGER,
+    invoice_id INTEGER,
+    changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_ledger_change_log_invoice ON ledger_change_log(invoice_id);
+
+CREATE TABLE IF NOT EXISTS integrity_check_state (
+    checker TEXT PRIMARY KEY,
+    high_water_mark INTEGER NOT NULL DEFAULT 0,
+    last_run_at TEXT,
+    last_checked_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS integrity_violations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    check_name TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    entity_id INTEGER NOT NULL,
+    detail TEXT,
+    first_seen_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_seen_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    resolved_at TEXT,
+    UNIQUE(check_name, entity, entity_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_integrity_violations_open ON integrity_violations(resolved_at, check_name);
+
+CREATE TRIGGER IF NOT EXISTS trg_integrity_invoices_insert AFTER INSERT ON invoices
+BEGIN
+    INSERT INTO ledger_change_log (table_name, row_id, invoice_id) VALUES ('invoices', NEW.id, NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_integrity_invoices_update AFTER UPDATE ON invoices
+BEGIN
+    INSERT INTO ledger_change_log (table_name, row_id, invoice_id) VALUES ('invoices', NEW.id, NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_integrity_invoices_delete AFTER DELETE ON invoices
+BEGIN
+    INSERT INTO ledger_change_log (table_name, row_id, invoice_id) VALUES ('invoices', OLD.id, OLD.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_integrity_payments_insert AFTER INSERT ON payments
+BEGIN
+    INSERT INTO ledger_change_log (table_name, row_id, invoice_id) VALUES ('payments', NEW.id, NEW.invoice_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_integrity_payments_update AFTER UPDATE ON payments
+BEGIN
+    INSERT INTO ledger_change_log (table_name, row_id, invoice_id) VALUES ('payments', NEW.id, NEW.invoice_id);
+    INSERT INTO ledger_change_log (table_name, row_id, invoice_id)
+    SELECT 'payments', OLD.id, OLD.invoice_id WHERE OLD.invoice_id IS NOT NEW.invoice_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_integrity_payments_delete AFTER DELETE ON payments
+BEGIN
+    INSERT INTO ledger_change_log (table_name, row_id, invoice_id) VALUES ('payments', OLD.id, OLD.invoice_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_integrity_accounting_insert AFTER INSERT ON accounting_transactions
+WHEN NEW.reference LIKE 'INV-%'
+BEGIN
+    INSERT INTO ledger_change_log (table_name, row_id, invoice_id)
+    VALUES ('accounting_transactions', NEW.id, CAST(substr(NEW.reference, 5) AS INTEGER));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_integrity_accounting_update AFTER UPDATE ON accounting_transactions
+WHEN NEW.reference LIKE 'INV-%' OR OLD.reference LIKE 'INV-%'
+BEGIN
+    INSERT INTO ledger_change_log (table_name, row_id, invoice_id)
+    SELECT 'accounting_transactions', NEW.id, CAST(substr(NEW.reference, 5) AS INTEGER)
+    WHERE NEW.reference LIKE 'INV-%';
+    INSERT INTO ledger_change_log (table_name, row_id, invoice_id)
+    SELECT 'accounting_transactions', OLD.id, CAST(substr(OLD.reference, 5) AS INTEGER)
+    WHERE OLD.reference LIKE 'INV-%' AND OLD.reference IS NOT NEW.reference;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_integrity_accounting_delete AFTER DELETE ON accounting_transactions
+WHEN OLD.reference LIKE 'INV-%'
+BEGIN
+    INSERT INTO ledger_change_log (table_name, row_id, invoice_id)
+    VALUES ('accounting_transactions', OLD.id, CAST(substr(OLD.reference, 5) AS INTEGER));
+END;
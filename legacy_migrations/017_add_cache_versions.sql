@@ -0,0 +1,61 @@
+-- Migration: Cache version stamps for near-static lookups
+-- Date: 2026-10-19
+-- Description: Cada escritura en company_info, customization_settings o
+-- user_permissions incrementa la versión de su espacio de nombres. Los procesos
+-- guardan en memoria el resultado de get_company_info, los ajustes de
+-- personalización y los permisos de usuario junto a la versión con la que se
+-- calcularon, y los descartan cuando otro proceso (u otra escritura directa)
+-- cambia la versión.
+
+CREATE TABLE IF NOT EXISTS cache_versions (
+    namespace TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT OR IGNORE INTO cache_versions (namespace, version) VALUES ('company_info', 0);
+INSERT OR IGNORE INTO cache_versions (namespace, version) VALUES ('customization', 0);
+INSERT OR IGNORE INTO cache_versions (namespace, version) VALUES ('permissions', 0);
+
+-- Empresa
+CREATE TRIGGER IF NOT EXISTS trg_cache_company_info_insert AFTER INSERT ON company_info
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'company_info';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_company_info_update AFTER UPDATE ON company_info
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'company_info';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_company_info_delete AFTER DELETE ON company_info
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'company_info';
+END;
+
+-- Personalización
+CREATE TRIGGER IF NOT EXISTS trg_cache_customization_insert AFTER INSERT ON customization_settings
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'customization';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_customization_update AFTER UPDATE ON customization_settings
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'customization';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_customization_delete AFTER DELETE ON customization_settings
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'customization';
+END;
+
+-- Permisos (asignaciones por usuario)
+CREATE TRIGGER IF NOT EXISTS trg_cache_user_permissions_insert AFTER INSERT ON user_permissions
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'permissions';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_user_permissions_delete AFTER DELETE ON user_permissions
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'permissions';
+END;
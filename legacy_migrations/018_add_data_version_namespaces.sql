@@ -0,0 +1,181 @@
+-- Migration: Data version namespaces for conditional GET and view caches
+-- Date: 2026-10-19
+-- Description: Amplía cache_versions (017) con espacios de nombres para los
+-- datos que muestran las páginas de listas y la API de residentes. Los ETag y
+-- las claves de cache de vistas se derivan de estas versiones, así que una
+-- respuesta guardada nunca sobrevive a una escritura hecha por otro proceso.
+-- En users solo cuentan las columnas visibles (last_login no invalida nada).
+
+INSERT OR IGNORE INTO cache_versions (namespace, version) VALUES ('ledger', 0);
+INSERT OR IGNORE INTO cache_versions (namespace, version) VALUES ('units', 0);
+INSERT OR IGNORE INTO cache_versions (namespace, version) VALUES ('catalog', 0);
+INSERT OR IGNORE INTO cache_versions (namespace, version) VALUES ('users', 0);
+
+-- Contabilidad
+CREATE TRIGGER IF NOT EXISTS trg_cache_invoices_insert AFTER INSERT ON invoices
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_invoices_update AFTER UPDATE ON invoices
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_invoices_delete AFTER DELETE ON invoices
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_payments_insert AFTER INSERT ON payments
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_payments_update AFTER UPDATE ON payments
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_payments_delete AFTER DELETE ON payments
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_expenses_insert AFTER INSERT ON expenses
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_expenses_update AFTER UPDATE ON expenses
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_expenses_delete AFTER DELETE ON expenses
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_accounting_transactions_insert AFTER INSERT ON accounting_transactions
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_accounting_transactions_update AFTER UPDATE ON accounting_transactions
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_accounting_transactions_delete AFTER DELETE ON accounting_transactions
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'ledger';
+END;
+
+-- Unidades y residentes
+CREATE TRIGGER IF NOT EXISTS trg_cache_apartments_insert AFTER INSERT ON apartments
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'units';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_apartments_update AFTER UPDATE ON apartments
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'units';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_apartments_delete AFTER DELETE ON apartments
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'units';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_residents_insert AFTER INSERT ON residents
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'units';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_residents_update AFTER UPDATE ON residents
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'units';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_residents_delete AFTER DELETE ON residents
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'units';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_resident_user_units_insert AFTER INSERT ON resident_user_units
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'units';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_resident_user_units_update AFTER UPDATE ON resident_user_units
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'units';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_resident_user_units_delete AFTER DELETE ON resident_user_units
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'units';
+END;
+
+-- Catálogo
+CREATE TRIGGER IF NOT EXISTS trg_cache_products_services_insert AFTER INSERT ON products_services
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'catalog';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_products_services_update AFTER UPDATE ON products_services
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'catalog';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_products_services_delete AFTER DELETE ON products_services
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'catalog';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_suppliers_insert AFTER INSERT ON suppliers
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'catalog';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_suppliers_update AFTER UPDATE ON suppliers
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'catalog';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_suppliers_delete AFTER DELETE ON suppliers
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'catalog';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_recurring_sales_insert AFTER INSERT ON recurring_sales
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'catalog';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_recurring_sales_update AFTER UPDATE ON recurring_sales
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'catalog';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_recurring_sales_delete AFTER DELETE ON recurring_sales
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'catalog';
+END;
+
+-- Usuarios
+CREATE TRIGGER IF NOT EXISTS trg_cache_users_insert AFTER INSERT ON users
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_users_update AFTER UPDATE OF username, email, full_name, role, is_active, photo_url, phone ON users
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_users_delete AFTER DELETE ON users
+BEGIN
+    UPDATE cache_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE namespace = 'users';
+END;
@@ -0,0 +1,89 @@
+-- Migration: Change log for resident API delta sync
+-- Date: 2026-10-19
+-- Description: Cada escritura en facturas o pagos anota la entidad y la unidad
+-- afectada. La API de residentes entrega un token con el último id del registro
+-- y, con ``updated_since=<token>``, devuelve solo las facturas y pagos de las
+-- unidades del usuario que cambiaron después. Un cambio de unidad anota la
+-- unidad anterior y la nueva; un pago también anota su factura (cambia su saldo).
+-- El registro se purga por antigüedad (tarea programada purge_resident_sync_log).
+
+CREATE TABLE IF NOT EXISTS resident_sync_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entity TEXT NOT NULL,
+    entity_id INTEGER NOT NULL,
+    unit_id INTEGER,
+    changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_resident_sync_log_unit ON resident_sync_log(unit_id, id);
+CREATE INDEX IF NOT EXISTS idx_resident_sync_log_changed ON resident_sync_log(changed_at);
+
+-- Facturas
+CREATE TRIGGER IF NOT EXISTS trg_sync_invoices_insert AFTER INSERT ON invoices
+BEGIN
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id) VALUES ('invoice', NEW.id, NEW.unit_id);
+END;
+
+-- Al mover una factura de unidad, sus pagos salen del feed de la unidad anterior
+-- y entran en el de la nueva.
+CREATE TRIGGER IF NOT EXISTS trg_sync_invoices_update AFTER UPDATE ON invoices
+BEGIN
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id) VALUES ('invoice', NEW.id, NEW.unit_id);
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'invoice', OLD.id, OLD.unit_id WHERE OLD.unit_id IS NOT NEW.unit_id;
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'payment', p.id, OLD.unit_id FROM payments p
+    WHERE p.invoice_id = OLD.id AND OLD.unit_id IS NOT NEW.unit_id;
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'payment', p.id, NEW.unit_id FROM payments p
+    WHERE p.invoice_id = NEW.id AND OLD.unit_id IS NOT NEW.unit_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sync_invoices_delete AFTER DELETE ON invoices
+BEGIN
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id) VALUES ('invoice', OLD.id, OLD.unit_id);
+END;
+
+-- Los pagos se borran en cascada con su factura; cuando su trigger corre la
+-- factura ya no existe, así que se anotan aquí, antes del borrado, con su unidad.
+CREATE TRIGGER IF NOT EXISTS trg_sync_invoices_delete_payments BEFORE DELETE ON invoices
+BEGIN
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'payment', p.id, OLD.unit_id FROM payments p WHERE p.invoice_id = OLD.id;
+END;
+
+-- Pagos (y el saldo de su factura)
+CREATE TRIGGER IF NOT EXISTS trg_sync_payments_insert AFTER INSERT ON payments
+BEGIN
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'payment', NEW.id, (SELECT unit_id FROM invoices WHERE id = NEW.invoice_id);
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'invoice', NEW.invoice_id, (SELECT unit_id FROM invoices WHERE id = NEW.invoice_id)
+    WHERE NEW.invoice_id IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sync_payments_update AFTER UPDATE ON payments
+BEGIN
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'payment', NEW.id, (SELECT unit_id FROM invoices WHERE id = NEW.invoice_id);
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'invoice', NEW.invoice_id, (SELECT unit_id FROM invoices WHERE id = NEW.invoice_id)
+    WHERE NEW.invoice_id IS NOT NULL;
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'payment', OLD.id, (SELECT unit_id FROM invoices WHERE id = OLD.invoice_id)
+    WHERE OLD.invoice_id IS NOT NEW.invoice_id;
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'invoice', OLD.invoice_id, (SELECT unit_id FROM invoices WHERE id = OLD.invoice_id)
+    WHERE OLD.invoice_id IS NOT NEW.invoice_id AND OLD.invoice_id IS NOT NULL;
+END;
+
+-- En un borrado en cascada la factura ya no existe y la fila queda sin unidad;
+-- el pago ya quedó anotado por trg_sync_invoices_delete_payments.
+CREATE TRIGGER IF NOT EXISTS trg_sync_payments_delete AFTER DELETE ON payments
+BEGIN
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'payment', OLD.id, (SELECT unit_id FROM invoices WHERE id = OLD.invoice_id);
+    INSERT INTO resident_sync_log (entity, entity_id, unit_id)
+    SELECT 'invoice', OLD.invoice_id, (SELECT unit_id FROM invoices WHERE id = OLD.invoice_id)
+    WHERE OLD.invoice_id IS NOT NULL;
+END;
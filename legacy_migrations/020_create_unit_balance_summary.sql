@@ -0,0 +1,109 @@
+-- Migration: Per-unit balance summary
+-- Date: 2026-10-19
+-- Description: Resumen de cuenta precalculado por unidad (facturas, pendientes,
+-- facturado, pagado y saldo). Los triggers de facturas y pagos recalculan solo
+-- la fila de la unidad afectada (índices idx_invoices_unit e
+-- idx_payments_invoice_id), así el estado de cuenta del residente es una lectura
+-- por clave de sus unidades. El saldo suma lo pendiente de cada factura sin
+-- negativos, igual que residents.get_resident_statement_summary_for_user.
+
+CREATE TABLE IF NOT EXISTS unit_balance_summary (
+    unit_id INTEGER PRIMARY KEY,
+    invoice_count INTEGER NOT NULL DEFAULT 0,
+    pending_invoices INTEGER NOT NULL DEFAULT 0,
+    total_invoiced REAL NOT NULL DEFAULT 0,
+    total_paid REAL NOT NULL DEFAULT 0,
+    balance REAL NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Totales calculados desde las tablas base; los triggers lo filtran por unidad.
+CREATE VIEW IF NOT EXISTS unit_balance_totals AS
+SELECT unit_id,
+       COUNT(*) AS invoice_count,
+       SUM(CASE WHEN COALESCE(paid, 0) = 0 THEN 1 ELSE 0 END) AS pending_invoices,
+       SUM(amount) AS total_invoiced,
+       SUM(paid_amount) AS total_paid,
+       SUM(MAX(amount - paid_amount, 0)) AS balance
+FROM (
+    SELECT i.unit_id,
+           i.paid,
+           COALESCE(i.amount, 0) AS amount,
+           COALESCE((SELECT SUM(p.amount) FROM payments p WHERE p.invoice_id = i.id), 0) AS paid_amount
+    FROM invoices i
+    WHERE i.unit_id IS NOT NULL
+)
+GROUP BY unit_id;
+
+INSERT OR REPLACE INTO unit_balance_summary
+    (unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance)
+SELECT unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance
+FROM unit_balance_totals;
+
+-- Facturas
+CREATE TRIGGER IF NOT EXISTS trg_unit_balance_invoices_insert AFTER INSERT ON invoices
+WHEN NEW.unit_id IS NOT NULL
+BEGIN
+    DELETE FROM unit_balance_summary WHERE unit_id = NEW.unit_id;
+    INSERT INTO unit_balance_summary
+        (unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance)
+    SELECT unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance
+    FROM unit_balance_totals WHERE unit_id = NEW.unit_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_unit_balance_invoices_update AFTER UPDATE OF unit_id, amount, paid ON invoices
+BEGIN
+    DELETE FROM unit_balance_summary WHERE unit_id IN (OLD.unit_id, NEW.unit_id);
+    INSERT INTO unit_balance_summary
+        (unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance)
+    SELECT unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance
+    FROM unit_balance_totals WHERE unit_id IN (OLD.unit_id, NEW.unit_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_unit_balance_invoices_delete AFTER DELETE ON invoices
+WHEN OLD.unit_id IS NOT NULL
+BEGIN
+    DELETE FROM unit_balance_summary WHERE unit_id = OLD.unit_id;
+    INSERT INTO unit_balance_summary
+        (unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance)
+    SELECT unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance
+    FROM unit_balance_totals WHERE unit_id = OLD.unit_id;
+END;
+
+-- Pagos (recalculan la unidad de su factura)
+CREATE TRIGGER IF NOT EXISTS trg_unit_balance_payments_insert AFTER INSERT ON payments
+WHEN NEW.invoice_id IS NOT NULL
+BEGIN
+    DELETE FROM unit_balance_summary
+    WHERE unit_id = (SELECT unit_id FROM invoices WHERE id = NEW.invoice_id);
+    INSERT INTO unit_balance_summary
+        (unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance)
+    SELECT unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance
+    FROM unit_balance_totals
+    WHERE unit_id = (SELECT unit_id FROM invoices WHERE id = NEW.invoice_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_unit_balance_payments_update AFTER UPDATE OF invoice_id, amount ON payments
+BEGIN
+    DELETE FROM unit_balance_summary
+    WHERE unit_id IN (SELECT unit_id FROM invoices WHERE id IN (OLD.invoice_id, NEW.invoice_id));
+    INSERT INTO unit_balance_summary
+        (unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance)
+    SELECT unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance
+    FROM unit_balance_totals
+    WHERE unit_id IN (SELECT unit_id FROM invoices WHERE id IN (OLD.invoice_id, NEW.invoice_id));
+END;
+
+-- Si el pago se borra en cascada con su factura, la unidad ya no se encuentra;
+-- el trigger de borrado de la factura recalcula esa unidad.
+CREATE TRIGGER IF NOT EXISTS trg_unit_balance_payments_delete AFTER DELETE ON payments
+WHEN OLD.invoice_id IS NOT NULL
+BEGIN
+    DELETE FROM unit_balance_summary
+    WHERE unit_id = (SELECT unit_id FROM invoices WHERE id = OLD.invoice_id);
+    INSERT INTO unit_balance_summary
+        (unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance)
+    SELECT unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance
+    FROM unit_balance_totals
+    WHERE unit_id = (SELECT unit_id FROM invoices WHERE id = OLD.invoice_id);
+END;
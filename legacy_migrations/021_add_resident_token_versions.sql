@@ -0,0 +1,33 @@
+-- Migration: Resident API token versions
+-- Date: 2026-10-19
+-- Description: Versión de tokens por usuario. Los tokens de la API de residentes
+-- llevan la versión vigente al emitirse (claim ``ver``); desactivar al usuario,
+-- cambiarle el rol o la contraseña, borrarlo o cerrar todas sus sesiones la
+-- incrementa y deja inválidos los tokens anteriores. Cada proceso guarda la
+-- tabla en memoria y la relee periódicamente, así que verificar un token no
+-- consulta la BD en el caso común.
+-- Índice por vencimiento para la purga de refresh tokens expirados.
+
+CREATE TABLE IF NOT EXISTS resident_token_versions (
+    user_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_resident_api_refresh_tokens_expires_at
+    ON resident_api_refresh_tokens(expires_at);
+
+CREATE TRIGGER IF NOT EXISTS trg_token_version_users_update AFTER UPDATE OF is_active, role, password_hash ON users
+WHEN OLD.is_active IS NOT NEW.is_active
+  OR OLD.role IS NOT NEW.role
+  OR OLD.password_hash IS NOT NEW.password_hash
+BEGIN
+    INSERT INTO resident_token_versions (user_id, version) VALUES (NEW.id, 1)
+    ON CONFLICT(user_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_token_version_users_delete AFTER DELETE ON users
+BEGIN
+    INSERT INTO resident_token_versions (user_id, version) VALUES (OLD.id, 1)
+    ON CONFLICT(user_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
@@ -0,0 +1,15 @@
+-- Migration: Scheduler leader lease
+-- Date: 2026-10-19
+-- Description: Lease del scheduler para que las tareas programadas corran en un
+-- solo proceso aunque gunicorn levante varios workers. El proceso que tiene la
+-- fila vigente (``holder``) la renueva con cada latido y es el único que ejecuta
+-- los trabajos; si muere, la fila vence (``expires_at``, segundos epoch) y otro
+-- proceso la toma en su siguiente latido. Ver scheduler_lease.py.
+
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    acquired_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
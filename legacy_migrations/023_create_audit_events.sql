@@ -0,0 +1,43 @@
+-- Migration: Audit trail table
+-- Date: 2026-10-19
+-- Description: Registro de auditoría consultable. Cada evento de
+-- utils.decorators (audit_log, log_action, accesos denegados) se guarda además
+-- de audit.log; audit_trail.py los acumula en memoria y los inserta por lotes.
+-- La tabla es de solo inserción: no se actualiza y solo se borran meses
+-- completos anteriores al mes pasado (purga por retención, tarea programada
+-- purge_audit_events). ``month`` (YYYY-MM) es la partición lógica: la purga es
+-- un rango del índice idx_audit_events_month. Las búsquedas del admin paginan
+-- por id descendente sobre los índices de usuario, acción y entidad (SQLite
+-- guarda el rowid al final de cada índice).
+
+CREATE TABLE IF NOT EXISTS audit_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    month TEXT NOT NULL,
+    level TEXT NOT NULL DEFAULT 'INFO',
+    action TEXT NOT NULL,
+    user_id INTEGER,
+    username TEXT,
+    entity TEXT,
+    entity_id TEXT,
+    endpoint TEXT,
+    description TEXT,
+    ip TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_audit_events_username ON audit_events(username);
+CREATE INDEX IF NOT EXISTS idx_audit_events_action ON audit_events(action);
+CREATE INDEX IF NOT EXISTS idx_audit_events_entity ON audit_events(entity, entity_id);
+CREATE INDEX IF NOT EXISTS idx_audit_events_created ON audit_events(created_at);
+CREATE INDEX IF NOT EXISTS idx_audit_events_month ON audit_events(month);
+
+CREATE TRIGGER IF NOT EXISTS trg_audit_events_no_update BEFORE UPDATE ON audit_events
+BEGIN
+    SELECT RAISE(ABORT, 'audit_events es de solo inserción');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_audit_events_retention_only BEFORE DELETE ON audit_events
+WHEN OLD.month >= strftime('%Y-%m', 'now', 'start of month', '-1 month')
+BEGIN
+    SELECT RAISE(ABORT, 'audit_events solo purga meses anteriores al mes pasado');
+END;
@@ -0,0 +1,366 @@
+"""
+Módulo de Métricas
+Exportador en formato de texto de Prometheus (``GET /metrics``).
+
+Cada proceso acumula contadores e histogramas en memoria (un dict protegido por
+un lock, sin I/O en el camino del request) y los vuelca cada
+``METRICS_FLUSH_SECONDS`` a ``METRICS_DIR/metrics_<pid>.json`` con reemplazo
+atómico. Al exportar se suman los archivos de todos los workers de gunicorn,
+igual que el modo multiproceso de ``prometheus_client``, así que cualquier
+worker que atienda el scrape devuelve el total. El directorio debe limpiarse
+al desplegar (los contadores de procesos muertos se conservan hasta entonces).
+
+Métricas:
+  * ``app_request_duration_seconds``: latencia por blueprint/endpoint/método.
+  * ``app_requests_total``: requests por endpoint y código de estado.
+  * ``app_db_queries_total`` / ``app_db_seconds_total``: consultas y tiempo en BD
+    por endpoint (desde ``utils.query_profiler``).
+  * ``app_cache_requests_total``: hits/misses del cache por prefijo de clave.
+  * ``app_scheduler_job_duration_seconds``: duración de trabajos programados.
+  * ``app_scheduler_jobs_skipped_total`` / ``app_scheduler_lease_changes_total``:
+    trabajos omitidos por no tener el lease y cambios de líder (``scheduler_lease``).
+  * ``app_external_call_duration_seconds``: latencia de SMTP, Twilio y OCR.
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_METRICS_DIR = Path(__file__).parent / 'data' / 'metrics'
+DEFAULT_FLUSH_SECONDS = 10.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0)
+
+METRIC_HELP = {
+    'app_request_duration_seconds': ('histogram', 'Latencia de requests HTTP por endpoint'),
+    'app_requests_total': ('counter', 'Requests HTTP por endpoint y código de estado'),
+    'app_db_queries_total': ('counter', 'Consultas SQL ejecutadas por endpoint'),
+    'app_db_seconds_total': ('counter', 'Tiempo acumulado en base de datos por endpoint'),
+    'app_cache_requests_total': ('counter', 'Lecturas de cache por prefijo de clave y resultado'),
+    'app_scheduler_job_duration_seconds': ('histogram', 'Duración de trabajos del scheduler'),
+    'app_scheduler_jobs_skipped_total': ('counter', 'Trabajos omitidos porque otro proceso tiene el lease del scheduler'),
+    'app_scheduler_lease_changes_total': ('counter', 'Lease del scheduler tomado o perdido por este proceso'),
+    'app_external_call_duration_seconds': ('histogram', 'Latencia de servicios externos (SMTP, Twilio, OCR)'),
+}
+
+_BUCKETS_BY_METRIC = {
+    'app_scheduler_job_duration_seconds': JOB_BUCKETS,
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+# ========== REGISTRO EN MEMORIA ==========
+
+class _Registry:
+    """Contadores e histogramas del proceso actual."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.directory: Optional[Path] = None
+        self.flush_seconds = DEFAULT_FLUSH_SECONDS
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.histograms: Dict[Tuple[str, LabelKey], Dict] = {}
+        self.last_flush = time.monotonic()
+
+    def _check_fork(self):
+        # Un worker forkeado no debe volver a reportar lo que acumuló el padre.
+        if self.pid != os.getpid():
+            self._reset()
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1.0) -> None:
+        key = (name, _label_key(labels))
+        with self.lock:
+            self._check_fork()
+            self.counters[key] = self.counters.get(key, 0.0) + value
+        self.maybe_flush()
+
+    def observe(self, name: str, labels: Dict[str, str], value: float) -> None:
+        buckets = _BUCKETS_BY_METRIC.get(name, LATENCY_BUCKETS)
+        key = (name, _label_key(labels))
+        with self.lock:
+            self._check_fork()
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for idx, bound in enumerate(buckets):
+                if value <= bound:
+                    hist['buckets'][idx] += 1
+                    break
+            hist['sum'] += value
+            hist['count'] += 1
+        self.maybe_flush()
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            self._check_fork()
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [
+                    [name, dict(labels), dict(hist, buckets=list(hist['buckets']))]
+                    for (name, labels), hist in self.histograms.items()
+                ],
+            }
+
+    def maybe_flush(self) -> None:
+        if self.directory is None or time.monotonic() - self.last_flush < self.flush_seconds:
+            return
+        self.flush()
+
+    def flush(self) -> None:
+        if self.directory is None:
+            return
+        self.last_flush = time.monotonic()
+        payload = json.dumps(self.snapshot())
+        target = self.directory / f'metrics_{os.getpid()}.json'
+        tmp = target.with_suffix('.tmp')
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(payload, encoding='utf-8')
+            os.replace(tmp, target)
+        except OSError:
+            pass
+
+
+_registry = _Registry()
+atexit.register(_registry.flush)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+# ========== API DE INSTRUMENTACIÓN ==========
+
+def inc_counter(name: str, value: float = 1.0, **labels) -> None:
+    _registry.inc(name, labels, value)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    _registry.observe(name, labels, value)
+
+
+@contextmanager
+def track_external(service: str):
+    """Mide la latencia de una llamada a un servicio externo."""
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        observe('app_external_call_duration_seconds', time.perf_counter() - start, service=service, status=status)
+
+
+def track_job(job_id: str):
+    """Decorador para medir la duración de un trabajo del scheduler."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = 'ok'
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                status = 'error'
+                raise
+            finally:
+                observe('app_scheduler_job_duration_seconds', time.perf_counter() - start, job=job_id, status=status)
+        return wrapper
+    return decorator
+
+
+_CACHE_PREFIX_RE = re.compile(r'^/*([^/:]+)')
+
+
+def cache_key_prefix(key) -> str:
+    """Primer segmento de la clave (``view//ventas/...`` -> ``view``, ``/ventas/x`` -> ``ventas``)."""
+    match = _CACHE_PREFIX_RE.match(str(key or ''))
+    return match.group(1) if match else 'other'
+
+
+def _instrument_cache_backend(backend) -> None:
+    original_get = backend.get
+
+    @wraps(original_get)
+    def get(key, *args, **kwargs):
+        value = original_get(key, *args, **kwargs)
+        inc_counter(
+            'app_cache_requests_total',
+            prefix=cache_key_prefix(key),
+            result='miss' if value is None else 'hit',
+        )
+        return value
+
+    backend.get = get
+
+
+# ========== EXPORTACIÓN ==========
+
+def _merge(snapshots: Iterable[Dict]) -> Tuple[Dict, Dict]:
+    counters: Dict[Tuple[str, LabelKey], float] = {}
+    histograms: Dict[Tuple[str, LabelKey], Dict] = {}
+    for snap in snapshots:
+        for name, labels, value in snap.get('counters', []):
+            key = (name, _label_key(labels))
+            counters[key] = counters.get(key, 0.0) + value
+        for name, labels, hist in snap.get('histograms', []):
+            key = (name, _label_key(labels))
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = {'buckets': list(hist['buckets']), 'sum': hist['sum'], 'count': hist['count']}
+                continue
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], hist['buckets'])]
+            merged['sum'] += hist['sum']
+            merged['count'] += hist['count']
+    return counters, histograms
+
+
+def _load_snapshots() -> List[Dict]:
+    if _registry.directory is None:
+        return [_registry.snapshot()]
+    _registry.flush()
+    snapshots = []
+    for path in sorted(_registry.directory.glob('metrics_*.json')):
+        try:
+            snapshots.append(json.loads(path.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_prometheus(gauges: Optional[Dict[str, Tuple[str, Dict[LabelKey, float]]]] = None) -> str:
+    """Texto en formato de exposición de Prometheus con los datos de todos los procesos."""
+    counters, histograms = _merge(_load_snapshots())
+    lines: List[str] = []
+
+    for name, (metric_type, help_text) in METRIC_HELP.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        if metric_type == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            continue
+
+        buckets = _BUCKETS_BY_METRIC.get(name, LATENCY_BUCKETS)
+        for (metric, labels), hist in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, hist['buckets']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, ("le", str(bound)))} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, ("le", "+Inf"))} {hist["count"]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(round(hist["sum"], 6))}')
+            lines.append(f'{name}_count{_format_labels(labels)} {hist["count"]}')
+
+    for name, (help_text, values) in (gauges or {}).items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for labels, value in sorted(values.items()):
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _integrity_gauges() -> Dict[str, Tuple[str, Dict[LabelKey, float]]]:
+    """Violaciones abiertas del verificador de integridad (calculadas en el scrape)."""
+    try:
+        import ledger_integrity
+
+        data = ledger_integrity.get_integrity_metrics()
+    except Exception:
+        return {}
+    if not data.get('available'):
+        return {}
+    return {
+        'app_ledger_integrity_open_violations': (
+            'Violaciones abiertas del verificador de integridad del libro',
+            {(('check', check),): total for check, total in data['open_violations'].items()},
+        ),
+        'app_ledger_integrity_pending_changes': (
+            'Cambios del libro pendientes de verificar',
+            {(): data['pending_changes']},
+        ),
+    }
+
+
+def render_metrics() -> str:
+    return render_prometheus(_integrity_gauges())
+
+
+# ========== INTEGRACIÓN CON FLASK ==========
+
+def init_metrics(app) -> None:
+    """Registra los hooks de request, instrumenta el cache y define el directorio compartido."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    directory = app.config.get('METRICS_DIR')
+    _registry.directory = Path(directory) if directory else None
+    _registry.flush_seconds = float(app.config.get('METRICS_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS))
+
+    from flask import g, request
+
+    from extensions import cache
+
+    backend = app.extensions.get('cache', {}).get(cache)
+    if backend is not None:
+        _instrument_cache_backend(backend)
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started_at = time.perf_counter()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started_at = g.pop('_metrics_started_at', None)
+        if started_at is None:
+            return response
+
+        endpoint = request.endpoint or 'unmatched'
+        blueprint = request.blueprint or 'app'
+        observe(
+            'app_request_duration_seconds',
+            time.perf_counter() - started_at,
+            blueprint=blueprint,
+            endpoint=endpoint,
+            method=request.method,
+        )
+        inc_counter('app_requests_total', endpoint=endpoint, status=str(response.status_code))
+
+        sql_stats = g.get('_sql_stats')
+        if sql_stats:
+            inc_counter('app_db_queries_total', sql_stats['count'], endpoint=endpoint)
+            inc_counter('app_db_seconds_total', sql_stats['time_ms'] / 1000, endpoint=endpoint)
+        return response
@@ -20,12 +20,12 @@ try:
 except Exception:
     HAS_SENDERS = False
 
-# Intentar importar invoice_pdf
-try:
-    import invoice_pdf
-    HAS_INVOICE_PDF = True
-except Exception:
-    HAS_INVOICE_PDF = False
+# invoice_pdf (y con él reportlab/PIL) se carga al generar el primer PDF
+from utils.async_logging import NOTIFICATIONS_LOG_PATH, RUN_LOG_PATH, get_file_logger
+from utils.lazy_imports import is_available, lazy_import
+
+HAS_INVOICE_PDF = is_available('reportlab')
+invoice_pdf = lazy_import('invoice_pdf') if HAS_INVOICE_PDF else None
 
 # Importar config para verificar configuración
 try:
@@ -35,29 +35,17 @@ except Exception:
     HAS_CONFIG = False
 
 from pathlib import Path
-from datetime import datetime, UTC
 
-LOG_PATH = Path(__file__).parent / "run.log"
-NOTIFICATIONS_LOG_PATH = Path(__file__).parent / "notifications.log"
-
-
-def _utc_timestamp() -> str:
-    return datetime.now(UTC).isoformat().replace('+00:00', 'Z')
+# Se escriben desde la cola de utils.async_logging (el request solo encola)
+_run_logger = get_file_logger('toscana.run', RUN_LOG_PATH)
+_notifications_logger = get_file_logger('toscana.notifications', NOTIFICATIONS_LOG_PATH)
 
 
 def _log(msg: str):
-    try:
-        with open(LOG_PATH, "a", encoding="utf-8") as f:
-            f.write(f"{_utc_timestamp()} - {msg}\n")
-    except Exception:
-        pass
+    _run_logger.info(msg)
 
 def _log_notification(msg: str):
-    try:
-        with open(NOTIFICATIONS_LOG_PATH, "a", encoding="utf-8") as f:
-            f.write(f"{_utc_timestamp()} - {msg}\n")
-    except Exception:
-        pass
+    _notifications_logger.info(msg)
 
 def add_unit(number: str, owner: str, email: str = "", phone: str = "") -> int:
     """Agrega una unidad (legacy, usar apartments.add_apartment)"""
@@ -217,22 +205,12 @@ def create_invoice(unit_id: int, description: str, amount: float, due_date: Opti
                     pdf_path=str(Path(__file__).parent / 'static' / 'invoices' / pdf_filename) if pdf_filename else None
                 )
             except Exception as e:
-                try:
-                    log_path = Path(__file__).parent / "notifications.log"
-                    with open(log_path, "a", encoding="utf-8") as lf:
-                        lf.write(f"{_utc_timestamp()} - Invoice {rid} notification failed: {e}\n")
-                except Exception:
-                    pass
+                _log_notification(f"Invoice {rid} notification failed: {e}")
                 _log(f"create_invoice notification failed for {rid}: {e}")
                 # Re-lanzar el error para que el usuario lo vea
                 raise RuntimeError(f"Error al enviar notificación: {str(e)}")
         else:
-            try:
-                log_path = Path(__file__).parent / "notifications.log"
-                with open(log_path, "a", encoding="utf-8") as lf:
-                    lf.write(f"{_utc_timestamp()} - Invoice {rid} notification skipped: senders module not available\n")
-            except Exception:
-                pass
+            _log_notification(f"Invoice {rid} notification skipped: senders module not available")
             _log(f"create_invoice notification skipped (senders missing) for {rid}")
     return rid
 
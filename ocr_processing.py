@@ -13,9 +13,10 @@ from typing import Dict, Optional, Tuple
 from datetime import datetime
 from PIL import Image, ImageEnhance, ImageFilter, ImageOps
 import requests
-
 import platform
 
+import metrics
+
 # Configurar variables de entorno ANTES de importar pytesseract
 def _setup_tesseract_env():
     """Configura variables de entorno para Tesseract (Windows y Linux)."""
@@ -156,7 +157,8 @@ class ReceiptOCR:
         """Procesa una imagen de recibo y extrae información."""
         try:
             image = Image.open(file_path)
-            return ReceiptOCR._process(image)
+            with metrics.track_external('ocr'):
+                return ReceiptOCR._process(image)
         except FileNotFoundError:
             return {'error': f'Archivo no encontrado: {file_path}', 'raw_text': '', 'confidence': 0.0}
         except Exception as e:
@@ -167,7 +169,8 @@ class ReceiptOCR:
         """Procesa bytes de imagen (desde upload)."""
         try:
             image = Image.open(io.BytesIO(image_bytes))
-            return ReceiptOCR._process(image)
+            with metrics.track_external('ocr'):
+                return ReceiptOCR._process(image)
         except Exception as e:
             return {'error': f'Error procesando imagen: {str(e)}', 'raw_text': '', 'confidence': 0.0}
 
@@ -346,19 +349,20 @@ class ReceiptOCR:
             b64 = base64.b64encode(buf.getvalue()).decode('utf-8')
             payload = f'data:image/jpeg;base64,{b64}'
 
-            resp = requests.post(
-                'https://api.ocr.space/parse/base64',
-                data={
-                    'base64Image': payload,
-                    'language': 'spa',
-                    'isOverlayRequired': 'false',
-                    'detectOrientation': 'true',
-                    'scale': 'true',
-                    'OCREngine': '2',      # Engine 2 es más robusto para recibos
-                },
-                headers={'apikey': api_key},
-                timeout=20
-            )
+            with metrics.track_external('ocr_space'):
+                resp = requests.post(
+                    'https://api.ocr.space/parse/base64',
+                    data={
+                        'base64Image': payload,
+                        'language': 'spa',
+                        'isOverlayRequired': 'false',
+                        'detectOrientation': 'true',
+                        'scale': 'true',
+                        'OCREngine': '2',      # Engine 2 es más robusto para recibos
+                    },
+                    headers={'apikey': api_key},
+                    timeout=20
+                )
 
             if resp.status_code == 200:
                 data = resp.json()
@@ -0,0 +1,514 @@
+"""
+Importación masiva de pagos
+===========================
+Lee estados de cuenta bancarios (CSV u OFX), concilia cada depósito con una
+factura abierta (por número de factura en la referencia, por unidad o por
+monto) y registra todos los pagos en una sola transacción.
+
+A diferencia de ``models.record_payment`` (un pago por llamada, con PDF y
+correo en línea), aquí los recibos, estados de cuenta y notificaciones se
+generan después en un job de fondo.
+"""
+import csv
+import hashlib
+import io
+import logging
+import re
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, update
+
+from extensions import db
+from data_models.models import AccountingTransaction, Apartment, Invoice, Payment
+import db as legacy_db
+import models
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_STATEMENT_EXTENSIONS = {'csv', 'txt', 'ofx', 'qfx'}
+BANK_REFERENCE_PREFIX = '[banco:'
+AMOUNT_TOLERANCE = 0.005
+
+_CSV_HEADER_ALIASES = {
+    'date': {'fecha', 'date', 'fecha_valor', 'fecha valor', 'posted', 'fecha_transaccion'},
+    'amount': {'monto', 'amount', 'importe', 'credito', 'crédito', 'deposito', 'depósito', 'valor'},
+    'reference': {'referencia', 'reference', 'ref', 'descripcion', 'descripción', 'description',
+                  'concepto', 'memo', 'detalle'},
+    'unit': {'unidad', 'apartamento', 'apto', 'unit', 'apartment'},
+    'bank_id': {'id', 'fitid', 'transaction_id', 'numero', 'número', 'no', 'documento'},
+}
+_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%Y%m%d')
+_INVOICE_REFERENCE_RE = re.compile(r'(?:FACTURA|FACT|FAC|INV)\W{0,3}#?\s*(\d+)|#\s*(\d+)', re.IGNORECASE)
+_OFX_TRANSACTION_RE = re.compile(r'<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))', re.IGNORECASE | re.DOTALL)
+_OFX_FIELD_RE = re.compile(r'<(TRNTYPE|DTPOSTED|TRNAMT|FITID|NAME|MEMO|CHECKNUM)>([^<\r\n]*)', re.IGNORECASE)
+
+
+# ========== LECTURA DEL ESTADO DE CUENTA ==========
+
+def _parse_amount(raw) -> Optional[float]:
+    text = str(raw or '').strip().replace('RD$', '').replace('$', '').replace(' ', '')
+    if not text:
+        return None
+    negative = text.startswith('(') and text.endswith(')')
+    text = text.strip('()')
+    # 1.234,56 -> 1234.56 ; 1,234.56 -> 1234.56
+    if ',' in text and '.' in text:
+        if text.rfind(',') > text.rfind('.'):
+            text = text.replace('.', '').replace(',', '.')
+        else:
+            text = text.replace(',', '')
+    elif ',' in text:
+        text = text.replace(',', '.') if len(text.rsplit(',', 1)[1]) == 2 else text.replace(',', '')
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+def _parse_date(raw) -> Optional[str]:
+    text = str(raw or '').strip()
+    if not text:
+        return None
+    # OFX: 20260415120000[-4:AST]
+    if re.match(r'^\d{8}', text):
+        text = text[:8]
+    else:
+        text = text.split(' ')[0].split('T')[0]
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _fallback_bank_id(date: str, amount: float, reference: str) -> str:
+    digest = hashlib.sha1(f"{date}|{amount:.2f}|{reference.strip().upper()}".encode('utf-8')).hexdigest()
+    return digest[:16]
+
+
+def _parse_csv(text: str) -> List[Dict]:
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(io.StringIO(text), dialect)
+    header = next(reader, None)
+    if not header:
+        return []
+
+    columns = {}
+    for index, name in enumerate(header):
+        normalized = (name or '').strip().lower()
+        for field, aliases in _CSV_HEADER_ALIASES.items():
+            if normalized in aliases and field not in columns:
+                columns[field] = index
+    if 'date' not in columns or 'amount' not in columns:
+        raise ValueError("El CSV debe tener columnas de fecha y monto (ej: 'fecha', 'monto').")
+
+    def _cell(row, field):
+        index = columns.get(field)
+        return row[index].strip() if index is not None and index < len(row) else ''
+
+    deposits = []
+    for line_number, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        deposits.append({
+            'line': line_number,
+            'date': _parse_date(_cell(row, 'date')),
+            'amount': _parse_amount(_cell(row, 'amount')),
+            'reference': _cell(row, 'reference'),
+            'unit': _cell(row, 'unit') or None,
+            'bank_id': _cell(row, 'bank_id') or None,
+        })
+    return deposits
+
+
+def _parse_ofx(text: str) -> List[Dict]:
+    deposits = []
+    for line_number, block in enumerate(_OFX_TRANSACTION_RE.findall(text), start=1):
+        fields = {name.upper(): value.strip() for name, value in _OFX_FIELD_RE.findall(block)}
+        reference = ' '.join(part for part in (fields.get('NAME'), fields.get('MEMO')) if part)
+        deposits.append({
+            'line': line_number,
+            'date': _parse_date(fields.get('DTPOSTED')),
+            'amount': _parse_amount(fields.get('TRNAMT')),
+            'reference': reference,
+            'unit': None,
+            'bank_id': fields.get('FITID') or fields.get('CHECKNUM') or None,
+        })
+    return deposits
+
+
+def parse_bank_statement(content, filename: str = '') -> List[Dict]:
+    """
+    Convierte un estado de cuenta en una lista de depósitos.
+
+    Cada depósito: line, date (YYYY-MM-DD), amount, reference, unit, bank_id.
+    Los débitos (montos <= 0) se descartan aquí.
+    """
+    if isinstance(content, bytes):
+        for encoding in ('utf-8-sig', 'latin-1'):
+            try:
+                content = content.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    is_ofx = extension in {'ofx', 'qfx'} or '<OFX>' in content.upper()
+    deposits = _parse_ofx(content) if is_ofx else _parse_csv(content)
+
+    result = []
+    for deposit in deposits:
+        if deposit['amount'] is None or deposit['amount'] <= 0:
+            continue
+        deposit['amount'] = round(deposit['amount'], 2)
+        if deposit['date'] and not deposit['bank_id']:
+            deposit['bank_id'] = _fallback_bank_id(deposit['date'], deposit['amount'], deposit['reference'])
+        result.append(deposit)
+    return result
+
+
+# ========== CONCILIACIÓN ==========
+
+def _unit_pattern(number: str) -> Optional[re.Pattern]:
+    parts = re.findall(r'[A-Za-z0-9]+', number or '')
+    if not parts:
+        return None
+    body = r'[\s\-_/]*'.join(re.escape(part) for part in parts)
+    return re.compile(rf'(?<![A-Za-z0-9]){body}(?![A-Za-z0-9])', re.IGNORECASE)
+
+
+def _normalize_unit(value: Optional[str]) -> str:
+    return re.sub(r'[^A-Za-z0-9]', '', value or '').upper()
+
+
+def _load_open_invoices() -> List[Dict]:
+    """Facturas no pagadas con su saldo, en una sola consulta."""
+    paid_subquery = (
+        db.session.query(Payment.invoice_id, func.sum(Payment.amount).label('total_paid'))
+        .group_by(Payment.invoice_id)
+        .subquery()
+    )
+    rows = (
+        db.session.query(
+            Invoice.id, Invoice.unit_id, Invoice.description, Invoice.amount, Invoice.issued_date,
+            Apartment.number, func.coalesce(paid_subquery.c.total_paid, 0.0),
+        )
+        .outerjoin(Apartment, Apartment.id == Invoice.unit_id)
+        .outerjoin(paid_subquery, paid_subquery.c.invoice_id == Invoice.id)
+        .filter(Invoice.paid.is_(False))
+        .order_by(Invoice.issued_date, Invoice.id)
+        .all()
+    )
+    invoices = []
+    for invoice_id, unit_id, description, amount, issued_date, unit_number, total_paid in rows:
+        pending = round(float(amount or 0) - float(total_paid or 0), 2)
+        if pending > AMOUNT_TOLERANCE:
+            invoices.append({
+                'id': invoice_id,
+                'unit_id': unit_id,
+                'unit_number': unit_number or '',
+                'description': description or f'Factura #{invoice_id}',
+                'pending': pending,
+            })
+    return invoices
+
+
+def _load_imported_bank_ids() -> set:
+    rows = (
+        db.session.query(Payment.notes)
+        .filter(Payment.notes.like(f'%{BANK_REFERENCE_PREFIX}%'))
+        .all()
+    )
+    bank_ids = set()
+    for (notes,) in rows:
+        bank_ids.update(re.findall(r'\[banco:([^\]]+)\]', notes or ''))
+    return bank_ids
+
+
+def match_deposits(deposits: List[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Asigna cada depósito a una factura abierta.
+
+    Orden de criterios: número de factura en la referencia, unidad (columna o
+    referencia) y por último monto exacto si hay una única factura con ese
+    saldo. Los saldos se descuentan en memoria para que dos depósitos no paguen
+    de más la misma factura.
+    """
+    open_invoices = _load_open_invoices()
+    by_id = {invoice['id']: invoice for invoice in open_invoices}
+    units = {}
+    for invoice in open_invoices:
+        if invoice['unit_number']:
+            units.setdefault(invoice['unit_number'], _unit_pattern(invoice['unit_number']))
+    imported_bank_ids = _load_imported_bank_ids()
+    seen_bank_ids = set()
+
+    matched, unmatched, duplicates = [], [], []
+
+    def _fits(invoice, amount):
+        return invoice['pending'] + AMOUNT_TOLERANCE >= amount
+
+    for deposit in deposits:
+        amount = deposit['amount']
+        if not deposit.get('date'):
+            unmatched.append(dict(deposit, reason='Fecha inválida'))
+            continue
+        if deposit['bank_id'] in imported_bank_ids or deposit['bank_id'] in seen_bank_ids:
+            duplicates.append(dict(deposit, reason='Depósito ya importado'))
+            continue
+
+        invoice, reason = None, None
+        reference = deposit.get('reference') or ''
+
+        for groups in _INVOICE_REFERENCE_RE.findall(reference):
+            candidate = by_id.get(int(groups[0] or groups[1]))
+            if candidate and _fits(candidate, amount):
+                invoice, reason = candidate, 'referencia'
+                break
+
+        if invoice is None:
+            if deposit.get('unit'):
+                wanted = _normalize_unit(deposit['unit'])
+                unit_numbers = [number for number in units if _normalize_unit(number) == wanted]
+            else:
+                unit_numbers = [number for number, pattern in units.items() if pattern and pattern.search(reference)]
+            if len(unit_numbers) == 1:
+                candidates = [inv for inv in open_invoices if inv['unit_number'] == unit_numbers[0] and inv['pending'] > AMOUNT_TOLERANCE]
+                exact = [inv for inv in candidates if abs(inv['pending'] - amount) <= AMOUNT_TOLERANCE]
+                fitting = exact or [inv for inv in candidates if _fits(inv, amount)]
+                if fitting:
+                    invoice, reason = fitting[0], 'unidad y monto' if exact else 'unidad'
+
+        if invoice is None:
+            exact = [inv for inv in open_invoices if abs(inv['pending'] - amount) <= AMOUNT_TOLERANCE]
+            if len(exact) == 1:
+                invoice, reason = exact[0], 'monto'
+            elif len(exact) > 1:
+                unmatched.append(dict(deposit, reason=f'Monto ambiguo ({len(exact)} facturas con ese saldo)'))
+                continue
+
+        if invoice is None:
+            unmatched.append(dict(deposit, reason='Sin factura abierta que coincida'))
+            continue
+
+        invoice['pending'] = round(invoice['pending'] - amount, 2)
+        seen_bank_ids.add(deposit['bank_id'])
+        matched.append(dict(
+            deposit,
+            invoice_id=invoice['id'],
+            unit_number=invoice['unit_number'],
+            invoice_description=invoice['description'],
+            match=reason,
+        ))
+
+    return {'matched': matched, 'unmatched': unmatched, 'duplicates': duplicates}
+
+
+# ========== REGISTRO EN LOTE ==========
+
+def _payment_notes(match: Dict) -> str:
+    reference = (match.get('reference') or '').strip()
+    note = f"Importación bancaria {BANK_REFERENCE_PREFIX}{match['bank_id']}]"
+    return f"{note} {reference}"[:500] if reference else note
+
+
+def import_payments(matches: List[Dict], method: str = 'transferencia',
+                    generate_receipts: bool = True, send_notifications: bool = True) -> List[Dict]:
+    """
+    Registra los pagos conciliados en una sola transacción (ORM + copia legacy)
+    y actualiza el estado de todas las facturas afectadas de una vez.
+    """
+    if not matches:
+        return []
+
+    try:
+        payments = [
+            Payment(
+                invoice_id=match['invoice_id'],
+                amount=match['amount'],
+                method=method,
+                notes=_payment_notes(match),
+                paid_date=f"{match['date']} 00:00:00",
+            )
+            for match in matches
+        ]
+        transactions = [
+            AccountingTransaction(
+                type='income',
+                description=f"Pago recibido: {match.get('invoice_description') or 'Factura #' + str(match['invoice_id'])}",
+                amount=match['amount'],
+                category='Ventas/Facturas',
+                reference=f"INV-{match['invoice_id']}",
+                date=match['date'],
+            )
+            for match in matches
+        ]
+        db.session.add_all(payments)
+        db.session.add_all(transactions)
+        db.session.flush()
+
+        invoice_ids = sorted({match['invoice_id'] for match in matches})
+        totals = dict(
+            db.session.query(Payment.invoice_id, func.sum(Payment.amount))
+            .filter(Payment.invoice_id.in_(invoice_ids))
+            .group_by(Payment.invoice_id)
+            .all()
+        )
+        amounts = dict(db.session.query(Invoice.id, Invoice.amount).filter(Invoice.id.in_(invoice_ids)).all())
+        invoice_updates = []
+        for invoice_id in invoice_ids:
+            total_paid = round(float(totals.get(invoice_id) or 0), 2)
+            invoice_amount = round(float(amounts.get(invoice_id) or 0), 2)
+            invoice_updates.append({
+                'id': invoice_id,
+                'paid': total_paid >= invoice_amount,
+                'pending_amount': max(invoice_amount - total_paid, 0),
+            })
+        db.session.execute(update(Invoice), invoice_updates)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        models._log(f"Error importing {len(matches)} bank payments: {e}")
+        raise
+
+    # Dual-write en bloque a la copia legacy (misma política que record_payment).
+    try:
+        conn = legacy_db.get_conn()
+        try:
+            cur = conn.cursor()
+            cur.executemany(
+                "UPDATE invoices SET paid=?, pending_amount=? WHERE id=?",
+                [(1 if row['paid'] else 0, row['pending_amount'], row['id']) for row in invoice_updates],
+            )
+            cur.executemany(
+                "INSERT OR IGNORE INTO payments(id, invoice_id, amount, method, notes, paid_date) VALUES(?,?,?,?,?,?)",
+                [(p.id, p.invoice_id, p.amount, p.method, p.notes, p.paid_date) for p in payments],
+            )
+            cur.executemany(
+                "INSERT OR IGNORE INTO accounting_transactions(id, type, description, amount, category, reference, date) VALUES(?,?,?,?,?,?,?)",
+                [(t.id, t.type, t.description, t.amount, t.category, t.reference, t.date) for t in transactions],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        models._log(f"Dual-write failed for bank import ({len(payments)} payments): {e}")
+
+    imported = [
+        dict(match, payment_id=payment.id, method=method)
+        for match, payment in zip(matches, payments)
+    ]
+    total_paid_by_invoice = {row['id']: amounts.get(row['id'], 0) - row['pending_amount'] for row in invoice_updates}
+    models._log(f"Bank import recorded {len(imported)} payments for {len(invoice_ids)} invoices")
+
+    if generate_receipts or send_notifications:
+        enqueue_payment_followups([
+            {
+                'payment_id': item['payment_id'],
+                'invoice_id': item['invoice_id'],
+                'amount': item['amount'],
+                'method': method,
+                'total_paid': total_paid_by_invoice.get(item['invoice_id'], item['amount']),
+                'notes': _payment_notes(item),
+            }
+            for item in imported
+        ], generate_receipts=generate_receipts, send_notifications=send_notifications)
+
+    return imported
+
+
+def import_bank_statement(content, filename: str = '', method: str = 'transferencia',
+                          dry_run: bool = False, generate_receipts: bool = True,
+                          send_notifications: bool = True) -> Dict[str, List[Dict]]:
+    """Lee, concilia y (salvo ``dry_run``) registra un estado de cuenta completo."""
+    deposits = parse_bank_statement(content, filename)
+    result = match_deposits(deposits)
+    result['imported'] = [] if dry_run else import_payments(
+        result['matched'],
+        method=method,
+        generate_receipts=generate_receipts,
+        send_notifications=send_notifications,
+    )
+    result['dry_run'] = dry_run
+    return result
+
+
+# ========== RECIBOS Y NOTIFICACIONES EN SEGUNDO PLANO ==========
+
+def run_payment_followups(app, items: List[Dict], generate_receipts: bool = True,
+                          send_notifications: bool = True) -> None:
+    """Genera recibos/estados de cuenta y envía notificaciones de pagos importados."""
+    from contextlib import nullcontext
+
+    with app.app_context():
+        session = nullcontext()
+        if send_notifications and models.HAS_SENDERS:
+            session = models.senders.smtp_session()
+        with session:
+            for item in items:
+                try:
+                    receipt_path = None
+                    if generate_receipts:
+                        receipt_path = models._generate_receipt_pdf(
+                            item['payment_id'], item['invoice_id'], item['amount'],
+                            item['method'], item['total_paid'], item.get('notes', ''),
+                        )
+                    if not send_notifications:
+                        continue
+                    invoice = models.get_invoice(item['invoice_id'])
+                    if not invoice:
+                        continue
+                    statement_path = None
+                    from apartments import get_apartment
+                    apt = get_apartment(invoice.get('unit_id'))
+                    if apt:
+                        statement_path = models._generate_account_statement_pdf(apt, invoice)
+                    models._send_payment_notifications(
+                        item['payment_id'], invoice, item['amount'], item['method'], receipt_path, statement_path,
+                    )
+                except Exception as e:
+                    models._log(f"Error in bank import follow-up for payment {item.get('payment_id')}: {e}")
+
+
+def enqueue_payment_followups(items: List[Dict], generate_receipts: bool = True,
+                              send_notifications: bool = True) -> None:
+    """Programa los recibos y notificaciones en el scheduler (o en un hilo si no está activo)."""
+    if not items:
+        return
+    from flask import current_app
+    from extensions import scheduler
+
+    app = current_app._get_current_object()
+    kwargs = {
+        'app': app,
+        'items': items,
+        'generate_receipts': generate_receipts,
+        'send_notifications': send_notifications,
+    }
+    try:
+        if getattr(scheduler, 'running', False):
+            scheduler.add_job(
+                id=f'payment_import_followups_{uuid.uuid4().hex[:12]}',
+                func=run_payment_followups,
+                trigger='date',
+                kwargs=kwargs,
+                misfire_grace_time=3600,
+            )
+            return
+    except Exception as e:
+        logger.warning(f"No se pudo programar job de recibos de importación: {e}")
+
+    threading.Thread(
+        target=run_payment_followups,
+        kwargs=kwargs,
+        name='payment-import-followups',
+        daemon=True,
+    ).start()
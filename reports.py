@@ -3,16 +3,23 @@ Módulo de Reportes
 Análisis y reportes de ventas, cuentas por cobrar y estadísticas financieras
 """
 
+import json
 import os
+import queue
 import sqlite3
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional
 from db import get_conn
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-LOG_PATH = Path(__file__).parent / "run.log"
+from utils.async_logging import RUN_LOG_PATH, get_file_logger
+
+_run_logger = get_file_logger('toscana.run', RUN_LOG_PATH)
 REPORT_TIMEZONE = "America/Santo_Domingo"
 MONTHLY_REPORT_TYPE = "monthly_financial_report"
+MONTHLY_REPORT_DEFAULT_WORKERS = 4
 MONTH_NAMES_ES = {
     1: "enero",
     2: "febrero",
@@ -29,11 +36,7 @@ MONTH_NAMES_ES = {
 }
 
 def _log(msg: str):
-    try:
-        with open(LOG_PATH, "a", encoding="utf-8") as f:
-            f.write(f"{datetime.now(timezone.utc).isoformat()} - {msg}\n")
-    except Exception:
-        pass
+    _run_logger.info(msg)
 
 
 def _normalize_email(email: Optional[str]) -> str:
@@ -100,6 +103,8 @@ def get_monthly_report_settings(app_config: Optional[Dict] = None) -> Dict[str,
     admin_email_default = (app_config.get('MONTHLY_FINANCIAL_REPORT_ADMIN_EMAIL') or '').strip()
     hour = int(app_config.get('MONTHLY_FINANCIAL_REPORT_HOUR', 6) or 6)
     minute = int(app_config.get('MONTHLY_FINANCIAL_REPORT_MINUTE', 0) or 0)
+    max_workers = int(app_config.get('MONTHLY_FINANCIAL_REPORT_MAX_WORKERS', MONTHLY_REPORT_DEFAULT_WORKERS)
+                      or MONTHLY_REPORT_DEFAULT_WORKERS)
 
     enabled = _parse_bool_setting(
         _get_customization_setting('monthly_financial_report_enabled'),
@@ -126,6 +131,7 @@ def get_monthly_report_settings(app_config: Optional[Dict] = None) -> Dict[str,
         'schedule_time': f'{hour:02d}:{minute:02d}',
         'schedule_label': f'Cada día 1 a las {hour:02d}:{minute:02d}',
         'period_basis': 'Mes anterior completo',
+        'max_workers': max_workers,
     }
 
 
@@ -249,6 +255,7 @@ def dispatch_monthly_financial_report(reference_dt: Optional[datetime] = None,
         admin_only=effective_admin_only,
         admin_email_override=effective_admin_email,
         period_mode=period_mode,
+        max_workers=settings['max_workers'],
     )
     result['status'] = 'processed'
     result['summary'] = build_monthly_report_dispatch_summary(result)
@@ -296,15 +303,86 @@ def get_report_period(reference_dt: Optional[datetime] = None, period_mode: str
     return period
 
 
+def _load_monthly_report_snapshot(period_mode: str, date_to: str, ledger_version: int) -> Optional[Dict]:
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT payload
+            FROM monthly_report_snapshots
+            WHERE report_type = ? AND period_mode = ? AND date_to = ? AND ledger_version = ?
+            """,
+            (MONTHLY_REPORT_TYPE, period_mode, date_to, ledger_version),
+        )
+        row = cur.fetchone()
+        return json.loads(row['payload']) if row else None
+    except (sqlite3.OperationalError, ValueError) as exc:
+        _log(f"No se pudo leer snapshot del reporte mensual ({date_to}): {exc}")
+        return None
+    finally:
+        conn.close()
+
+
+def _store_monthly_report_snapshot(report_data: Dict, ledger_version: int) -> None:
+    conn = get_conn()
+    try:
+        conn.execute(
+            """
+            INSERT INTO monthly_report_snapshots (
+                report_type, report_period, period_mode, date_to, ledger_version, payload, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(report_type, period_mode, date_to) DO UPDATE SET
+                report_period = excluded.report_period,
+                ledger_version = excluded.ledger_version,
+                payload = excluded.payload,
+                created_at = excluded.created_at
+            """,
+            (
+                MONTHLY_REPORT_TYPE,
+                report_data['report_period'],
+                report_data['period_mode'],
+                report_data['date_to'],
+                ledger_version,
+                json.dumps(report_data, default=str),
+                _utcnow_sql(),
+            ),
+        )
+        conn.commit()
+    except sqlite3.OperationalError as exc:
+        _log(f"No se pudo guardar snapshot del reporte mensual ({report_data.get('date_to')}): {exc}")
+    finally:
+        conn.close()
+
+
 def get_monthly_financial_report_data(reference_dt: Optional[datetime] = None,
-                                      period_mode: str = 'previous_month') -> Dict:
-    from accounting import get_cash_flow_statement, get_income_statement
+                                      period_mode: str = 'previous_month',
+                                      use_snapshot: bool = True) -> Dict:
+    """
+    Datos del reporte financiero mensual.
+
+    Los períodos cerrados se sirven desde ``monthly_report_snapshots`` mientras
+    la versión del libro hasta ``date_to`` no cambie; el mes en curso siempre
+    se recalcula.
+    """
+    from accounting import get_cash_flow_statement, get_income_statement, get_ledger_version
 
     period = get_report_period(reference_dt=reference_dt, period_mode=period_mode)
+
+    ledger_version = None
+    if use_snapshot and not period['is_partial_period']:
+        # La versión se lee antes de calcular: si alguien escribe mientras se
+        # calcula, el snapshot queda con la versión vieja y se descarta luego.
+        ledger_version = get_ledger_version(period['date_to'])
+        if ledger_version is not None:
+            snapshot = _load_monthly_report_snapshot(period['period_mode'], period['date_to'], ledger_version)
+            if snapshot is not None:
+                return snapshot
+
     income_statement = get_income_statement(period['date_from'], period['date_to'])
     cash_flow_statement = get_cash_flow_statement(period['date_from'], period['date_to'])
 
-    return {
+    report_data = {
         'report_type': MONTHLY_REPORT_TYPE,
         'date_from': period['date_from'],
         'date_to': period['date_to'],
@@ -337,6 +415,11 @@ def get_monthly_financial_report_data(reference_dt: Optional[datetime] = None,
         'cash_flow_statement': cash_flow_statement,
     }
 
+    if ledger_version is not None:
+        _store_monthly_report_snapshot(report_data, ledger_version)
+
+    return report_data
+
 
 def add_current_balance_context(report_data: Dict, as_of: Optional[datetime] = None) -> Dict:
     from accounting import get_balance_summary
@@ -549,14 +632,57 @@ def generate_monthly_financial_report_pdf_file(report_data: Dict, company_info:
     return str(pdf_path)
 
 
+def _deliver_monthly_report(recipient: Dict, report_data: Dict, pdf_path: str, company_info: Dict,
+                            allow_retry_failed: bool = True) -> Dict[str, object]:
+    from senders import send_monthly_financial_report_email
+
+    email = recipient['email']
+    if not claim_monthly_report_dispatch(
+        report_data['report_period'],
+        email,
+        allow_retry_failed=allow_retry_failed,
+    ):
+        return {'email': email, 'status': 'skipped'}
+
+    try:
+        subject = send_monthly_financial_report_email(
+            email,
+            report_data,
+            pdf_path,
+            recipient_name=recipient.get('name'),
+            recipient_type=recipient.get('recipient_type', 'resident'),
+            company_name=company_info.get('name'),
+        )
+        mark_monthly_report_dispatch_sent(report_data['report_period'], email, subject=subject)
+        return {'email': email, 'status': 'sent'}
+    except Exception as exc:
+        error_message = str(exc)
+        mark_monthly_report_dispatch_failed(report_data['report_period'], email, error_message)
+        _log(f"Error sending monthly report to {email}: {error_message}")
+        return {'email': email, 'status': 'failed', 'error': error_message}
+
+
 def send_previous_month_financial_report(reference_dt: Optional[datetime] = None,
                                          output_path: Optional[str] = None,
                                          allow_retry_failed: bool = True,
                                          admin_only: bool = False,
                                          admin_email_override: Optional[str] = None,
-                                         period_mode: str = 'previous_month') -> Dict:
+                                         period_mode: str = 'previous_month',
+                                         max_workers: Optional[int] = None,
+                                         progress_callback: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Genera el PDF una sola vez y lo envía a los destinatarios en paralelo.
+
+    Cada hilo del pool reutiliza su propia sesión SMTP. El claim en
+    ``monthly_report_dispatch_log`` sigue siendo por destinatario, así que un
+    reintento solo envía a quienes no quedaron como 'sent' o 'sending'.
+    Sin ``max_workers`` el envío es secuencial, en el orden de destinatarios;
+    ``dispatch_monthly_financial_report`` usa el valor configurado.
+    ``progress_callback`` recibe un dict con total/processed/sent/skipped/failed
+    y el último destinatario procesado.
+    """
     from company import get_company_info
-    from senders import send_monthly_financial_report_email
+    from senders import smtp_session
 
     report_data = get_monthly_financial_report_data(
         reference_dt=reference_dt,
@@ -593,35 +719,72 @@ def send_previous_month_financial_report(reference_dt: Optional[datetime] = None
     pdf_path = generate_monthly_financial_report_pdf_file(report_data, company_info, output_path=output_path)
     result['pdf_path'] = pdf_path
 
-    for recipient in target_recipients:
-        email = recipient['email']
-        if not claim_monthly_report_dispatch(
-            report_data['report_period'],
-            email,
-            allow_retry_failed=allow_retry_failed,
-        ):
-            result['skipped'].append(email)
+    total = len(target_recipients)
+    worker_count = max(1, min(int(max_workers or 1), total))
+    log_every = max(1, total // 10)
+    outcomes: List[Optional[Dict]] = [None] * total
+    pending: "queue.Queue" = queue.Queue()
+    for index, recipient in enumerate(target_recipients):
+        pending.put((index, recipient))
+
+    progress = {'total': total, 'processed': 0, 'sent': 0, 'skipped': 0, 'failed': 0}
+    progress_lock = threading.Lock()
+
+    def _worker():
+        with smtp_session():
+            while True:
+                try:
+                    index, recipient = pending.get_nowait()
+                except queue.Empty:
+                    return
+
+                # Un error fuera del envío (p. ej. "database is locked" al marcar el
+                # log) cuenta como fallo de ese destinatario, no de toda la corrida.
+                try:
+                    outcome = _deliver_monthly_report(
+                        recipient,
+                        report_data,
+                        pdf_path,
+                        company_info,
+                        allow_retry_failed=allow_retry_failed,
+                    )
+                except Exception as exc:
+                    error_message = str(exc)
+                    _log(f"Error processing monthly report for {recipient['email']}: {error_message}")
+                    outcome = {'email': recipient['email'], 'status': 'failed', 'error': error_message}
+                outcomes[index] = outcome
+
+                with progress_lock:
+                    progress['processed'] += 1
+                    progress[outcome['status']] += 1
+                    snapshot = dict(progress, email=outcome['email'], status=outcome['status'])
+
+                if snapshot['processed'] % log_every == 0 or snapshot['processed'] == total:
+                    _log(
+                        f"Reporte mensual {result['report_period']}: {snapshot['processed']}/{total} procesados "
+                        f"(enviados={snapshot['sent']}, omitidos={snapshot['skipped']}, errores={snapshot['failed']})"
+                    )
+                if progress_callback:
+                    try:
+                        progress_callback(snapshot)
+                    except Exception as exc:
+                        _log(f"Error en progress_callback del reporte mensual: {exc}")
+
+    with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix='monthly-report') as executor:
+        for future in [executor.submit(_worker) for _ in range(worker_count)]:
+            future.result()
+
+    for outcome in outcomes:
+        if outcome is None:
             continue
-
-        try:
-            subject = send_monthly_financial_report_email(
-                email,
-                report_data,
-                pdf_path,
-                recipient_name=recipient.get('name'),
-                recipient_type=recipient.get('recipient_type', 'resident'),
-                company_name=company_info.get('name'),
-            )
-            mark_monthly_report_dispatch_sent(report_data['report_period'], email, subject=subject)
-            result['sent'].append(email)
-        except Exception as exc:
-            error_message = str(exc)
-            mark_monthly_report_dispatch_failed(report_data['report_period'], email, error_message)
-            _log(f"Error sending monthly report to {email}: {error_message}")
-            result['failed'].append({'email': email, 'error': error_message})
+        if outcome['status'] == 'failed':
+            result['failed'].append({'email': outcome['email'], 'error': outcome['error']})
+        else:
+            result[outcome['status']].append(outcome['email'])
 
     return result
 
+
 def get_sales_by_period(period: str = "month") -> List[Dict]:
     """Ventas agrupadas por período con montos reales cobrados"""
     try:
@@ -3,6 +3,8 @@ import hashlib
 import hmac
 import json
 import secrets
+import sqlite3
+import threading
 import time
 from typing import Dict, Optional, Tuple
 
@@ -20,6 +22,15 @@ class ResidentTokenExpiredError(ResidentTokenError):
     pass
 
 
+DEFAULT_TOKEN_VERSION_REFRESH_SECONDS = 30
+
+# Copia en memoria de resident_token_versions (legacy_migrations/021):
+# ``None`` si la tabla no existe.
+_token_versions: Optional[Dict[int, int]] = {}
+_token_versions_loaded_at: Optional[float] = None
+_token_versions_lock = threading.Lock()
+
+
 def _now_timestamp() -> int:
     return int(time.time())
 
@@ -53,11 +64,12 @@ def _sign(signing_input: bytes) -> str:
     return _b64url_encode(signature)
 
 
-def _build_token_payload(user, token_type: str, expires_in_seconds: int) -> Dict:
+def _build_token_payload(user, token_type: str, expires_in_seconds: int, token_version: int = 0) -> Dict:
     issued_at = _now_timestamp()
     return {
         'sub': str(user.id),
         'role': user.role,
+        'ver': token_version,
         'type': token_type,
         'iss': current_app.config.get('RESIDENT_API_JWT_ISSUER', 'toscana-resident-api'),
         'iat': issued_at,
@@ -76,11 +88,74 @@ def _encode_token(payload: Dict) -> str:
     return f'{encoded_header}.{encoded_payload}.{signature}'
 
 
-def _build_token(user, token_type: str, expires_in_seconds: int) -> Tuple[str, Dict]:
-    payload = _build_token_payload(user, token_type, expires_in_seconds)
+def _build_token(user, token_type: str, expires_in_seconds: int, token_version: int = 0) -> Tuple[str, Dict]:
+    payload = _build_token_payload(user, token_type, expires_in_seconds, token_version)
     return _encode_token(payload), payload
 
 
+# ========== VERSIONES DE TOKEN ==========
+
+def _load_token_versions() -> Optional[Dict[int, int]]:
+    conn = get_conn()
+    try:
+        rows = conn.execute("SELECT user_id, version FROM resident_token_versions").fetchall()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    return {row['user_id']: row['version'] for row in rows}
+
+
+def _known_token_versions(force: bool = False) -> Optional[Dict[int, int]]:
+    """Versiones por usuario, releídas de la BD cada ``RESIDENT_API_TOKEN_VERSION_REFRESH_SECONDS``."""
+    global _token_versions, _token_versions_loaded_at
+    interval = float(current_app.config.get(
+        'RESIDENT_API_TOKEN_VERSION_REFRESH_SECONDS', DEFAULT_TOKEN_VERSION_REFRESH_SECONDS,
+    ))
+    now = time.monotonic()
+    if force or _token_versions_loaded_at is None or now - _token_versions_loaded_at >= interval:
+        versions = _load_token_versions()
+        with _token_versions_lock:
+            _token_versions = versions
+            _token_versions_loaded_at = now
+    return _token_versions
+
+
+def clear_token_version_cache() -> None:
+    """Obliga a releer las versiones en la próxima verificación."""
+    global _token_versions_loaded_at
+    with _token_versions_lock:
+        _token_versions_loaded_at = None
+
+
+def get_token_version(user_id: int) -> int:
+    """Versión vigente del usuario leída de la BD (al emitir tokens)."""
+    conn = get_conn()
+    try:
+        row = conn.execute(
+            "SELECT version FROM resident_token_versions WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        conn.close()
+    return int(row['version']) if row else 0
+
+
+def _ensure_token_version_current(user_id: int, token_version: int) -> None:
+    versions = _known_token_versions()
+    if versions is None:
+        return
+    known = versions.get(user_id, 0)
+    if token_version > known:
+        # Emitido después de la última lectura (quizás en otro proceso).
+        versions = _known_token_versions(force=True) or {}
+        known = versions.get(user_id, 0)
+    if token_version != known:
+        raise ResidentTokenError('Token revocado')
+
+
 def _store_refresh_token(user_id: int, refresh_payload: Dict) -> None:
     conn = get_conn()
     try:
@@ -132,8 +207,9 @@ def issue_token_pair(user, rotate_from_refresh_jti: Optional[str] = None) -> Dic
 
     access_lifetime_seconds = int(current_app.config.get('RESIDENT_API_ACCESS_TOKEN_MINUTES', 15)) * 60
     refresh_lifetime_seconds = int(current_app.config.get('RESIDENT_API_REFRESH_TOKEN_DAYS', 30)) * 24 * 60 * 60
-    access_token, access_payload = _build_token(user, 'access', access_lifetime_seconds)
-    refresh_token, refresh_payload = _build_token(user, 'refresh', refresh_lifetime_seconds)
+    token_version = get_token_version(user.id)
+    access_token, access_payload = _build_token(user, 'access', access_lifetime_seconds, token_version)
+    refresh_token, refresh_payload = _build_token(user, 'refresh', refresh_lifetime_seconds, token_version)
     _store_refresh_token(user.id, refresh_payload)
 
     if rotate_from_refresh_jti:
@@ -193,15 +269,30 @@ def decode_token(token: str, expected_type: str = 'access', validate_exp: bool =
 
 
 def get_user_from_token(token: str, expected_type: str = 'access', required_role: str = 'resident',
-                        require_active_refresh: bool = False, validate_exp: bool = True) -> Tuple[object, Dict]:
+                        require_active_refresh: bool = False, validate_exp: bool = True,
+                        check_version: bool = True) -> Tuple[object, Dict]:
+    """
+    Verifica el token y retorna ``(usuario, payload)``.
+
+    El rol y la versión del token se validan con los claims firmados y la copia
+    en memoria de las versiones; el usuario sale de ``user_model.get_cached_user``,
+    así que en el caso común no hay consultas. Solo el refresh con
+    ``require_active_refresh`` consulta la tabla de refresh tokens.
+    """
     payload = decode_token(token, expected_type=expected_type, validate_exp=validate_exp)
 
     try:
         user_id = int(payload.get('sub'))
+        token_version = int(payload.get('ver', 0))
     except Exception as exc:
         raise ResidentTokenError('Subject de token invalido') from exc
 
-    user = user_model.get_user_by_id(user_id)
+    if required_role and payload.get('role') != required_role:
+        raise ResidentTokenError('Rol del token no autorizado')
+    if check_version:
+        _ensure_token_version_current(user_id, token_version)
+
+    user = user_model.get_cached_user(user_id)
     if not user or not user.is_active:
         raise ResidentTokenError('Usuario asociado al token no disponible')
     if required_role and user.role != required_role:
@@ -220,6 +311,7 @@ def revoke_refresh_token(refresh_token: str, user_id: Optional[int] = None,
         required_role='resident',
         require_active_refresh=False,
         validate_exp=False,
+        check_version=False,
     )
     if user_id is not None and user.id != user_id:
         raise ResidentTokenError('Refresh token no pertenece al usuario autenticado')
@@ -269,7 +361,34 @@ def revoke_all_refresh_tokens_for_user(user_id: int) -> int:
             """,
             (_now_timestamp(), user_id),
         )
+        revoked = cur.rowcount
+        # Cerrar todas las sesiones invalida también los access tokens emitidos.
+        try:
+            cur.execute(
+                """
+                INSERT INTO resident_token_versions (user_id, version) VALUES (?, 1)
+                ON CONFLICT(user_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+                """,
+                (user_id,),
+            )
+        except sqlite3.OperationalError:
+            pass
+        conn.commit()
+        clear_token_version_cache()
+        return revoked
+    finally:
+        conn.close()
+
+
+def purge_expired_refresh_tokens() -> int:
+    """Borra los refresh tokens vencidos (ya no pasan ``decode_token``); retorna cuántos."""
+    conn = get_conn()
+    try:
+        cur = conn.execute(
+            "DELETE FROM resident_api_refresh_tokens WHERE expires_at <= ?",
+            (_now_timestamp(),),
+        )
         conn.commit()
         return cur.rowcount
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
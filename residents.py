@@ -1,8 +1,9 @@
 import secrets
 from datetime import datetime
 import sqlite3
-from typing import List, Dict, Optional, Sequence, Set
+from typing import List, Dict, Optional, Sequence, Set, Tuple
 from db import get_conn
+from utils.cache_versions import LEDGER, UNITS, invalidate, memoized
 
 ACTIVE_RESIDENT_LINK_STATUSES = ('active',)
 SUPPORTED_RESIDENT_LINK_STATUSES = {'invited', 'active', 'revoked'}
@@ -84,8 +85,20 @@ def _resolve_resident_id(cur, unit_id: int, resident_email: Optional[str], resid
     return row['id'] if row else None
 
 
-def list_linked_apartments_for_user(user_id: Optional[int], fallback_email: Optional[str] = None,
-                                    include_invited: bool = False) -> List[Dict]:
+@memoized(UNITS)
+def _linked_apartment_rows(user_id: Optional[int], fallback_email: Optional[str],
+                           include_invited: bool) -> Tuple[Dict, ...]:
+    """
+    Unidades vinculadas al usuario; sin vínculos, las que coinciden por email.
+
+    Se resuelve una vez por request y se reutiliza entre requests mientras no
+    cambie la versión ``units`` (vínculos, apartamentos o residentes).
+    """
+    return tuple(_query_linked_apartments(user_id, fallback_email, include_invited))
+
+
+def _query_linked_apartments(user_id: Optional[int], fallback_email: Optional[str],
+                             include_invited: bool) -> List[Dict]:
     statuses: Sequence[str] = ('active', 'invited') if include_invited else ACTIVE_RESIDENT_LINK_STATUSES
     conn = get_conn()
     try:
@@ -130,15 +143,16 @@ def list_linked_apartments_for_user(user_id: Optional[int], fallback_email: Opti
         conn.close()
 
 
+def list_linked_apartments_for_user(user_id: Optional[int], fallback_email: Optional[str] = None,
+                                    include_invited: bool = False) -> List[Dict]:
+    return [dict(row) for row in _linked_apartment_rows(user_id, fallback_email, include_invited)]
+
+
 def get_allowed_unit_ids_for_user(user_id: Optional[int], fallback_email: Optional[str] = None,
                                   include_invited: bool = False) -> Set[int]:
     return {
         apartment['id']
-        for apartment in list_linked_apartments_for_user(
-            user_id,
-            fallback_email=fallback_email,
-            include_invited=include_invited,
-        )
+        for apartment in _linked_apartment_rows(user_id, fallback_email, include_invited)
         if apartment.get('id') is not None
     }
 
@@ -163,6 +177,7 @@ def clear_user_apartment_links(user_id: int, clear_emails: Optional[Sequence[str
         conn.commit()
     finally:
         conn.close()
+    invalidate(UNITS)
 
 
 def link_user_to_apartment(user_id: int, unit_id: int, resident_email: Optional[str] = None,
@@ -243,6 +258,7 @@ def link_user_to_apartment(user_id: int, unit_id: int, resident_email: Optional[
         conn.commit()
     finally:
         conn.close()
+    invalidate(UNITS)
 
 
 def list_pending_invitations_for_user(user_id: int) -> List[Dict]:
@@ -366,6 +382,7 @@ def activate_resident_invitation(user_id: int, invitation_code: str,
         conn.commit()
     finally:
         conn.close()
+    invalidate(UNITS)
 
     linked_apartments = list_linked_apartments_for_user(user_id, include_invited=True)
     for apartment in linked_apartments:
@@ -376,10 +393,23 @@ def activate_resident_invitation(user_id: int, invitation_code: str,
     raise RuntimeError("No se pudo recuperar el apartamento activado")
 
 
+def _keyset_condition(date_column: str, id_column: str) -> str:
+    """Filas posteriores (en orden descendente) al cursor ``(fecha, id)``."""
+    return f" AND (COALESCE({date_column}, ''), {id_column}) < (?, ?)"
+
+
 def list_resident_invoices_for_user(user_id: Optional[int], fallback_email: Optional[str] = None,
-                                    paid: Optional[bool] = None, limit: Optional[int] = None) -> List[Dict]:
+                                    paid: Optional[bool] = None, limit: Optional[int] = None,
+                                    after: Optional[Tuple[str, int]] = None,
+                                    invoice_ids: Optional[Sequence[int]] = None) -> List[Dict]:
+    """
+    Facturas de las unidades del usuario, más recientes primero.
+
+    ``after`` es el cursor ``(issued_date, id)`` de la última fila ya entregada;
+    ``invoice_ids`` limita el resultado a esas facturas (sincronización delta).
+    """
     allowed_unit_ids = sorted(get_allowed_unit_ids_for_user(user_id, fallback_email=fallback_email))
-    if not allowed_unit_ids:
+    if not allowed_unit_ids or (invoice_ids is not None and not invoice_ids):
         return []
 
     conn = get_conn()
@@ -406,7 +436,15 @@ def list_resident_invoices_for_user(user_id: Optional[int], fallback_email: Opti
             query += " AND i.paid = ?"
             params.append(1 if paid else 0)
 
-        query += " ORDER BY i.issued_date DESC, i.id DESC"
+        if invoice_ids is not None:
+            query += f" AND i.id IN ({','.join('?' for _ in invoice_ids)})"
+            params.extend(invoice_ids)
+
+        if after is not None:
+            query += _keyset_condition('i.issued_date', 'i.id')
+            params.extend(after)
+
+        query += " ORDER BY COALESCE(i.issued_date, '') DESC, i.id DESC"
         if limit is not None:
             query += " LIMIT ?"
             params.append(limit)
@@ -420,9 +458,62 @@ def list_resident_invoices_for_user(user_id: Optional[int], fallback_email: Opti
         conn.close()
 
 
+@memoized(LEDGER)
+def get_payment_facets_for_units(unit_ids: Tuple[int, ...]) -> Dict[str, List]:
+    """
+    Métodos y meses con pagos en las unidades indicadas (filtros de la API).
+
+    Memoizado por conjunto de unidades hasta que cambie la versión ``ledger``,
+    así no se recalcula en cada página.
+    """
+    if not unit_ids:
+        return {'methods': [], 'months': []}
+
+    conn = get_conn()
+    try:
+        placeholders = ','.join('?' for _ in unit_ids)
+        rows = conn.execute(f"""
+            SELECT lower(COALESCE(NULLIF(TRIM(p.method), ''), 'sin especificar')) as method_value,
+                   MIN(COALESCE(NULLIF(TRIM(p.method), ''), 'Sin especificar')) as method_label,
+                   substr(COALESCE(p.paid_date, ''), 1, 7) as payment_month
+            FROM payments p
+            JOIN invoices i ON p.invoice_id = i.id
+            JOIN apartments a ON i.unit_id = a.id
+            WHERE i.unit_id IN ({placeholders})
+            GROUP BY method_value, payment_month
+        """, list(unit_ids)).fetchall()
+    finally:
+        conn.close()
+
+    methods: Dict[str, str] = {}
+    months: Set[str] = set()
+    for row in rows:
+        if row['method_value']:
+            methods.setdefault(row['method_value'], row['method_label'])
+        if row['payment_month']:
+            months.add(row['payment_month'])
+    return {
+        'methods': [
+            {'value': value, 'label': label}
+            for value, label in sorted(methods.items(), key=lambda item: item[1])
+        ],
+        'months': sorted(months, reverse=True),
+    }
+
+
 def get_resident_payment_history_for_user(user_id: Optional[int], fallback_email: Optional[str] = None,
                                           method: Optional[str] = None, month: Optional[str] = None,
-                                          limit: Optional[int] = None, offset: int = 0) -> Dict[str, object]:
+                                          limit: Optional[int] = None, offset: int = 0,
+                                          after: Optional[Tuple[str, int]] = None,
+                                          payment_ids: Optional[Sequence[int]] = None,
+                                          include_total: bool = True) -> Dict[str, object]:
+    """
+    Historial de pagos de las unidades del usuario, más recientes primero.
+
+    Admite paginación por ``offset`` o por cursor ``after`` = ``(paid_date, id)``.
+    ``include_total=False`` evita el ``COUNT`` (la paginación por cursor no lo
+    necesita) y ``payment_ids`` limita el resultado a esos pagos (delta).
+    """
     allowed_unit_ids = sorted(get_allowed_unit_ids_for_user(user_id, fallback_email=fallback_email))
     if not allowed_unit_ids:
         return {
@@ -453,20 +544,32 @@ def get_resident_payment_history_for_user(user_id: Optional[int], fallback_email
         except (TypeError, ValueError):
             normalized_limit = 1
 
+    facets = get_payment_facets_for_units(tuple(allowed_unit_ids))
+    items: List[Dict] = []
+    total: Optional[int] = 0 if include_total else None
+    if payment_ids is not None and not payment_ids:
+        return {
+            'items': items,
+            'total': total,
+            'methods': facets['methods'],
+            'months': facets['months'],
+            'applied_filters': {
+                'method': normalized_method,
+                'month': normalized_month,
+            },
+        }
+
     conn = get_conn()
     try:
         cur = conn.cursor()
         placeholders = ','.join('?' for _ in allowed_unit_ids)
-        base_from_clause = f"""
+        filtered_from_clause = f"""
             FROM payments p
             JOIN invoices i ON p.invoice_id = i.id
             JOIN apartments a ON i.unit_id = a.id
             WHERE i.unit_id IN ({placeholders})
         """
-        base_params = list(allowed_unit_ids)
-
-        filtered_from_clause = base_from_clause
-        filtered_params = list(base_params)
+        filtered_params = list(allowed_unit_ids)
 
         if normalized_method:
             filtered_from_clause += " AND lower(COALESCE(NULLIF(TRIM(p.method), ''), 'sin especificar')) = ?"
@@ -476,8 +579,13 @@ def get_resident_payment_history_for_user(user_id: Optional[int], fallback_email
             filtered_from_clause += " AND substr(COALESCE(p.paid_date, ''), 1, 7) = ?"
             filtered_params.append(normalized_month)
 
-        cur.execute(f"SELECT COUNT(*) as total {filtered_from_clause}", filtered_params)
-        total = int((cur.fetchone() or {'total': 0})['total'] or 0)
+        if payment_ids is not None:
+            filtered_from_clause += f" AND p.id IN ({','.join('?' for _ in payment_ids)})"
+            filtered_params.extend(payment_ids)
+
+        if include_total:
+            cur.execute(f"SELECT COUNT(*) as total {filtered_from_clause}", filtered_params)
+            total = int((cur.fetchone() or {'total': 0})['total'] or 0)
 
         items_query = f"""
             SELECT p.id,
@@ -490,9 +598,12 @@ def get_resident_payment_history_for_user(user_id: Optional[int], fallback_email
                    i.amount as invoice_total,
                    a.number as apt_number
             {filtered_from_clause}
-            ORDER BY p.paid_date DESC, p.id DESC
         """
         item_params = list(filtered_params)
+        if after is not None:
+            items_query += _keyset_condition('p.paid_date', 'p.id')
+            item_params.extend(after)
+        items_query += " ORDER BY COALESCE(p.paid_date, '') DESC, p.id DESC"
         if normalized_limit is not None:
             items_query += " LIMIT ? OFFSET ?"
             item_params.extend([normalized_limit, normalized_offset])
@@ -500,34 +611,11 @@ def get_resident_payment_history_for_user(user_id: Optional[int], fallback_email
         cur.execute(items_query, item_params)
         items = [dict(row) for row in cur.fetchall()]
 
-        cur.execute(f"""
-            SELECT DISTINCT lower(COALESCE(NULLIF(TRIM(p.method), ''), 'sin especificar')) as method_value,
-                            COALESCE(NULLIF(TRIM(p.method), ''), 'Sin especificar') as method_label
-            {base_from_clause}
-            ORDER BY method_label
-        """, base_params)
-        methods = [
-            {
-                'value': row['method_value'],
-                'label': row['method_label'],
-            }
-            for row in cur.fetchall()
-            if row['method_value']
-        ]
-
-        cur.execute(f"""
-            SELECT DISTINCT substr(COALESCE(p.paid_date, ''), 1, 7) as payment_month
-            {base_from_clause}
-            AND COALESCE(p.paid_date, '') != ''
-            ORDER BY payment_month DESC
-        """, base_params)
-        months = [row['payment_month'] for row in cur.fetchall() if row['payment_month']]
-
         return {
             'items': items,
             'total': total,
-            'methods': methods,
-            'months': months,
+            'methods': facets['methods'],
+            'months': facets['months'],
             'applied_filters': {
                 'method': normalized_method,
                 'month': normalized_month,
@@ -537,40 +625,110 @@ def get_resident_payment_history_for_user(user_id: Optional[int], fallback_email
         conn.close()
 
 
-def get_resident_statement_summary_for_user(user_id: Optional[int], fallback_email: Optional[str] = None) -> Dict:
-    apartments = list_linked_apartments_for_user(user_id, fallback_email=fallback_email)
-    invoices = list_resident_invoices_for_user(user_id, fallback_email=fallback_email)
+# ========== SINCRONIZACIÓN DELTA (legacy_migrations/019) ==========
 
-    summary_by_unit = {
-        apartment['id']: {
-            'unit_id': apartment['id'],
-            'apartment_number': apartment.get('number'),
-            'resident_name': apartment.get('resident_name'),
-            'resident_email': apartment.get('resident_email'),
-            'balance': 0.0,
-            'pending_invoices': 0,
-            'invoice_count': 0,
-            'total_invoiced': 0.0,
-            'total_paid': 0.0,
-        }
-        for apartment in apartments
-        if apartment.get('id') is not None
+def get_sync_position() -> int:
+    """Último id de ``resident_sync_log``: posición a partir de la cual sincronizar."""
+    conn = get_conn()
+    try:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'resident_sync_log'").fetchone()
+        return int(row['seq']) if row else 0
+    finally:
+        conn.close()
+
+
+def is_sync_position_available(position: int) -> bool:
+    """False si la purga ya borró cambios posteriores a ``position``."""
+    conn = get_conn()
+    try:
+        oldest = conn.execute("SELECT MIN(id) FROM resident_sync_log").fetchone()[0]
+        if oldest is None:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'resident_sync_log'").fetchone()
+            oldest = (int(row['seq']) if row else 0) + 1
+        return position + 1 >= oldest
+    finally:
+        conn.close()
+
+
+def list_changed_entity_ids(unit_ids: Sequence[int], entity: str, since: int, until: int) -> List[int]:
+    """Ids de ``entity`` ('invoice' / 'payment') cambiados en las unidades entre dos posiciones."""
+    if not unit_ids:
+        return []
+    conn = get_conn()
+    try:
+        placeholders = ','.join('?' for _ in unit_ids)
+        rows = conn.execute(
+            f"""
+            SELECT DISTINCT entity_id FROM resident_sync_log
+            WHERE unit_id IN ({placeholders}) AND entity = ? AND id > ? AND id <= ?
+            ORDER BY entity_id
+            """,
+            (*unit_ids, entity, since, until),
+        ).fetchall()
+        return [row['entity_id'] for row in rows]
+    finally:
+        conn.close()
+
+
+def purge_sync_log(retention_days: int) -> int:
+    """Borra los cambios más antiguos que ``retention_days``; retorna cuántos."""
+    conn = get_conn()
+    try:
+        cur = conn.execute(
+            "DELETE FROM resident_sync_log WHERE changed_at < datetime('now', ?)",
+            (f'-{int(retention_days)} days',),
+        )
+        conn.commit()
+        return cur.rowcount
+    finally:
+        conn.close()
+
+
+def _empty_unit_summary(unit_id: int, apartment_number: Optional[str] = None,
+                        resident_name: Optional[str] = None, resident_email: Optional[str] = None) -> Dict:
+    return {
+        'unit_id': unit_id,
+        'apartment_number': apartment_number,
+        'resident_name': resident_name,
+        'resident_email': resident_email,
+        'balance': 0.0,
+        'pending_invoices': 0,
+        'invoice_count': 0,
+        'total_invoiced': 0.0,
+        'total_paid': 0.0,
     }
 
+
+def _get_unit_balance_rows(unit_ids: Sequence[int]) -> Optional[Dict[int, Dict]]:
+    """Filas de ``unit_balance_summary`` por unidad; None si la tabla no existe."""
+    if not unit_ids:
+        return {}
+    conn = get_conn()
+    try:
+        placeholders = ','.join('?' for _ in unit_ids)
+        rows = conn.execute(
+            f"""
+            SELECT unit_id, invoice_count, pending_invoices, total_invoiced, total_paid, balance
+            FROM unit_balance_summary
+            WHERE unit_id IN ({placeholders})
+            """,
+            tuple(unit_ids),
+        ).fetchall()
+        return {row['unit_id']: dict(row) for row in rows}
+    except sqlite3.OperationalError as exc:
+        if 'unit_balance_summary' not in str(exc):
+            raise
+        return None
+    finally:
+        conn.close()
+
+
+def _fold_invoices_by_unit(summary_by_unit: Dict[int, Dict], invoices: List[Dict]) -> None:
+    """Calcula el resumen recorriendo las facturas (sin legacy_migrations/020)."""
     for invoice in invoices:
         unit_summary = summary_by_unit.setdefault(
             invoice['unit_id'],
-            {
-                'unit_id': invoice['unit_id'],
-                'apartment_number': invoice.get('apartment_number'),
-                'resident_name': None,
-                'resident_email': None,
-                'balance': 0.0,
-                'pending_invoices': 0,
-                'invoice_count': 0,
-                'total_invoiced': 0.0,
-                'total_paid': 0.0,
-            },
+            _empty_unit_summary(invoice['unit_id'], invoice.get('apartment_number')),
         )
         unit_summary['invoice_count'] += 1
         unit_summary['total_invoiced'] += float(invoice.get('amount') or 0)
@@ -579,6 +737,42 @@ def get_resident_statement_summary_for_user(user_id: Optional[int], fallback_ema
         if not invoice.get('paid'):
             unit_summary['pending_invoices'] += 1
 
+
+def get_resident_statement_summary_for_user(user_id: Optional[int], fallback_email: Optional[str] = None) -> Dict:
+    """
+    Estado de cuenta por unidad del usuario y sus totales.
+
+    Lee el resumen precalculado de ``unit_balance_summary`` (legacy_migrations/020),
+    que los triggers de facturas y pagos mantienen al día.
+    """
+    apartments = list_linked_apartments_for_user(user_id, fallback_email=fallback_email)
+
+    summary_by_unit = {
+        apartment['id']: _empty_unit_summary(
+            apartment['id'],
+            apartment.get('number'),
+            apartment.get('resident_name'),
+            apartment.get('resident_email'),
+        )
+        for apartment in apartments
+        if apartment.get('id') is not None
+    }
+
+    balance_rows = _get_unit_balance_rows(sorted(summary_by_unit))
+    if balance_rows is None:
+        _fold_invoices_by_unit(
+            summary_by_unit,
+            list_resident_invoices_for_user(user_id, fallback_email=fallback_email),
+        )
+    else:
+        for unit_id, row in balance_rows.items():
+            unit_summary = summary_by_unit[unit_id]
+            unit_summary['invoice_count'] = int(row['invoice_count'] or 0)
+            unit_summary['pending_invoices'] = int(row['pending_invoices'] or 0)
+            unit_summary['total_invoiced'] = float(row['total_invoiced'] or 0)
+            unit_summary['total_paid'] = float(row['total_paid'] or 0)
+            unit_summary['balance'] = float(row['balance'] or 0)
+
     apartment_summaries = sorted(summary_by_unit.values(), key=lambda item: (item.get('apartment_number') or ''))
     return {
         'apartments': apartment_summaries,
@@ -639,6 +833,7 @@ def add_resident(unit_id: Optional[int], name: str, role: str = "tenant", email:
     conn.commit()
     rid = cur.lastrowid
     conn.close()
+    invalidate(UNITS)
     return rid
 
 def list_residents(unit_id: Optional[int] = None) -> List[Dict]:
@@ -709,6 +904,7 @@ def update_resident(resident_id: int, **fields) -> None:
     cur.execute(f"UPDATE residents SET {', '.join(keys)} WHERE id=?", vals)
     conn.commit()
     conn.close()
+    invalidate(UNITS)
 
 def delete_resident(resident_id: int) -> None:
     conn = get_conn()
@@ -716,6 +912,7 @@ def delete_resident(resident_id: int) -> None:
     cur.execute("DELETE FROM residents WHERE id=?", (resident_id,))
     conn.commit()
     conn.close()
+    invalidate(UNITS)
 
 def list_by_unit(unit_id: int) -> List[Dict]:
     return list_residents(unit_id)
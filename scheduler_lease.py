@@ -0,0 +1,193 @@
+"""
+Módulo de Lease del Scheduler
+Elección de líder para las tareas programadas con una fila en SQLite.
+
+``extensions.init_extensions`` arranca el scheduler en cada proceso que crea la
+app; con varios workers de gunicorn cada trabajo correría una vez por worker.
+Con ``SCHEDULER_MODE=lease`` (por defecto) cada proceso registra el latido
+``scheduler_lease_heartbeat``, que toma o renueva la fila ``scheduler`` de
+``scheduler_leases`` (migración 022) con un solo UPSERT condicional: solo se
+escribe si el proceso ya es el dueño o si el lease del dueño anterior venció.
+Los trabajos decorados con ``leader_only`` se omiten en los demás procesos.
+
+Si el líder muere, su lease vence tras ``SCHEDULER_LEASE_TTL_SECONDS`` y otro
+proceso lo toma en su siguiente latido; al terminar normalmente lo libera para
+que el relevo sea inmediato.
+
+Modos (``SCHEDULER_MODE``):
+  * ``lease``: todos los procesos arrancan el scheduler y solo el líder ejecuta.
+  * ``off``: el proceso no arranca el scheduler (workers web cuando las tareas
+    corren en ``scripts/run_scheduler.py``).
+  * ``always``: sin lease, como antes (un único proceso).
+
+Si la tabla no existe (migración sin aplicar) el proceso actúa como líder.
+"""
+
+import atexit
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from functools import wraps
+from typing import Optional
+
+import db as legacy_db
+import metrics
+
+LEASE_NAME = 'scheduler'
+SCHEDULER_MODES = ('lease', 'off', 'always')
+DEFAULT_TTL_SECONDS = 60.0
+# El líder deja de ejecutar trabajos un poco antes de que su lease venza.
+EXPIRY_MARGIN_SECONDS = 2.0
+
+_state_lock = threading.Lock()
+_mode = 'lease'
+_ttl = DEFAULT_TTL_SECONDS
+_holder_token = uuid.uuid4().hex[:8]
+_expires_at = 0.0
+
+
+# ========== OPERACIONES SOBRE LA TABLA ==========
+
+def try_acquire(holder: str, ttl: float, name: str = LEASE_NAME,
+                now: Optional[float] = None) -> Optional[float]:
+    """
+    Toma o renueva el lease ``name`` para ``holder``.
+
+    Retorna el nuevo vencimiento (epoch) si ``holder`` queda como dueño, None si
+    otro proceso tiene un lease vigente. Sin la tabla retorna ``now + ttl``.
+    """
+    now = time.time() if now is None else now
+    expires_at = now + ttl
+    conn = legacy_db.get_conn()
+    try:
+        cur = conn.execute(
+            """
+            INSERT INTO scheduler_leases (name, holder, acquired_at, heartbeat_at, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                acquired_at = CASE WHEN scheduler_leases.holder = excluded.holder
+                                   THEN scheduler_leases.acquired_at ELSE excluded.acquired_at END,
+                holder = excluded.holder,
+                heartbeat_at = excluded.heartbeat_at,
+                expires_at = excluded.expires_at
+            WHERE scheduler_leases.holder = excluded.holder
+               OR scheduler_leases.expires_at <= excluded.heartbeat_at
+            """,
+            (name, holder, now, now, expires_at),
+        )
+        conn.commit()
+        return expires_at if cur.rowcount else None
+    except sqlite3.OperationalError as exc:
+        if 'no such table' not in str(exc):
+            raise
+        return expires_at
+    finally:
+        conn.close()
+
+
+def release_lease(holder: str, name: str = LEASE_NAME) -> bool:
+    """Libera el lease si ``holder`` es su dueño."""
+    conn = legacy_db.get_conn()
+    try:
+        cur = conn.execute(
+            "DELETE FROM scheduler_leases WHERE name = ? AND holder = ?",
+            (name, holder),
+        )
+        conn.commit()
+        return bool(cur.rowcount)
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def get_lease(name: str = LEASE_NAME) -> Optional[dict]:
+    """Fila actual del lease (o None)."""
+    conn = legacy_db.get_conn()
+    try:
+        row = conn.execute(
+            "SELECT name, holder, acquired_at, heartbeat_at, expires_at FROM scheduler_leases WHERE name = ?",
+            (name,),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+# ========== ESTADO DEL PROCESO ==========
+
+def configure(mode: str = 'lease', ttl: float = DEFAULT_TTL_SECONDS) -> None:
+    """Fija el modo y la duración del lease de este proceso (desde ``create_app``)."""
+    global _mode, _ttl
+    if mode not in SCHEDULER_MODES:
+        raise ValueError(f"SCHEDULER_MODE inválido: {mode!r} (usar {', '.join(SCHEDULER_MODES)})")
+    with _state_lock:
+        _mode = mode
+        _ttl = float(ttl)
+
+
+def holder_id() -> str:
+    """Dueño del lease para este proceso (el pid cambia tras un fork de gunicorn --preload)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{_holder_token}"
+
+
+def is_leader() -> bool:
+    """True si este proceso debe ejecutar los trabajos programados."""
+    if _mode == 'always':
+        return True
+    return _expires_at - EXPIRY_MARGIN_SECONDS > time.time()
+
+
+def heartbeat() -> bool:
+    """
+    Toma o renueva el lease de este proceso; retorna si quedó como líder.
+
+    Si la BD falla (p. ej. bloqueada) se conserva el lease actual hasta que venza.
+    """
+    global _expires_at
+    with _state_lock:
+        was_leader = _expires_at > time.time()
+        try:
+            expires_at = try_acquire(holder_id(), _ttl)
+        except sqlite3.Error:
+            return is_leader()
+        _expires_at = expires_at or 0.0
+    if expires_at and not was_leader:
+        metrics.inc_counter('app_scheduler_lease_changes_total', event='acquired')
+    elif was_leader and not expires_at:
+        metrics.inc_counter('app_scheduler_lease_changes_total', event='lost')
+    return bool(expires_at)
+
+
+def release() -> None:
+    """Libera el lease al terminar el proceso para que otro lo tome sin esperar."""
+    global _expires_at
+    with _state_lock:
+        if _expires_at <= 0:
+            return
+        _expires_at = 0.0
+    try:
+        release_lease(holder_id())
+    except Exception:
+        pass
+
+
+atexit.register(release)
+
+
+def leader_only(job_id: str):
+    """Decorador: el trabajo solo corre en el proceso que tiene el lease."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_leader():
+                metrics.inc_counter('app_scheduler_jobs_skipped_total', job=job_id)
+                return None
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
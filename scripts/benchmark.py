@@ -0,0 +1,375 @@
+"""
+Benchmark de las rutas críticas de la aplicación sobre datos sintéticos.
+
+Para cada escala (cantidad de facturas) genera una base con
+``scripts/generate_synthetic_data.py`` y, en un proceso aparte (la ruta de la BD
+se fija al importar ``db`` y ``config``), mide:
+
+- Páginas: dashboard, listado de facturas, listado de pagos y reportes.
+- API de residentes: facturas, pagos y resumen de estado de cuenta.
+- Operaciones: ``record_payment`` y ``process_due_recurring_invoices``.
+
+Cada escenario se ejecuta ``--repeat`` veces con el cache vacío y se reportan
+mediana, p95, mínimo y máximo en milisegundos, más la cantidad de consultas SQL
+del request (encabezado ``Server-Timing``). El resultado se guarda en JSON junto
+con el commit actual, para comparar contra una corrida anterior con ``--compare``.
+
+Uso:
+    python scripts/benchmark.py --scales 1k,10k --output data/benchmarks/base.json
+    python scripts/benchmark.py --scales 1k,10k,100k --compare data/benchmarks/base.json --fail-on-regression
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+DEFAULT_SCALES = '1k,10k,100k'
+DEFAULT_OUTPUT_DIR = BASE_DIR / 'data' / 'benchmarks'
+
+HTTP_SCENARIOS = (
+    ('dashboard', '/dashboard', 'admin'),
+    ('invoice_list', '/ventas/facturas', 'admin'),
+    ('payment_list', '/ventas/pagos', 'admin'),
+    ('reports_page', '/reportes/', 'admin'),
+    ('resident_api_invoices', '/api/resident/invoices', 'resident'),
+    ('resident_api_payments', '/api/resident/payments', 'resident'),
+    ('resident_api_statement_summary', '/api/resident/statement-summary', 'resident'),
+)
+
+_SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+# ==========================================
+# UTILIDADES
+# ==========================================
+
+def parse_scales(value: str) -> List[int]:
+    """Convierte ``'1k,10k,100k'`` en ``[1000, 10000, 100000]``."""
+    scales = []
+    for item in value.split(','):
+        item = item.strip().lower()
+        if not item:
+            continue
+        multiplier = 1
+        if item.endswith('k'):
+            item, multiplier = item[:-1], 1000
+        elif item.endswith('m'):
+            item, multiplier = item[:-1], 1000000
+        scales.append(int(float(item) * multiplier))
+    return scales
+
+
+def scale_label(invoices: int) -> str:
+    if invoices >= 1000 and invoices % 1000 == 0:
+        return f'{invoices // 1000}k'
+    return str(invoices)
+
+
+def summarize(samples_ms: List[float]) -> Dict:
+    """Mediana, p95, mínimo, máximo y promedio de una lista de tiempos."""
+    ordered = sorted(samples_ms)
+    p95_index = max(0, math.ceil(0.95 * len(ordered)) - 1)
+    return {
+        'runs': len(ordered),
+        'median_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[p95_index], 3),
+        'min_ms': round(ordered[0], 3),
+        'max_ms': round(ordered[-1], 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, timeout=10, check=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+# ==========================================
+# MEDICIÓN (proceso por escala)
+# ==========================================
+
+def _time_http(client, cache, path: str, headers: Dict, repeat: int, warmup: int) -> Dict:
+    samples, queries, statuses = [], [], set()
+    for iteration in range(warmup + repeat):
+        cache.clear()
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        response.close()
+        if iteration < warmup:
+            continue
+        samples.append(elapsed_ms)
+        statuses.add(response.status_code)
+        match = _SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+        if match:
+            queries.append(int(match.group(1)))
+
+    result = summarize(samples)
+    result['status_codes'] = sorted(statuses)
+    if queries:
+        result['sql_queries'] = int(statistics.median(queries))
+    return result
+
+
+def _time_record_payment(app, cache, repeat: int) -> Dict:
+    import models
+    from data_models.models import Invoice
+
+    with app.app_context():
+        pending = (
+            Invoice.query.filter_by(paid=False)
+            .order_by(Invoice.id)
+            .limit(repeat)
+            .all()
+        )
+        targets = [(invoice.id, invoice.pending_amount or invoice.amount) for invoice in pending]
+
+    samples = []
+    for invoice_id, amount in targets:
+        cache.clear()
+        with app.test_request_context():
+            started = time.perf_counter()
+            models.record_payment(
+                invoice_id, amount, 'transferencia',
+                generate_receipt=False, send_notifications=False, notes='benchmark',
+            )
+            samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples) if samples else {'runs': 0}
+
+
+def _time_recurring(app, cache, repeat: int) -> Dict:
+    import models
+
+    samples, generated = [], 0
+    for _ in range(repeat):
+        cache.clear()
+        with app.app_context():
+            started = time.perf_counter()
+            outcome = models.process_due_recurring_invoices()
+            samples.append((time.perf_counter() - started) * 1000)
+        generated += len(outcome['generated'])
+    result = summarize(samples)
+    # Con los datos sintéticos el ciclo actual ya está facturado: se mide el chequeo en vacío.
+    result['generated'] = generated
+    return result
+
+
+def run_scale(db_path: str, invoices: int, years: int, seed: int, repeat: int, warmup: int) -> Dict:
+    """Genera la base de una escala y mide todos los escenarios en este proceso."""
+    from scripts.generate_synthetic_data import (
+        BENCH_ADMIN_USERNAME,
+        BENCH_PASSWORD,
+        BENCH_RESIDENT_USERNAME,
+        build_database,
+    )
+
+    started = time.perf_counter()
+    counts = build_database(db_path, invoices=invoices, years=years, seed=seed)
+    generation_seconds = time.perf_counter() - started
+
+    from app import create_app
+    from config import TestingConfig
+    from extensions import cache, limiter, scheduler
+    from extensions import db as sa_db
+
+    app = create_app(config_object=TestingConfig)
+    app.config['WTF_CSRF_ENABLED'] = False
+    limiter.enabled = False
+    try:
+        scheduler.pause()
+    except Exception:
+        pass
+
+    with app.app_context():
+        sa_db.create_all()
+        import resident_auth
+        from data_models.models import User
+
+        resident = User.query.filter_by(username=BENCH_RESIDENT_USERNAME).first()
+        resident_token = resident_auth.issue_token_pair(resident)['access_token']
+
+    admin_client = app.test_client()
+    login = admin_client.post('/auth/login', data={'username': BENCH_ADMIN_USERNAME, 'password': BENCH_PASSWORD})
+    if login.status_code not in (302, 303):
+        raise RuntimeError(f'No se pudo iniciar sesión como {BENCH_ADMIN_USERNAME} (HTTP {login.status_code})')
+
+    # La API de residentes rechaza sesiones de administrador: cliente aparte, solo con token.
+    actors = {
+        'admin': (admin_client, {}),
+        'resident': (app.test_client(), {'Authorization': f'Bearer {resident_token}'}),
+    }
+    scenarios = {}
+    for name, path, actor in HTTP_SCENARIOS:
+        client, headers = actors[actor]
+        scenarios[name] = _time_http(client, cache, path, headers, repeat, warmup)
+        scenarios[name]['path'] = path
+    scenarios['record_payment'] = _time_record_payment(app, cache, repeat)
+    scenarios['process_due_recurring_invoices'] = _time_recurring(app, cache, repeat)
+
+    return {
+        'invoices': invoices,
+        'dataset': counts,
+        'generation_seconds': round(generation_seconds, 3),
+        'scenarios': scenarios,
+    }
+
+
+def _run_scale_subprocess(invoices: int, args, work_dir: Path) -> Dict:
+    db_path = work_dir / f'bench_{scale_label(invoices)}.db'
+    result_path = work_dir / f'bench_{scale_label(invoices)}.json'
+    env = dict(os.environ)
+    env.update({
+        'BUILDING_MAINTENANCE_DB': str(db_path),
+        'AUTO_CREATE_ADMIN': '0',
+        'TESTING': 'True',
+    })
+    command = [
+        sys.executable, str(Path(__file__).resolve()), '--worker',
+        '--invoices', str(invoices), '--db', str(db_path), '--result', str(result_path),
+        '--years', str(args.years), '--seed', str(args.seed),
+        '--repeat', str(args.repeat), '--warmup', str(args.warmup),
+    ]
+    completed = subprocess.run(command, cwd=BASE_DIR, env=env, capture_output=not args.verbose, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f'La escala {scale_label(invoices)} falló (código {completed.returncode}):\n{completed.stderr or ""}'
+        )
+    return json.loads(result_path.read_text(encoding='utf-8'))
+
+
+# ==========================================
+# COMPARACIÓN
+# ==========================================
+
+def compare_results(current: Dict, baseline: Dict, threshold_pct: float = 20.0,
+                    min_delta_ms: float = 1.0) -> List[Dict]:
+    """
+    Compara medianas escenario por escenario. Es regresión si la mediana creció
+    más de ``threshold_pct`` y más de ``min_delta_ms`` (evita ruido en rutas muy rápidas).
+    """
+    rows = []
+    for label, scale in current.get('scales', {}).items():
+        base_scale = baseline.get('scales', {}).get(label)
+        if not base_scale:
+            continue
+        for name, stats in scale['scenarios'].items():
+            base_stats = base_scale['scenarios'].get(name)
+            if not base_stats or not base_stats.get('runs') or not stats.get('runs'):
+                continue
+            before, after = base_stats['median_ms'], stats['median_ms']
+            change_pct = ((after - before) / before * 100) if before else 0.0
+            rows.append({
+                'scale': label,
+                'scenario': name,
+                'baseline_ms': before,
+                'current_ms': after,
+                'change_pct': round(change_pct, 1),
+                'regression': change_pct > threshold_pct and (after - before) > min_delta_ms,
+            })
+    return rows
+
+
+def _print_results(results: Dict) -> None:
+    for label, scale in results['scales'].items():
+        print(f"\n== {label} facturas ({scale['generation_seconds']}s generando datos) ==")
+        print(f"{'escenario':<34}{'mediana':>10}{'p95':>10}{'min':>10}{'sql':>6}")
+        for name, stats in scale['scenarios'].items():
+            if not stats.get('runs'):
+                print(f'{name:<34}{"-":>10}')
+                continue
+            print(f"{name:<34}{stats['median_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+                  f"{stats['min_ms']:>10.1f}{str(stats.get('sql_queries', '-')):>6}")
+
+
+def _print_comparison(rows: List[Dict], baseline_commit: Optional[str]) -> None:
+    print(f"\n== Comparación contra {baseline_commit or 'corrida anterior'} ==")
+    for row in rows:
+        flag = '  REGRESIÓN' if row['regression'] else ''
+        print(f"{row['scale']:>6} {row['scenario']:<34}{row['baseline_ms']:>10.1f} -> "
+              f"{row['current_ms']:>10.1f} ms ({row['change_pct']:+.1f}%){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de rutas críticas sobre datos sintéticos.')
+    parser.add_argument('--scales', default=DEFAULT_SCALES, help='Escalas en facturas, p. ej. 1k,10k,100k.')
+    parser.add_argument('--repeat', type=int, default=5, help='Mediciones por escenario.')
+    parser.add_argument('--warmup', type=int, default=1, help='Ejecuciones descartadas antes de medir.')
+    parser.add_argument('--years', type=int, default=3, help='Años de historial en los datos sintéticos.')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla del generador.')
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto en data/benchmarks/).')
+    parser.add_argument('--compare', help='JSON de una corrida anterior para detectar regresiones.')
+    parser.add_argument('--threshold', type=float, default=20.0, help='Porcentaje de aumento considerado regresión.')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Salir con código 1 si hay regresiones.')
+    parser.add_argument('--keep-db', help='Directorio donde conservar las bases generadas.')
+    parser.add_argument('--verbose', action='store_true', help='Mostrar la salida de los procesos por escala.')
+    # Uso interno: medición de una sola escala en un proceso aislado.
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--invoices', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_scale(args.db, args.invoices, args.years, args.seed, args.repeat, args.warmup)
+        Path(args.result).write_text(json.dumps(result), encoding='utf-8')
+        return 0
+
+    commit = _git_commit()
+    results = {
+        'commit': commit,
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'years': args.years,
+        'scales': {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix='benchmark_') as tmp_dir:
+        work_dir = Path(args.keep_db or tmp_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        for invoices in parse_scales(args.scales):
+            print(f'Midiendo escala {scale_label(invoices)}...', flush=True)
+            results['scales'][scale_label(invoices)] = _run_scale_subprocess(invoices, args, work_dir)
+
+    output = Path(args.output) if args.output else (
+        DEFAULT_OUTPUT_DIR / f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{commit or 'local'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+    _print_results(results)
+    print(f'\nResultados guardados en {output}')
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        rows = compare_results(results, baseline, threshold_pct=args.threshold)
+        _print_comparison(rows, baseline.get('commit'))
+        if args.fail_on_regression and any(row['regression'] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Build de archivos estáticos: huellas, precompresión y lista del service worker.
+
+Copia CSS, JS, íconos y ``offline.html`` de ``static/`` a ``static/dist`` con el
+hash del contenido en el nombre (``css/app.css`` -> ``dist/css/app.1a2b3c4d.css``),
+genera variantes ``.gz`` (y ``.br`` si está instalado ``brotli``) de los tipos
+textuales y escribe:
+
+- ``dist/assets-manifest.json``: mapa usado por ``url_for('static', ...)``.
+- ``dist/sw-precache.js``: lista de URLs que precarga ``static/sw.js``.
+
+``static/dist`` es un artefacto de build (no se versiona); el despliegue lo
+regenera después de cada ``git pull``.
+
+Uso:
+    python scripts/build_static.py
+    python scripts/build_static.py --static-dir /ruta/a/static
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from utils.compression import COMPRESSIBLE_MIMETYPES, brotli  # noqa: E402
+from utils.static_assets import DIST_DIRNAME, MANIFEST_FILENAME, PRECACHE_FILENAME  # noqa: E402
+
+DEFAULT_STATIC_DIR = BASE_DIR / 'static'
+# Solo los assets versionados del repo. Lo que la app escribe en static/ en
+# tiempo de ejecución (uploads, PDFs de facturas y estados de cuenta en
+# invoices/ y reports/) no debe quedar en la lista pública del service worker.
+# sw.js y manifest.json conservan su URL: el registro del service worker y la
+# PWA instalada dependen de ella.
+INCLUDED_TOP_LEVEL = {'css', 'js', 'icons', 'offline.html'}
+HASH_LENGTH = 8
+MIN_PRECOMPRESS_SIZE = 256
+
+
+def _fingerprinted_name(relative: Path, digest: str) -> Path:
+    return relative.with_name(f'{relative.stem}.{digest[:HASH_LENGTH]}{relative.suffix}')
+
+
+def _is_compressible(path: Path) -> bool:
+    return mimetypes.guess_type(path.name)[0] in COMPRESSIBLE_MIMETYPES
+
+
+def _precompress(path: Path, data: bytes) -> None:
+    if len(data) < MIN_PRECOMPRESS_SIZE or not _is_compressible(path):
+        return
+    path.with_name(path.name + '.gz').write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        path.with_name(path.name + '.br').write_bytes(brotli.compress(data, quality=11))
+
+
+def _source_files(static_dir: Path):
+    for path in sorted(static_dir.rglob('*')):
+        relative = path.relative_to(static_dir)
+        if not path.is_file() or relative.parts[0] not in INCLUDED_TOP_LEVEL or path.name.startswith('.'):
+            continue
+        yield path, relative
+
+
+def build_static(static_dir: Optional[Path] = None) -> Dict[str, str]:
+    """Regenera ``static/dist`` y devuelve el manifiesto ``ruta lógica -> ruta con huella``."""
+    static_dir = Path(static_dir or DEFAULT_STATIC_DIR)
+    dist_dir = static_dir / DIST_DIRNAME
+    if dist_dir.exists():
+        shutil.rmtree(dist_dir)
+    dist_dir.mkdir(parents=True)
+
+    files: Dict[str, str] = {}
+    for source, relative in _source_files(static_dir):
+        data = source.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        target_relative = Path(DIST_DIRNAME) / _fingerprinted_name(relative, digest)
+        target = static_dir / target_relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        _precompress(target, data)
+        files[relative.as_posix()] = target_relative.as_posix()
+
+    build_id = hashlib.sha256(json.dumps(files, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    (dist_dir / MANIFEST_FILENAME).write_text(
+        json.dumps({'build_id': build_id, 'files': files}, indent=2, sort_keys=True),
+        encoding='utf-8',
+    )
+
+    precache_urls = sorted(f'/static/{path}' for path in files.values())
+    (dist_dir / PRECACHE_FILENAME).write_text(
+        '// Generado por scripts/build_static.py. No editar.\n'
+        f'self.PRECACHE_VERSION = {json.dumps(build_id)};\n'
+        f'self.PRECACHE_URLS = {json.dumps(precache_urls, indent=2)};\n',
+        encoding='utf-8',
+    )
+    return files
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Genera static/dist con huellas y variantes precomprimidas.')
+    parser.add_argument('--static-dir', type=Path, default=DEFAULT_STATIC_DIR)
+    args = parser.parse_args(argv)
+
+    files = build_static(args.static_dir)
+    print(f"{len(files)} archivos en {args.static_dir / DIST_DIRNAME}"
+          f" (brotli {'activado' if brotli is not None else 'no disponible, solo gzip'})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
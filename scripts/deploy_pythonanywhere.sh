@@ -32,6 +32,7 @@ fi
 
 "$PYTHON_BIN" -m pip install -r requirements.txt
 "$PYTHON_BIN" scripts/fix_db_pythonanywhere.py
+"$PYTHON_BIN" scripts/build_static.py
 "$PYTHON_BIN" scripts/verify_deployment.py
 touch "$WSGI_FILE"
 
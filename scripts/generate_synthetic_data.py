@@ -0,0 +1,309 @@
+"""
+Generador de datos sintéticos reproducibles para pruebas de carga.
+
+Crea una base SQLite con apartamentos, residentes, varios años de facturas
+mensuales, pagos (con sus asientos contables), gastos, proveedores y ventas
+recurrentes. Con la misma semilla y la misma fecha de referencia el resultado
+es idéntico, de modo que los benchmarks de distintos commits son comparables.
+
+Uso:
+    python scripts/generate_synthetic_data.py --db data/bench_10k.db --invoices 10000
+    python scripts/generate_synthetic_data.py --db /tmp/bench.db --invoices 1000 --years 2 --seed 7
+"""
+
+import argparse
+import math
+import random
+import sqlite3
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+LEGACY_MIGRATIONS_DIR = BASE_DIR / 'legacy_migrations'
+
+BENCH_ADMIN_USERNAME = 'bench_admin'
+BENCH_RESIDENT_USERNAME = 'bench_resident'
+BENCH_PASSWORD = 'bench-password-123'
+
+MONTHLY_FEE_CHOICES = (2500.0, 3000.0, 3500.0, 4200.0, 5000.0)
+EXPENSE_CATEGORIES = ('Mantenimiento', 'Limpieza', 'Seguridad', 'Electricidad', 'Agua', 'Jardinería')
+PAYMENT_METHODS = ('transferencia', 'efectivo', 'deposito', 'cheque')
+FIRST_NAMES = ('Ana', 'Luis', 'María', 'José', 'Carmen', 'Pedro', 'Rosa', 'Juan', 'Elena', 'Miguel')
+LAST_NAMES = ('Pérez', 'Gómez', 'Rodríguez', 'Martínez', 'Sánchez', 'Díaz', 'Reyes', 'Castillo')
+
+
+# ==========================================
+# ESQUEMA
+# ==========================================
+
+def _run_statements(conn: sqlite3.Connection, sql_text: str) -> None:
+    """Ejecuta sentencia por sentencia ignorando columnas/índices ya existentes."""
+    buffer = ''
+    for line in sql_text.splitlines(keepends=True):
+        if line.lstrip().startswith('--'):
+            continue
+        buffer += line
+        if not sqlite3.complete_statement(buffer):
+            continue
+        statement, buffer = buffer.strip(), ''
+        try:
+            conn.execute(statement)
+        except sqlite3.OperationalError as exc:
+            message = str(exc).lower()
+            if 'duplicate column' not in message and 'already exists' not in message:
+                raise
+
+
+def apply_legacy_migrations(conn: sqlite3.Connection) -> None:
+    """Aplica ``legacy_migrations/*.sql`` sobre el esquema base de ``db.py``."""
+    for sql_file in sorted(LEGACY_MIGRATIONS_DIR.glob('*.sql')):
+        sql_text = sql_file.read_text(encoding='utf-8')
+        try:
+            conn.executescript(sql_text)
+        except sqlite3.OperationalError:
+            _run_statements(conn, sql_text)
+    conn.commit()
+
+
+def prepare_schema(conn: sqlite3.Connection) -> None:
+    """Crea el esquema legacy completo en una base vacía."""
+    import db
+
+    db._create_schema(conn.cursor())
+    conn.commit()
+    apply_legacy_migrations(conn)
+
+
+# ==========================================
+# GENERACIÓN
+# ==========================================
+
+def _month_starts(today: date, months: int):
+    """Primer día de cada mes, terminando en el mes de ``today``."""
+    year, month = today.year, today.month
+    result = []
+    for _ in range(months):
+        result.append(date(year, month, 1))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return list(reversed(result))
+
+
+def _hash_password(password: str) -> str:
+    import bcrypt
+
+    # Costo mínimo: son credenciales desechables de benchmark.
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+
+
+def generate_dataset(conn: sqlite3.Connection, invoices: int = 1000, years: int = 3,
+                     seed: int = 42, today: Optional[date] = None) -> Dict[str, int]:
+    """
+    Inserta un conjunto de datos determinista sobre un esquema ya creado.
+
+    La cantidad de apartamentos se deriva de ``invoices`` / meses, con una factura
+    mensual por apartamento vinculada a su venta recurrente. Las facturas antiguas
+    quedan mayormente pagadas; las de los dos últimos meses, cerca de la mitad.
+
+    Returns:
+        Conteo de filas insertadas por tabla.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    months = max(1, years * 12)
+    month_starts = _month_starts(today, months)
+    apartments = max(1, math.ceil(invoices / months))
+    cur = conn.cursor()
+
+    # Catálogo y proveedores
+    cur.execute(
+        "INSERT INTO products_services(code, name, type, description, price, active) VALUES(?,?,?,?,?,1)",
+        ('MANT', 'Cuota de mantenimiento', 'service', 'Cuota mensual de mantenimiento', MONTHLY_FEE_CHOICES[0]),
+    )
+    service_id = cur.lastrowid
+    supplier_rows = [
+        (f'Proveedor {i + 1}', f'proveedor{i + 1}@example.com', f'809-555-{1000 + i}', rng.choice(EXPENSE_CATEGORIES))
+        for i in range(12)
+    ]
+    cur.executemany("INSERT INTO suppliers(name, email, phone, supplier_type) VALUES(?,?,?,?)", supplier_rows)
+    supplier_ids = [row[0] for row in cur.execute("SELECT id FROM suppliers ORDER BY id")]
+
+    # Apartamentos y residentes
+    apartment_rows = []
+    for i in range(apartments):
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        apartment_rows.append((
+            f'{chr(65 + (i // 400) % 26)}-{i + 1:05d}', str(1 + (i // 8) % 20), name,
+            rng.choice(('owner', 'tenant')), f'residente{i + 1}@example.com', f'809-{rng.randint(2000000, 9999999)}',
+        ))
+    cur.executemany("""
+        INSERT INTO apartments(number, floor, resident_name, resident_role, resident_email, resident_phone)
+        VALUES(?,?,?,?,?,?)
+    """, apartment_rows)
+    unit_ids = [row[0] for row in cur.execute("SELECT id FROM apartments ORDER BY id")]
+    cur.executemany(
+        "INSERT INTO residents(unit_id, name, email, phone, role) VALUES(?,?,?,?,?)",
+        [(unit_id, row[2], row[4], row[5], row[3]) for unit_id, row in zip(unit_ids, apartment_rows)],
+    )
+
+    # Ventas recurrentes: una cuota mensual por apartamento
+    fees = {unit_id: rng.choice(MONTHLY_FEE_CHOICES) for unit_id in unit_ids}
+    first_month = month_starts[0].isoformat()
+    cur.executemany("""
+        INSERT INTO recurring_sales(unit_id, service_id, amount, frequency, billing_day, billing_time,
+                                    start_date, description, active, last_generated)
+        VALUES(?,?,?,'monthly',1,'00:00',?,?,1,?)
+    """, [
+        (unit_id, service_id, fees[unit_id], first_month, 'Cuota de mantenimiento', today.replace(day=1).isoformat())
+        for unit_id in unit_ids
+    ])
+    sale_ids = dict(cur.execute("SELECT unit_id, id FROM recurring_sales"))
+
+    # Facturas mensuales: se llenan desde el mes actual hacia atrás para que el
+    # corte en exactamente ``invoices`` filas solo deje incompleto el mes más antiguo.
+    invoice_rows = []
+    for month_start in reversed(month_starts):
+        for unit_id in unit_ids:
+            if len(invoice_rows) >= invoices:
+                break
+            due = month_start.replace(day=rng.randint(15, 28))
+            invoice_rows.append((
+                unit_id, f"Cuota de mantenimiento {month_start.strftime('%m/%Y')}", fees[unit_id],
+                f'{month_start.isoformat()}T08:00:00+00:00', due.isoformat(), sale_ids[unit_id],
+            ))
+    invoice_rows.sort(key=lambda row: (row[3], row[0]))
+    cur.executemany("""
+        INSERT INTO invoices(unit_id, description, amount, issued_date, due_date, paid, pending_amount,
+                             recurring_sale_id)
+        VALUES(?,?,?,?,?,0,0,?)
+    """, invoice_rows)
+
+    # Pagos y asientos contables
+    recent_cutoff = month_starts[-2].isoformat() if len(month_starts) > 1 else month_starts[-1].isoformat()
+    payment_rows, transaction_rows, status_rows = [], [], []
+    invoice_list = cur.execute("SELECT id, amount, issued_date, due_date FROM invoices ORDER BY id").fetchall()
+    for invoice_id, amount, issued_date, due_date in invoice_list:
+        probability = 0.5 if issued_date[:10] >= recent_cutoff else 0.92
+        if rng.random() >= probability:
+            status_rows.append((0, amount, invoice_id))
+            continue
+        installments = 2 if rng.random() < 0.15 else 1
+        paid_day = date.fromisoformat(due_date[:10])
+        paid_total = 0.0
+        for part in range(installments):
+            part_amount = round(amount / installments, 2) if part < installments - 1 else round(amount - paid_total, 2)
+            paid_total += part_amount
+            paid_on = min(today, paid_day.replace(day=paid_day.day - rng.randint(0, 10)))
+            payment_rows.append((
+                invoice_id, part_amount, f'{paid_on.isoformat()}T14:00:00+00:00', rng.choice(PAYMENT_METHODS),
+            ))
+            transaction_rows.append((
+                'income', f'Pago recibido: Factura #{invoice_id}', part_amount, 'Ventas/Facturas',
+                f'INV-{invoice_id}', paid_on.isoformat(),
+            ))
+        status_rows.append((1, 0.0, invoice_id))
+    cur.executemany("INSERT INTO payments(invoice_id, amount, paid_date, method) VALUES(?,?,?,?)", payment_rows)
+    cur.executemany("UPDATE invoices SET paid = ?, pending_amount = ? WHERE id = ?", status_rows)
+
+    # Gastos: unos ocho por mes
+    expense_rows = []
+    for month_start in month_starts:
+        for _ in range(8):
+            spent_on = month_start.replace(day=rng.randint(1, 28))
+            if spent_on > today:
+                spent_on = today
+            expense_rows.append((
+                f'Servicio {rng.choice(EXPENSE_CATEGORIES).lower()}', round(rng.uniform(1500, 45000), 2),
+                rng.choice(EXPENSE_CATEGORIES), rng.choice(supplier_ids), spent_on.isoformat(),
+                rng.choice(PAYMENT_METHODS),
+            ))
+    cur.executemany("""
+        INSERT INTO expenses(description, amount, category, supplier_id, date, payment_method)
+        VALUES(?,?,?,?,?,?)
+    """, expense_rows)
+    for expense_id, description, amount, category, spent_on in cur.execute(
+        "SELECT id, description, amount, category, date FROM expenses ORDER BY id"
+    ).fetchall():
+        transaction_rows.append(('expense', f'Gasto: {description}', amount, category, f'EXP-{expense_id}', spent_on))
+    cur.executemany("""
+        INSERT INTO accounting_transactions(type, description, amount, category, reference, date)
+        VALUES(?,?,?,?,?,?)
+    """, transaction_rows)
+
+    # Usuarios de benchmark: un administrador y un residente con algunas unidades
+    password_hash = _hash_password(BENCH_PASSWORD)
+    cur.executemany("""
+        INSERT OR IGNORE INTO users(username, email, password_hash, full_name, role, is_active)
+        VALUES(?,?,?,?,?,1)
+    """, [
+        (BENCH_ADMIN_USERNAME, 'bench_admin@example.com', password_hash, 'Benchmark Admin', 'admin'),
+        (BENCH_RESIDENT_USERNAME, 'bench_resident@example.com', password_hash, 'Benchmark Residente', 'resident'),
+    ])
+    resident_user_id = cur.execute(
+        "SELECT id FROM users WHERE username = ?", (BENCH_RESIDENT_USERNAME,)
+    ).fetchone()[0]
+    linked_units = unit_ids[:3]
+    cur.executemany("""
+        INSERT OR IGNORE INTO resident_user_units(user_id, unit_id, is_primary, status, activated_at)
+        VALUES(?,?,?, 'active', ?)
+    """, [(resident_user_id, unit_id, 1 if i == 0 else 0, today.isoformat()) for i, unit_id in enumerate(linked_units)])
+    conn.commit()
+
+    return {
+        'apartments': len(unit_ids),
+        'residents': len(unit_ids),
+        'recurring_sales': len(sale_ids),
+        'invoices': len(invoice_rows),
+        'payments': len(payment_rows),
+        'expenses': len(expense_rows),
+        'accounting_transactions': len(transaction_rows),
+        'suppliers': len(supplier_ids),
+        'resident_linked_units': len(linked_units),
+    }
+
+
+def build_database(path, invoices: int = 1000, years: int = 3, seed: int = 42,
+                   today: Optional[date] = None) -> Dict[str, int]:
+    """Crea desde cero la base en ``path`` con el esquema completo y los datos."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for suffix in ('', '-wal', '-shm'):
+        Path(f'{path}{suffix}').unlink(missing_ok=True)
+
+    conn = sqlite3.connect(path)
+    try:
+        prepare_schema(conn)
+        return generate_dataset(conn, invoices=invoices, years=years, seed=seed, today=today)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera una base de datos sintética para benchmarks.')
+    parser.add_argument('--db', required=True, help='Ruta del archivo SQLite a crear (se sobrescribe).')
+    parser.add_argument('--invoices', type=int, default=1000, help='Cantidad de facturas a generar.')
+    parser.add_argument('--years', type=int, default=3, help='Años de historial mensual.')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla para reproducibilidad.')
+    parser.add_argument('--today', help='Fecha de referencia YYYY-MM-DD (por defecto, hoy).')
+    args = parser.parse_args()
+
+    today = date.fromisoformat(args.today) if args.today else None
+    started = time.perf_counter()
+    counts = build_database(args.db, invoices=args.invoices, years=args.years, seed=args.seed, today=today)
+    elapsed = time.perf_counter() - started
+
+    print(f'Base generada en {args.db} ({elapsed:.1f}s)')
+    for table, count in counts.items():
+        print(f'  {table}: {count}')
+    print(f'Credenciales: {BENCH_ADMIN_USERNAME} / {BENCH_RESIDENT_USERNAME}, contraseña {BENCH_PASSWORD}')
+
+
+if __name__ == '__main__':
+    main()
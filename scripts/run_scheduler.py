@@ -0,0 +1,66 @@
+"""
+Proceso dedicado para las tareas programadas (facturas recurrentes, reporte
+mensual, integridad del libro, purgas).
+
+Los workers web se configuran con ``SCHEDULER_MODE=off`` y no arrancan el
+scheduler; este proceso crea la app con el scheduler activo y no atiende
+requests. Por defecto usa el lease de ``scheduler_lease`` (``--mode lease``),
+así que dos instancias a la vez (p. ej. durante un despliegue) no duplican
+trabajos.
+
+Uso:
+    SCHEDULER_MODE=off gunicorn app:app --workers 2
+    python scripts/run_scheduler.py
+    python scripts/run_scheduler.py --mode always
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Ejecuta solo el scheduler de la aplicación.')
+    parser.add_argument(
+        '--mode',
+        choices=('lease', 'always'),
+        default='lease',
+        help='lease: un solo proceso líder entre instancias; always: sin lease.',
+    )
+    args = parser.parse_args()
+
+    # Se fija antes de importar app, que crea la instancia al importarse
+    os.environ['SCHEDULER_MODE'] = args.mode
+
+    from dotenv import load_dotenv
+
+    load_dotenv(BASE_DIR / '.env')
+
+    import scheduler_lease
+    from app import app
+    from extensions import scheduler
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    app.logger.info(f"[Scheduler] Proceso dedicado iniciado (modo={args.mode}, pid={os.getpid()})")
+    print(f"[OK] Scheduler en ejecución (modo={args.mode}). Ctrl+C para detener.")
+    stop.wait()
+
+    if getattr(scheduler, 'running', False):
+        scheduler.shutdown(wait=True)
+    scheduler_lease.release()
+    app.logger.info("[Scheduler] Proceso dedicado detenido")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -31,6 +31,7 @@ load_dotenv(BASE_DIR / '.env')
 import db
 from company import get_company_info
 from reports import (
+    MONTHLY_REPORT_DEFAULT_WORKERS,
     generate_monthly_financial_report_pdf_file,
     get_monthly_financial_report_data,
     send_previous_month_financial_report,
@@ -82,6 +83,12 @@ def _build_parser() -> argparse.ArgumentParser:
     parser.add_argument('--admin-email', help='Override del correo del administrador en modo dispatch.')
     parser.add_argument('--reference-date', type=_parse_reference_date, help='Fecha base YYYY-MM-DD para calcular el período seleccionado.')
     parser.add_argument('--output-path', help='Ruta del PDF a generar.')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=MONTHLY_REPORT_DEFAULT_WORKERS,
+        help=f'En modo dispatch, envíos SMTP en paralelo (por defecto {MONTHLY_REPORT_DEFAULT_WORKERS}).',
+    )
     parser.add_argument('--dry-run', action='store_true', help='Genera el reporte y muestra datos, pero no envía correo.')
     return parser
 
@@ -151,6 +158,15 @@ def _run_dispatch_mode(args: argparse.Namespace) -> dict:
         admin_only=args.admin_only,
         admin_email_override=args.admin_email,
         period_mode=args.period_mode,
+        max_workers=args.workers,
+        progress_callback=_print_progress,
+    )
+
+
+def _print_progress(progress: dict) -> None:
+    print(
+        f"  [{progress['processed']}/{progress['total']}] {progress['email']} -> {progress['status']}",
+        flush=True,
     )
 
 
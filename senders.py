@@ -2,12 +2,15 @@ import os
 import socket
 import tempfile
 import subprocess
+import threading
 from contextlib import contextmanager
 from email.message import EmailMessage
 from html import escape
 import smtplib
 from pathlib import Path
 
+import metrics
+
 
 @contextmanager
 def _prefer_ipv4_resolution(enabled: bool = False):
@@ -94,6 +97,109 @@ def _maybe_make_pdf(html: str) -> bytes:
         except Exception:
             pass
 
+def _get_smtp_settings() -> dict:
+    host = os.getenv("SMTP_HOST") or os.getenv("SMTP_SERVER")
+    port = int(os.getenv("SMTP_PORT", "587"))
+
+    # PythonAnywhere bloquea el puerto 465. Para smtp.gmail.com debe ser 587.
+    if host == "smtp.gmail.com":
+        port = 587
+
+    user = os.getenv("SMTP_USER")
+    passwd = os.getenv("SMTP_PASSWORD")
+    return {
+        'host': host,
+        'port': port,
+        'user': user,
+        'passwd': passwd,
+        'from_addr': os.getenv("SMTP_FROM", user or "no-reply@example.com"),
+    }
+
+
+def _connect_smtp(settings: dict):
+    """Abre la conexión SMTP y autentica según la configuración."""
+    user = settings['user']
+    passwd = settings['passwd']
+    if (user and not passwd) or (passwd and not user):
+        raise RuntimeError("SMTP_USER and SMTP_PASSWORD must be configured together")
+
+    try:
+        smtp = _open_smtp_connection(settings['host'], settings['port'])
+    except OSError as exc:
+        if not _should_retry_with_ipv4(exc):
+            raise
+        smtp = _open_smtp_connection(settings['host'], settings['port'], prefer_ipv4=True)
+
+    try:
+        if not (user and passwd) and smtp.has_extn("auth"):
+            raise RuntimeError(
+                "SMTP authentication is required, but SMTP_USER/SMTP_PASSWORD are not configured"
+            )
+        if user and passwd:
+            smtp.login(user, passwd)
+    except Exception:
+        smtp.quit()
+        raise
+    return smtp
+
+
+_smtp_local = threading.local()
+
+
+class SMTPSession:
+    """
+    Conexión SMTP reutilizable para envíos en lote.
+
+    Se conecta con el primer mensaje, se renueva cada ``max_messages`` envíos
+    (los proveedores limitan mensajes por conexión) y reconecta una vez si el
+    servidor cerró la sesión entre mensajes.
+    """
+
+    def __init__(self, max_messages: int = 100):
+        self.max_messages = max(1, int(max_messages or 1))
+        self._smtp = None
+        self._sent_on_connection = 0
+
+    def send(self, msg: EmailMessage, settings: dict) -> None:
+        if self._smtp is not None and self._sent_on_connection >= self.max_messages:
+            self.close()
+        if self._smtp is None:
+            with metrics.track_external('smtp_connect'):
+                self._smtp = _connect_smtp(settings)
+            self._sent_on_connection = 0
+
+        with metrics.track_external('smtp'):
+            try:
+                self._smtp.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = _connect_smtp(settings)
+                self._sent_on_connection = 0
+                self._smtp.send_message(msg)
+        self._sent_on_connection += 1
+
+    def close(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except Exception:
+            pass
+
+
+@contextmanager
+def smtp_session(max_messages: int = 100):
+    """Reutiliza una misma conexión SMTP para todos los send_email del hilo actual."""
+    previous = getattr(_smtp_local, 'session', None)
+    session = SMTPSession(max_messages=max_messages)
+    _smtp_local.session = session
+    try:
+        yield session
+    finally:
+        _smtp_local.session = previous
+        session.close()
+
+
 def send_email(to_email, subject: str, html: str, attach_pdf=None, attachments=None):
     """
     Envía email con soporte para múltiples destinatarios y adjuntos
@@ -104,23 +210,16 @@ def send_email(to_email, subject: str, html: str, attach_pdf=None, attachments=N
         html: Contenido HTML
         attach_pdf: Datos del PDF en bytes (legacy support)
         attachments: Lista de rutas de archivos a adjuntar
+
+    Dentro de ``smtp_session()`` se reutiliza la conexión abierta del hilo.
     """
-    host = os.getenv("SMTP_HOST") or os.getenv("SMTP_SERVER")
-    port = int(os.getenv("SMTP_PORT", "587"))
-    
-    # PythonAnywhere bloquea el puerto 465. Para smtp.gmail.com debe ser 587.
-    if host == "smtp.gmail.com":
-        port = 587
-        
-    user = os.getenv("SMTP_USER")
-    passwd = os.getenv("SMTP_PASSWORD")
-    from_addr = os.getenv("SMTP_FROM", user or "no-reply@example.com")
+    settings = _get_smtp_settings()
     
-    if not host:
+    if not settings['host']:
         raise RuntimeError("SMTP_HOST or SMTP_SERVER not configured")
     
     msg = EmailMessage()
-    msg["From"] = from_addr
+    msg["From"] = settings['from_addr']
     
     # Manejar múltiples destinatarios
     if isinstance(to_email, list):
@@ -152,24 +251,16 @@ def send_email(to_email, subject: str, html: str, attach_pdf=None, attachments=N
                     msg.add_attachment(file_data, maintype="application", subtype="pdf", filename=file_name)
     
     # Conectar y enviar
-    if (user and not passwd) or (passwd and not user):
-        raise RuntimeError("SMTP_USER and SMTP_PASSWORD must be configured together")
-
-    try:
-        smtp = _open_smtp_connection(host, port)
-    except OSError as exc:
-        if not _should_retry_with_ipv4(exc):
-            raise
-        smtp = _open_smtp_connection(host, port, prefer_ipv4=True)
+    session = getattr(_smtp_local, 'session', None)
+    if session is not None:
+        session.send(msg, settings)
+        return
 
+    with metrics.track_external('smtp_connect'):
+        smtp = _connect_smtp(settings)
     try:
-        if not (user and passwd) and smtp.has_extn("auth"):
-            raise RuntimeError(
-                "SMTP authentication is required, but SMTP_USER/SMTP_PASSWORD are not configured"
-            )
-        if user and passwd:
-            smtp.login(user, passwd)
-        smtp.send_message(msg)
+        with metrics.track_external('smtp'):
+            smtp.send_message(msg)
     finally:
         smtp.quit()
 
@@ -185,10 +276,11 @@ def send_sms_via_twilio(to_number: str, body: str):
     except Exception:
         raise RuntimeError("requests required for Twilio SMS (pip install requests)")
     url = f"https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json"
-    resp = requests.post(url, data={"From": from_number, "To": to_number, "Body": body},
-                         auth=(sid, token))
-    if not resp.ok:
-        raise RuntimeError(f"Twilio error: {resp.status_code} {resp.text}")
+    with metrics.track_external('twilio'):
+        resp = requests.post(url, data={"From": from_number, "To": to_number, "Body": body},
+                             auth=(sid, token))
+        if not resp.ok:
+            raise RuntimeError(f"Twilio error: {resp.status_code} {resp.text}")
 
 def send_whatsapp_via_twilio(to_number: str, body: str):
     """Envía mensaje por WhatsApp usando Twilio"""
@@ -211,11 +303,12 @@ def send_whatsapp_via_twilio(to_number: str, body: str):
         from_whatsapp = f"whatsapp:{from_whatsapp}"
     
     url = f"https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json"
-    resp = requests.post(url, 
-                        data={"From": from_whatsapp, "To": to_number, "Body": body},
-                        auth=(sid, token))
-    if not resp.ok:
-        raise RuntimeError(f"Twilio WhatsApp error: {resp.status_code} {resp.text}")
+    with metrics.track_external('twilio'):
+        resp = requests.post(url, 
+                            data={"From": from_whatsapp, "To": to_number, "Body": body},
+                            auth=(sid, token))
+        if not resp.ok:
+            raise RuntimeError(f"Twilio WhatsApp error: {resp.status_code} {resp.text}")
 
 def generate_payment_notification_html(payment: dict, invoice: dict, unit: dict, is_admin: bool = False) -> str:
     """Genera el HTML para la notificación de pago"""
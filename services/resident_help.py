@@ -7,15 +7,22 @@ contexto financiero, hilo de conversación e integración IA.
 Extraído de app.py para mantener el archivo principal manejable.
 """
 
-from typing import Any, Optional
+import hashlib
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import date
+from typing import Any, Callable, Optional
 
 from flask import url_for, session, request, render_template, current_app
 from flask_login import current_user
-import requests as http_requests
 
 import db
 import company
 import residents
+from extensions import cache
+from utils import cache_versions
+from utils.http_cache import data_stamp
 
 
 # ──────────────────────────────────────────────
@@ -589,6 +596,67 @@ def build_help_answer(question: str, context: dict, thread: Optional[list] = Non
     )
 
 
+# ──────────────────────────────────────────────
+# Cache de contexto y respuestas
+# ──────────────────────────────────────────────
+
+# Datos que alimentan el contexto: cuentas, unidades y datos de contacto.
+HELP_DATA_NAMESPACES = (cache_versions.LEDGER, cache_versions.UNITS, cache_versions.COMPANY_INFO)
+HELP_CACHE_TIMEOUT = 3600
+AI_MAX_WORKERS = 2
+
+_ai_executor: Optional[ThreadPoolExecutor] = None
+_ai_pending: dict[str, Future] = {}
+_ai_lock = threading.Lock()
+
+
+def _help_data_stamp() -> Optional[str]:
+    """Versión de los datos del contexto; incluye el día (meses y vencimientos)."""
+    stamp = data_stamp(HELP_DATA_NAMESPACES)
+    if stamp is None:
+        return None
+    return f"{stamp}:{date.today().isoformat()}"
+
+
+def _cached_user_data(kind: str, builder: Callable[[], Any]) -> Any:
+    """Valor por usuario y versión de datos; sin versiones se calcula siempre."""
+    stamp = _help_data_stamp()
+    if stamp is None:
+        return builder()
+    key = f"resident_help:{kind}:{current_user.id}:{stamp}"
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, timeout=HELP_CACHE_TIMEOUT)
+    return value
+
+
+def _help_fingerprint(question: str, thread: list[dict[str, str]]) -> Optional[str]:
+    """
+    Huella de la pregunta normalizada, las preguntas recientes del hilo y la
+    versión del contexto. Repetir la misma pregunta (por ejemplo, tras una
+    respuesta pendiente de la IA) produce la misma huella.
+    """
+    stamp = _help_data_stamp()
+    if stamp is None:
+        return None
+    normalized_question = normalize_question(question)
+    previous_questions = [
+        normalized
+        for normalized in (
+            normalize_question(message.get('content') or '')
+            for message in thread[-6:]
+            if message.get('role') == 'user'
+        )
+        if normalized != normalized_question
+    ]
+    raw = json.dumps(
+        [current_user.id, stamp, normalized_question, previous_questions],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
 # ──────────────────────────────────────────────
 # Thread (hilo de conversación en sesión)
 # ──────────────────────────────────────────────
@@ -794,24 +862,132 @@ def _build_ai_context_text(question: str, context: dict, deterministic_answer: O
     return "\n".join(lines)
 
 
+def _get_ai_executor() -> ThreadPoolExecutor:
+    global _ai_executor
+    with _ai_lock:
+        if _ai_executor is None:
+            _ai_executor = ThreadPoolExecutor(max_workers=AI_MAX_WORKERS, thread_name_prefix='resident-ai')
+        return _ai_executor
+
+
+def _generate_ai_text(api_key: str, model_name: str, system_instruction: str,
+                      history: list[dict], question: str, timeout: float) -> str:
+    """Llamada a Gemini; corre en el pool de ``_get_ai_executor``, sin contexto de Flask."""
+    try:
+        import google.generativeai as genai
+        from google.api_core import retry as api_retry
+    except ImportError as exc:
+        raise RuntimeError("google-generativeai is not installed") from exc
+
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(
+        model_name=model_name,
+        system_instruction=system_instruction
+    )
+    chat = model.start_chat(history=history)
+    # Los reintentos también quedan acotados: sin red, el cliente reintenta indefinidamente.
+    response = chat.send_message(
+        question,
+        request_options={'timeout': timeout, 'retry': api_retry.Retry(timeout=timeout)}
+    )
+    return sanitize_help_text(response.text, 4000)
+
+
+def _run_ai_request(app, cache_key: Optional[str], request_kwargs: dict) -> Optional[str]:
+    try:
+        ai_text = _generate_ai_text(**request_kwargs)
+        if ai_text and cache_key:
+            with app.app_context():
+                cache.set(cache_key, ai_text, timeout=HELP_CACHE_TIMEOUT)
+        return ai_text
+    except Exception as exc:
+        app.logger.warning(f"Asistente IA residente (Gemini) falló: {exc}")
+        return None
+    finally:
+        if cache_key:
+            with _ai_lock:
+                _ai_pending.pop(cache_key, None)
+
+
+def _submit_ai_request(cache_key: Optional[str], request_kwargs: dict) -> Future:
+    """Encola la llamada; una pregunta igual que ya está en curso reutiliza su resultado."""
+    app = current_app._get_current_object()
+    executor = _get_ai_executor()
+    with _ai_lock:
+        future = _ai_pending.get(cache_key) if cache_key else None
+        if future is None:
+            future = executor.submit(_run_ai_request, app, cache_key, request_kwargs)
+            if cache_key and not future.done():
+                _ai_pending[cache_key] = future
+    return future
+
+
+def _ai_answer_payload(ai_text: str, deterministic_answer: Optional[dict]) -> dict:
+    answer_title = 'Respuesta del asistente Toscana IA'
+    if deterministic_answer and deterministic_answer.get('title') != 'Pregunta lista para responderse':
+        answer_title = deterministic_answer.get('title') or answer_title
+
+    answer_detail = 'Respuesta generada con IA usando tu contexto validado y los reportes publicados.'
+    if deterministic_answer and deterministic_answer.get('detail'):
+        answer_detail = deterministic_answer['detail']
+
+    return {
+        'source': 'ai',
+        'tone': (deterministic_answer or {}).get('tone') or 'primary',
+        'title': answer_title,
+        'body': ai_text,
+        'detail': answer_detail,
+        'link_url': (deterministic_answer or {}).get('link_url'),
+        'link_label': (deterministic_answer or {}).get('link_label'),
+    }
+
+
+def _ai_pending_answer(deterministic_answer: Optional[dict]) -> dict:
+    """Respuesta mientras la IA sigue trabajando en segundo plano."""
+    note = 'El asistente IA sigue preparando una respuesta ampliada; vuelve a enviar la pregunta en unos segundos.'
+    if deterministic_answer:
+        answer = dict(deterministic_answer)
+        answer['detail'] = note
+        return answer
+    return {
+        'source': 'rules',
+        'tone': 'secondary',
+        'title': 'Preparando tu respuesta',
+        'body': 'El asistente está tardando más de lo normal en responder.',
+        'detail': note,
+        'link_url': None,
+        'link_label': None,
+    }
+
+
 def _build_ai_answer(
     question: str,
     context: dict,
     thread: list[dict[str, str]],
     deterministic_answer: Optional[dict],
+    fingerprint: Optional[str] = None,
 ) -> Optional[dict]:
-    if not ai_enabled():
-        return None
+    """
+    Respuesta de Gemini, guardada en cache por huella de pregunta y contexto.
 
-    try:
-        import google.generativeai as genai
-    except ImportError:
-        current_app.logger.error("google-generativeai is not installed")
+    La llamada corre en un pool propio: el request espera como máximo
+    ``RESIDENT_AI_WAIT_SECONDS``; si no llega a tiempo responde con las reglas
+    del portal y la respuesta de la IA queda en cache para el siguiente intento.
+    """
+    if not ai_enabled():
         return None
 
     cfg = current_app.config
-    genai.configure(api_key=cfg['RESIDENT_AI_API_KEY'])
-    
+    model_name = cfg.get('RESIDENT_AI_MODEL') or 'gemini-2.5-flash'
+    if 'gpt' in model_name:
+        model_name = 'gemini-2.5-flash'  # fallback if the env still has gpt-4
+
+    cache_key = f"resident_help:ai:{model_name}:{fingerprint}" if fingerprint else None
+    if cache_key:
+        cached_text = cache.get(cache_key)
+        if cached_text:
+            return _ai_answer_payload(cached_text, deterministic_answer)
+
     context_block = _build_ai_context_text(question, context, deterministic_answer)
     system_instruction = (
         'Eres el asistente virtual del portal residencial Toscana. Tu nombre es "Asistente Toscana". '
@@ -836,66 +1012,52 @@ def _build_ai_answer(
         f'CONTEXTO VERIFICADO DEL RESIDENTE:\n{context_block}'
     )
 
+    # Construir historial de chat para Gemini
+    history = []
+    for item in thread:
+        role = 'model' if item.get('role') == 'assistant' else 'user'
+        content_parts = []
+        if role == 'model' and item.get('title'):
+            content_parts.append(item['title'])
+        if item.get('content'):
+            content_parts.append(item['content'])
+        if item.get('detail'):
+            content_parts.append(item['detail'])
+
+        content = "\n".join(content_parts).strip()
+        if content:
+            history.append({"role": role, "parts": [content]})
+
+    future = _submit_ai_request(cache_key, {
+        'api_key': cfg['RESIDENT_AI_API_KEY'],
+        'model_name': model_name,
+        'system_instruction': system_instruction,
+        'history': history,
+        'question': question,
+        'timeout': float(cfg.get('RESIDENT_AI_TIMEOUT_SECONDS') or 20),
+    })
     try:
-        # Usamos el modelo Gemini
-        model_name = cfg.get('RESIDENT_AI_MODEL') or 'gemini-2.5-flash'
-        if 'gpt' in model_name: 
-            model_name = 'gemini-2.5-flash' # fallback if the env still has gpt-4
-            
-        model = genai.GenerativeModel(
-            model_name=model_name,
-            system_instruction=system_instruction
-        )
-        
-        # Construir historial de chat para Gemini
-        history = []
-        for item in thread:
-            role = 'model' if item.get('role') == 'assistant' else 'user'
-            content_parts = []
-            if role == 'model' and item.get('title'):
-                content_parts.append(item['title'])
-            if item.get('content'):
-                content_parts.append(item['content'])
-            if item.get('detail'):
-                content_parts.append(item['detail'])
-            
-            content = "\n".join(content_parts).strip()
-            if content:
-                history.append({"role": role, "parts": [content]})
-                
-        chat = model.start_chat(history=history)
-        response = chat.send_message(question)
-        
-        ai_text = sanitize_help_text(response.text, 4000)
-        if not ai_text:
-            return None
-            
-    except Exception as exc:
-        current_app.logger.warning(f"Asistente IA residente (Gemini) falló: {exc}")
-        return None
-
-    answer_title = 'Respuesta del asistente Toscana IA'
-    if deterministic_answer and deterministic_answer.get('title') != 'Pregunta lista para responderse':
-        answer_title = deterministic_answer.get('title') or answer_title
-
-    answer_detail = 'Respuesta generada con IA usando tu contexto validado y los reportes publicados.'
-    if deterministic_answer and deterministic_answer.get('detail'):
-        answer_detail = deterministic_answer['detail']
+        ai_text = future.result(timeout=float(cfg.get('RESIDENT_AI_WAIT_SECONDS') or 8))
+    except FutureTimeoutError:
+        current_app.logger.warning("Asistente IA residente: sin respuesta a tiempo; se responde con las reglas del portal")
+        return _ai_pending_answer(deterministic_answer)
 
-    return {
-        'source': 'ai',
-        'tone': (deterministic_answer or {}).get('tone') or 'primary',
-        'title': answer_title,
-        'body': ai_text,
-        'detail': answer_detail,
-        'link_url': (deterministic_answer or {}).get('link_url'),
-        'link_label': (deterministic_answer or {}).get('link_label'),
-    }
+    if not ai_text:
+        return None
+    return _ai_answer_payload(ai_text, deterministic_answer)
 
 
 def compose_help_answer(question: str, context: dict, thread: list[dict[str, str]]) -> Optional[dict]:
-    deterministic_answer = build_help_answer(question, context, thread=thread)
-    ai_answer = _build_ai_answer(question, context, thread, deterministic_answer)
+    fingerprint = _help_fingerprint(question, thread)
+    deterministic_answer = None
+    rules_key = f"resident_help:rules:{fingerprint}" if fingerprint else None
+    if rules_key:
+        deterministic_answer = cache.get(rules_key)
+    if deterministic_answer is None:
+        deterministic_answer = build_help_answer(question, context, thread=thread)
+        if rules_key and deterministic_answer:
+            cache.set(rules_key, deterministic_answer, timeout=HELP_CACHE_TIMEOUT)
+    ai_answer = _build_ai_answer(question, context, thread, deterministic_answer, fingerprint)
     return ai_answer or deterministic_answer
 
 
@@ -970,6 +1132,11 @@ def build_report_months() -> list[dict]:
 
 
 def get_common_context() -> dict:
+    """Contexto compartido por las páginas del portal, en cache por usuario y versión de datos."""
+    return _cached_user_data('common', _build_common_context)
+
+
+def _build_common_context() -> dict:
     linked_apartments = residents.list_linked_apartments_for_user(
         current_user.id, fallback_email=current_user.email,
     )
@@ -1111,19 +1278,12 @@ def build_help_context(question: str = '', thread: Optional[list[dict[str, str]]
     context = get_common_context()
     resident_help_thread = thread if thread is not None else get_help_thread()
     _ai_enabled = ai_enabled()
-    recent_payment_history: dict[str, Any] = residents.get_resident_payment_history_for_user(
-        current_user.id, fallback_email=current_user.email, limit=3,
-    )
     latest_answer = next(
         (message for message in reversed(resident_help_thread) if message.get('role') == 'assistant'),
         None,
     )
+    context.update(_cached_user_data('help', _build_help_activity))
     context.update({
-        'pending_preview': residents.list_resident_invoices_for_user(
-            current_user.id, fallback_email=current_user.email,
-            paid=False, limit=3,
-        ),
-        'recent_payments': list(recent_payment_history.get('items') or []),
         'resident_help_question': question,
         'resident_help_answer': latest_answer,
         'resident_help_thread': resident_help_thread,
@@ -1163,6 +1323,19 @@ def build_help_context(question: str = '', thread: Optional[list[dict[str, str]]
     return context
 
 
+def _build_help_activity() -> dict:
+    recent_payment_history: dict[str, Any] = residents.get_resident_payment_history_for_user(
+        current_user.id, fallback_email=current_user.email, limit=3,
+    )
+    return {
+        'pending_preview': residents.list_resident_invoices_for_user(
+            current_user.id, fallback_email=current_user.email,
+            paid=False, limit=3,
+        ),
+        'recent_payments': list(recent_payment_history.get('items') or []),
+    }
+
+
 def render_resident_page(template_name: str, section: str, section_context: dict):
     context = dict(section_context)
     context['resident_active_section'] = section
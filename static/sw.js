@@ -1,27 +1,62 @@
 // Service Worker - Toscana PWA
-// This SW self-destructs all old caches and passes ALL requests through to the network.
-// This fixes issues with stale caches breaking navigation and PDF downloads.
+// Pages, API calls and PDF downloads always go to the network (stale caches used
+// to break navigation and downloads). Only the fingerprinted static assets built
+// by scripts/build_static.py are cached: their names change with their content,
+// so a cached copy can never be stale.
 
-// version update to force cache clear: 103
-const CACHE_NAME = 'toscana-pwa-v103';
+// version update to force cache clear: 104
+const CACHE_PREFIX = 'toscana-static-';
 
-// Install: skip waiting immediately
+self.PRECACHE_VERSION = 'none';
+self.PRECACHE_URLS = [];
+try {
+  // Generated list of fingerprinted assets (missing until the build step runs).
+  importScripts('/static/dist/sw-precache.js');
+} catch (error) {
+  // No build: nothing to precache.
+}
+
+const CACHE_NAME = CACHE_PREFIX + self.PRECACHE_VERSION;
+const PRECACHE = new Set(self.PRECACHE_URLS);
+
+// Install: precache the current build and take over immediately
 self.addEventListener('install', event => {
   self.skipWaiting();
+  if (PRECACHE.size) {
+    event.waitUntil(
+      caches.open(CACHE_NAME)
+        .then(cache => cache.addAll(self.PRECACHE_URLS))
+        .catch(() => undefined)
+    );
+  }
 });
 
-// Activate: delete ALL old caches and claim all clients immediately
+// Activate: delete every cache except the current build and claim all clients
 self.addEventListener('activate', event => {
   event.waitUntil(
     caches.keys().then(keys =>
-      Promise.all(keys.map(k => caches.delete(k)))
+      Promise.all(keys.filter(k => k !== CACHE_NAME).map(k => caches.delete(k)))
     ).then(() => self.clients.claim())
   );
 });
 
-// Fetch: pass EVERYTHING through to the network. No caching.
-// This ensures no stale pages or assets can break the app.
+// Fetch: cache-first for fingerprinted assets only. Everything else is not
+// intercepted and the browser handles it natively.
 self.addEventListener('fetch', event => {
-  // Simply let the browser handle the request natively.
-  // Do NOT intercept anything.
-});
\ No newline at end of file
+  const request = event.request;
+  if (request.method !== 'GET') return;
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin || !PRECACHE.has(url.pathname)) return;
+
+  event.respondWith(
+    caches.open(CACHE_NAME).then(cache =>
+      cache.match(url.pathname).then(cached => {
+        if (cached) return cached;
+        return fetch(request).then(response => {
+          if (response.ok) cache.put(url.pathname, response.clone());
+          return response;
+        });
+      })
+    )
+  );
+});
@@ -0,0 +1,102 @@
+"""
+Tests para los logs de archivo escritos desde la cola (utils.async_logging)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from utils import async_logging
+
+ROOT_DIR = Path(__file__).parent.parent
+
+
+def _read_lines(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines() if line.strip()]
+
+
+def test_file_logger_writes_json_lines_with_fields(tmp_path):
+    log_path = tmp_path / 'events.log'
+    logger = async_logging.get_file_logger('test.async.json', log_path)
+
+    logger.info('Factura %s enviada', 42, extra={'fields': {'action': 'SEND', 'invoice_id': 42}})
+    try:
+        raise ValueError('sin correo')
+    except ValueError:
+        logger.exception('Fallo de notificación')
+    async_logging.flush()
+
+    first, second = _read_lines(log_path)
+    assert first['message'] == 'Factura 42 enviada'
+    assert first['level'] == 'INFO'
+    assert first['logger'] == 'test.async.json'
+    assert first['pid'] == os.getpid()
+    assert first['action'] == 'SEND'
+    assert first['invoice_id'] == 42
+    assert first['ts'].endswith('Z')
+    assert second['level'] == 'ERROR'
+    assert second['message'] == 'Fallo de notificación'
+    assert 'ValueError: sin correo' in second['exc']
+
+
+def test_logging_call_only_enqueues(tmp_path, monkeypatch):
+    release = threading.Event()
+    original_emit = async_logging.SharedRotatingFileHandler.emit
+
+    def slow_emit(self, record):
+        release.wait(5)
+        original_emit(self, record)
+
+    monkeypatch.setattr(async_logging.SharedRotatingFileHandler, 'emit', slow_emit)
+    log_path = tmp_path / 'slow.log'
+    logger = async_logging.get_file_logger('test.async.slow', log_path)
+
+    start = time.perf_counter()
+    for i in range(50):
+        logger.info('evento %s', i)
+    assert time.perf_counter() - start < 1.0
+    assert not log_path.exists()
+
+    release.set()
+    async_logging.flush()
+    assert [line['message'] for line in _read_lines(log_path)] == [f'evento {i}' for i in range(50)]
+
+
+def test_processes_share_a_rotating_file_without_losing_lines(tmp_path):
+    script = (
+        "import sys\n"
+        "from multiprocessing import get_context\n"
+        "from pathlib import Path\n"
+        "from utils import async_logging\n"
+        "def work(n):\n"
+        "    logger = async_logging.get_file_logger('test.async.mp', Path(sys.argv[1]))\n"
+        "    for i in range(200):\n"
+        "        logger.info('linea', extra={'fields': {'worker': n, 'seq': i}})\n"
+        "    async_logging.flush()\n"
+        "if __name__ == '__main__':\n"
+        "    with get_context('fork').Pool(4) as pool:\n"
+        "        pool.map(work, range(4))\n"
+    )
+    env = dict(os.environ)
+    env['PYTHONPATH'] = str(ROOT_DIR)
+    env['LOG_MAX_BYTES'] = '4000'
+    env['LOG_BACKUP_COUNT'] = '200'
+    log_path = tmp_path / 'shared.log'
+    result = subprocess.run(
+        [sys.executable, '-c', script, str(log_path)],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    files = sorted(tmp_path.glob('shared.log*'))
+    files = [path for path in files if not path.name.endswith('.lock')]
+    assert len(files) > 1
+    entries = [entry for path in files for entry in _read_lines(path)]
+    seen = {(entry['worker'], entry['seq']) for entry in entries}
+    assert len(entries) == 800
+    assert seen == {(worker, seq) for worker in range(4) for seq in range(200)}
+    assert all(path.stat().st_size < 4000 + 200 for path in files)
@@ -0,0 +1,98 @@
+"""
+Tests para el registro de auditoría en la tabla audit_events
+"""
+
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+import audit_trail
+import db
+
+
+def _utc(year: int, month: int, day: int = 15) -> datetime:
+    return datetime(year, month, day, 12, 0, tzinfo=timezone.utc)
+
+
+def test_events_are_buffered_and_inserted_in_batches(app, monkeypatch):
+    audit_trail.flush()
+    batches = []
+    monkeypatch.setattr(audit_trail, '_insert_events', lambda batch: batches.append(len(batch)))
+    monkeypatch.setattr(audit_trail._buffer, 'batch_size', 100)
+
+    for i in range(250):
+        audit_trail.record_event('test.batch', username='batcher', entity='invoice', entity_id=i)
+
+    audit_trail.flush()
+    assert sum(batches) == 250
+    assert max(batches) <= 100
+    # El hilo de fondo puede vaciar un lote parcial a mitad del ciclo
+    assert len(batches) <= 5
+
+
+@pytest.mark.integration
+def test_deleted_payment_is_found_by_entity_with_an_index(auth_client, app):
+    response = auth_client.post('/ventas/pagos/delete/987654', data={})
+    assert response.status_code in (200, 302)
+
+    audit_trail.flush()
+    result = audit_trail.search_events(entity='payment', entity_id='987654')
+    assert result['available'] is True
+    [event] = result['items']
+    assert event['action'] == 'facturacion.eliminar_pago'
+    assert event['username'] == 'admin'
+    assert event['user_id'] is not None
+    assert event['description'] == 'Eliminar pago'
+    assert event['month'] == event['created_at'][:7]
+
+    conn = db.get_conn()
+    try:
+        plan = ' '.join(
+            str(row[-1]) for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM audit_events WHERE entity = ? AND entity_id = ? ORDER BY id DESC LIMIT 51",
+                ('payment', '987654'),
+            )
+        )
+    finally:
+        conn.close()
+    assert 'idx_audit_events_entity' in plan
+
+    page = auth_client.get('/configuracion/auditoria?entidad=payment&entidad_id=987654')
+    assert page.status_code == 200
+    assert 'facturacion.eliminar_pago' in page.get_data(as_text=True)
+
+
+def test_search_pages_by_id_and_retention_drops_whole_old_months(app):
+    now = datetime.now(timezone.utc)
+    for month_offset in (0, 1, 14):
+        total = now.year * 12 + now.month - 1 - month_offset
+        when = _utc(total // 12, total % 12 + 1, 1)
+        for i in range(3):
+            audit_trail.record_event('test.retention', username='retainer', entity_id=i, created_at=when)
+    audit_trail.flush()
+
+    first = audit_trail.search_events(username='retainer', limit=4)
+    assert len(first['items']) == 4 and first['has_more']
+    second = audit_trail.search_events(username='retainer', limit=4, before_id=first['next_before_id'])
+    assert len(second['items']) == 4 and second['has_more']
+    third = audit_trail.search_events(username='retainer', limit=4, before_id=second['next_before_id'])
+    assert len(third['items']) == 1 and not third['has_more']
+    ids = [e['id'] for page in (first, second, third) for e in page['items']]
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 9
+
+    assert audit_trail.purge_old_months(12) >= 3
+    remaining = audit_trail.search_events(username='retainer')['items']
+    assert len(remaining) == 6
+
+    # Solo inserción: ni updates ni borrar el mes actual o el anterior
+    conn = db.get_conn()
+    try:
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("UPDATE audit_events SET username = 'otro' WHERE username = 'retainer'")
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("DELETE FROM audit_events WHERE username = 'retainer'")
+        conn.rollback()
+    finally:
+        conn.close()
+    assert audit_trail.purge_old_months(1) == 0
@@ -0,0 +1,71 @@
+"""
+Tests para el generador de datos sintéticos y el comparador de benchmarks
+"""
+
+import sqlite3
+from datetime import date
+
+import pytest
+
+from scripts import benchmark
+from scripts import generate_synthetic_data as synthetic
+
+
+REFERENCE_DAY = date(2026, 3, 15)
+
+
+def _invoice_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(
+            "SELECT unit_id, amount, issued_date, due_date, paid, pending_amount FROM invoices ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.mark.unit
+def test_generated_dataset_is_reproducible_and_consistent(tmp_path):
+    counts = synthetic.build_database(tmp_path / 'a.db', invoices=150, years=1, seed=7, today=REFERENCE_DAY)
+    synthetic.build_database(tmp_path / 'b.db', invoices=150, years=1, seed=7, today=REFERENCE_DAY)
+
+    assert counts['invoices'] == 150
+    assert counts['apartments'] == 13
+    assert _invoice_rows(tmp_path / 'a.db') == _invoice_rows(tmp_path / 'b.db')
+
+    conn = sqlite3.connect(tmp_path / 'a.db')
+    try:
+        current_month = conn.execute(
+            "SELECT COUNT(*) FROM invoices WHERE issued_date >= '2026-03-01'"
+        ).fetchone()[0]
+        mismatched = conn.execute("""
+            SELECT COUNT(*) FROM invoices i
+            WHERE i.paid = 1
+              AND ABS(i.amount - (SELECT COALESCE(SUM(amount), 0) FROM payments p WHERE p.invoice_id = i.id)) > 0.01
+        """).fetchone()[0]
+        entries = conn.execute(
+            "SELECT COUNT(*) FROM accounting_transactions WHERE reference LIKE 'INV-%'"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+    # Todas las ventas recurrentes ya tienen la factura del mes de referencia.
+    assert current_month == counts['recurring_sales']
+    assert mismatched == 0
+    assert entries == counts['payments']
+
+
+@pytest.mark.unit
+def test_scale_parsing_and_regression_comparison():
+    assert benchmark.parse_scales('1k, 10k,250') == [1000, 10000, 250]
+    assert benchmark.scale_label(100000) == '100k'
+
+    stats = benchmark.summarize([10.0, 30.0, 20.0])
+    assert stats['median_ms'] == 20.0
+    assert stats['p95_ms'] == 30.0
+
+    def run(median):
+        return {'scales': {'1k': {'scenarios': {'invoice_list': {'runs': 3, 'median_ms': median}}}}}
+
+    assert benchmark.compare_results(run(130.0), run(100.0))[0]['regression'] is True
+    assert benchmark.compare_results(run(110.0), run(100.0))[0]['regression'] is False
@@ -0,0 +1,112 @@
+"""
+Tests para la memoización versionada de datos casi estáticos
+"""
+
+import pytest
+
+import customization
+from db import get_conn
+from utils import cache_versions
+from utils.permissions import grant_permission, revoke_permission, user_has_permission
+
+
+@pytest.fixture(autouse=True)
+def _fresh_process_cache():
+    cache_versions.clear_process_cache()
+    yield
+    cache_versions.clear_process_cache()
+
+
+def _admin_id():
+    conn = get_conn()
+    try:
+        return conn.execute("SELECT id FROM users WHERE username = 'admin'").fetchone()['id']
+    finally:
+        conn.close()
+
+
+@pytest.mark.unit
+def test_values_are_shared_across_requests_until_the_version_changes(app):
+    calls = []
+
+    @cache_versions.memoized(cache_versions.COMPANY_INFO)
+    def lookup():
+        calls.append(1)
+        return {'name': 'Toscana'}
+
+    with app.test_request_context():
+        first = lookup()
+        first['name'] = 'modificado'
+        assert lookup() == {'name': 'Toscana'}
+    with app.test_request_context():
+        assert lookup() == {'name': 'Toscana'}
+    assert len(calls) == 1
+
+    # Escritura directa (como desde otro worker): el trigger sube la versión.
+    conn = get_conn()
+    conn.execute("INSERT INTO company_info (name) VALUES ('Otra empresa')")
+    conn.execute("DELETE FROM company_info WHERE name = 'Otra empresa'")
+    conn.commit()
+    conn.close()
+
+    with app.test_request_context():
+        lookup()
+    assert len(calls) == 2
+
+
+@pytest.mark.unit
+def test_set_setting_is_visible_in_the_same_request(app):
+    with app.test_request_context():
+        original = customization.get_setting('accent_color')
+        customization.set_setting('accent_color', '#123456')
+        try:
+            assert customization.get_setting('accent_color') == '#123456'
+        finally:
+            customization.set_setting('accent_color', original or '#795547')
+    with app.test_request_context():
+        assert customization.get_setting('accent_color') == (original or '#795547')
+
+
+@pytest.mark.unit
+def test_grant_and_revoke_invalidate_permission_checks(app):
+    user_id = _admin_id()
+    with app.test_request_context():
+        assert user_has_permission(user_id, 'gastos.delete') is False
+        grant_permission(user_id, 'gastos.delete')
+        try:
+            assert user_has_permission(user_id, 'gastos.delete') is True
+        finally:
+            revoke_permission(user_id, 'gastos.delete')
+        assert user_has_permission(user_id, 'gastos.delete') is False
+
+
+@pytest.mark.integration
+def test_managed_permissions_apply_immediately_and_are_checked_in_memory(app, auth_client, monkeypatch):
+    import user_model
+    from utils import permissions
+
+    user_id = user_model.create_user(
+        'perm_operator', 'perm_operator@example.com', 'password123', 'Perm Operator', role='operator',
+    )
+    try:
+        with app.test_request_context():
+            assert permissions.check_permission(user_id, 'gastos.view', 'operator') is False
+
+        response = auth_client.post(f'/auth/users/{user_id}/permissions', data={'permissions': ['gastos.view']})
+        assert response.status_code == 302
+
+        lookups = []
+        real_get_conn = permissions.get_conn
+        monkeypatch.setattr(permissions, 'get_conn', lambda: lookups.append(1) or real_get_conn())
+        with app.test_request_context():
+            assert permissions.check_permission(user_id, 'gastos.view', 'operator') is True
+        with app.test_request_context():
+            assert permissions.check_permission(user_id, 'gastos.view', 'operator') is True
+            assert permissions.check_permission(user_id, 'gastos.edit', 'operator') is False
+        assert len(lookups) == 1
+    finally:
+        conn = get_conn()
+        conn.execute("DELETE FROM user_permissions WHERE user_id = ?", (user_id,))
+        conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        conn.commit()
+        conn.close()
@@ -0,0 +1,81 @@
+"""
+Tests para la compresión de respuestas y los estáticos con huella
+"""
+
+import gzip
+import json
+import zlib
+
+import pytest
+
+from scripts import build_static
+from utils import static_assets
+
+
+@pytest.mark.integration
+def test_large_html_is_gzipped_and_small_json_is_not(auth_client):
+    response = auth_client.get('/ventas/facturas', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert b'</html>' in gzip.decompress(response.data)
+
+    small = auth_client.get('/health', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+
+    plain = auth_client.get('/ventas/facturas')
+    assert 'Content-Encoding' not in plain.headers
+
+
+@pytest.mark.integration
+def test_streamed_exports_are_compressed_in_chunks(auth_client):
+    response = auth_client.get(
+        '/reportes/exportar/invoices.csv?date_from=2000-01-01&date_to=2100-12-31',
+        headers={'Accept-Encoding': 'gzip'},
+    )
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    csv_text = zlib.decompress(response.get_data(), 31).decode('utf-8')
+    assert 'issued_date' in csv_text.splitlines()[0]
+
+
+@pytest.mark.unit
+def test_build_fingerprints_precompresses_and_serves_immutable_assets(app, tmp_path, monkeypatch):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'app.css').write_text('body { color: #333; }\n' * 40, encoding='utf-8')
+    (tmp_path / 'uploads').mkdir()
+    (tmp_path / 'uploads' / 'logo.png').write_bytes(b'png')
+    (tmp_path / 'sw.js').write_text('// sw', encoding='utf-8')
+    (tmp_path / 'invoices').mkdir()
+    (tmp_path / 'invoices' / 'Apartamento D-404 Estado de cuenta.pdf').write_bytes(b'%PDF-1.4')
+    (tmp_path / 'reports').mkdir()
+    (tmp_path / 'reports' / 'reporte_mensual.pdf').write_bytes(b'%PDF-1.4')
+
+    files = build_static.build_static(tmp_path)
+
+    fingerprinted = files['css/app.css']
+    assert fingerprinted.startswith('dist/css/app.') and fingerprinted.endswith('.css')
+    assert set(files) == {'css/app.css'}
+    assert (tmp_path / (fingerprinted + '.gz')).exists()
+    precache = (tmp_path / 'dist' / 'sw-precache.js').read_text(encoding='utf-8')
+    assert json.dumps(f'/static/{fingerprinted}') in precache
+    assert '.pdf' not in precache
+    assert not list((tmp_path / 'dist').rglob('*.pdf'))
+
+    monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+    try:
+        static_assets.reload_manifest(app)
+        with app.test_request_context():
+            from flask import url_for
+            assert url_for('static', filename='css/app.css') == f'/static/{fingerprinted}'
+
+        response = app.test_client().get(f'/static/{fingerprinted}', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'immutable' in response.headers['Cache-Control']
+        assert gzip.decompress(response.data).startswith(b'body { color')
+        response.close()
+    finally:
+        monkeypatch.undo()
+        static_assets.reload_manifest(app)
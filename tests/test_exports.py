@@ -0,0 +1,126 @@
+"""
+Tests para las exportaciones en streaming (CSV / XLSX)
+"""
+
+import csv
+import io
+import zipfile
+
+import pytest
+
+import exports
+from db import get_conn
+
+
+def _seed_export_data():
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        for table in ('payments', 'invoices', 'expenses', 'accounting_transactions', 'apartments'):
+            cur.execute(f'DELETE FROM {table}')
+
+        cur.execute("INSERT INTO apartments (number, resident_name) VALUES (?, ?)", ('C-303', 'Diana Ruiz'))
+        unit_id = cur.lastrowid
+        cur.execute(
+            """
+            INSERT INTO invoices (unit_id, description, amount, issued_date, due_date, paid)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (unit_id, 'Mantenimiento marzo', 120.0, '2026-03-01', '2026-03-31', 0),
+        )
+        invoice_id = cur.lastrowid
+        cur.execute(
+            "INSERT INTO payments (invoice_id, amount, paid_date, method) VALUES (?, ?, ?, ?)",
+            (invoice_id, 70.0, '2026-03-31 18:30:00', 'transferencia'),
+        )
+        cur.execute(
+            "INSERT INTO expenses (description, amount, category, date) VALUES (?, ?, ?, ?)",
+            ('Jardinería, marzo', 25.0, 'Mantenimiento', '2026-03-10'),
+        )
+        cur.executemany(
+            """
+            INSERT INTO accounting_transactions (type, description, amount, category, reference, date)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                ('income', 'Pago factura', 70.0, 'Cuotas', f'INV-{invoice_id}', '2026-03-31'),
+                ('income', 'Alquiler salón', 40.0, 'Eventos', None, '2026-03-15'),
+                ('expense', 'Comisión bancaria', 5.0, 'Banco', None, '2026-04-02'),
+            ],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _read_csv(data: bytes):
+    return list(csv.reader(io.StringIO(data.decode('utf-8-sig'))))
+
+
+@pytest.mark.unit
+def test_stream_export_csv_filters_by_inclusive_date_range(app):
+    _seed_export_data()
+
+    rows = _read_csv(b''.join(exports.stream_export('payments', '2026-03-01', '2026-03-31', 'csv')))
+
+    assert rows[0] == exports.EXPORT_DATASETS['payments']['columns']
+    assert len(rows) == 2
+    assert rows[1][3] == 'C-303'
+    assert float(rows[1][6]) == pytest.approx(70.0)
+
+
+@pytest.mark.unit
+def test_stream_export_income_statement_matches_accounting_rules(app):
+    _seed_export_data()
+
+    rows = _read_csv(b''.join(exports.stream_export('income_statement', '2026-03-01', '2026-03-31', 'csv')))
+    sections = sorted(row[0] for row in rows[1:])
+
+    # La transacción INV- duplica el pago y la comisión cae fuera del rango.
+    assert sections == ['operating_expense', 'operating_income', 'other_income']
+
+
+@pytest.mark.unit
+def test_stream_export_xlsx_produces_readable_workbook(app):
+    _seed_export_data()
+
+    data = b''.join(exports.stream_export('expenses', '2026-03-01', '2026-03-31', 'xlsx'))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert '[Content_Types].xml' in archive.namelist()
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    assert 'Jardinería, marzo' in sheet
+    assert '<v>25.0</v>' in sheet
+
+
+@pytest.mark.unit
+def test_stream_export_rejects_invalid_parameters(app):
+    with pytest.raises(ValueError):
+        exports.stream_export('payments', '2026-13-01', '2026-03-31', 'csv')
+    with pytest.raises(ValueError):
+        exports.stream_export('payments', '2026-04-01', '2026-03-31', 'csv')
+    with pytest.raises(ValueError):
+        exports.stream_export('users', '2026-03-01', '2026-03-31', 'csv')
+    with pytest.raises(ValueError):
+        exports.stream_export('payments', '2026-03-01', '2026-03-31', 'pdf')
+
+
+@pytest.mark.integration
+def test_export_route_streams_attachment(auth_client):
+    _seed_export_data()
+
+    response = auth_client.get('/reportes/exportar/invoices.csv?date_from=2026-01-01&date_to=2026-12-31')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'invoices_2026-01-01_2026-12-31.csv' in response.headers['Content-Disposition']
+    rows = _read_csv(response.get_data())
+    assert rows[1][5] == 'Mantenimiento marzo'
+    assert float(rows[1][8]) == pytest.approx(50.0)
+
+
+@pytest.mark.integration
+def test_export_route_rejects_bad_dates(auth_client):
+    response = auth_client.get('/reportes/exportar/payments.csv?date_from=ayer')
+
+    assert response.status_code == 400
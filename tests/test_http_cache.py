@@ -0,0 +1,89 @@
+"""
+Tests para GET condicional (ETag / Last-Modified)
+"""
+
+import pytest
+
+import db
+import resident_auth
+import residents
+import user_model
+
+
+def _touch_ledger():
+    conn = db.get_conn()
+    conn.execute("INSERT INTO expenses (description, amount, date) VALUES ('etag probe', 1, '2026-01-01')")
+    conn.execute("DELETE FROM expenses WHERE description = 'etag probe'")
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def resident_user(app):
+    user_id = user_model.create_user(
+        username='etag_resident',
+        email='etag_resident@example.com',
+        password='password123',
+        full_name='ETag Resident',
+        role='resident',
+    )
+    yield user_model.get_user_by_id(user_id)
+    user_model.invalidate_user_cache(user_id)
+    conn = db.get_conn()
+    conn.execute("DELETE FROM resident_api_refresh_tokens WHERE user_id = ?", (user_id,))
+    conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.integration
+def test_list_page_revalidates_until_the_ledger_changes(auth_client):
+    auth_client.get('/ventas/facturas')
+    first = auth_client.get('/ventas/facturas')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+    etag = first.headers['ETag']
+
+    cached = auth_client.get('/ventas/facturas', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+
+    other_query = auth_client.get('/ventas/facturas?page=2', headers={'If-None-Match': etag})
+    assert other_query.status_code == 200
+
+    _touch_ledger()
+
+    fresh = auth_client.get('/ventas/facturas', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.headers['ETag'] != etag
+
+
+@pytest.mark.integration
+def test_if_modified_since_is_honored(auth_client):
+    first = auth_client.get('/reportes/')
+    assert first.status_code == 200
+    last_modified = first.headers['Last-Modified']
+
+    cached = auth_client.get('/reportes/', headers={'If-Modified-Since': last_modified})
+    assert cached.status_code == 304
+
+
+@pytest.mark.integration
+def test_resident_api_answers_304_without_running_the_query(client, resident_user, monkeypatch):
+    token = resident_auth.issue_token_pair(resident_user)['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/api/resident/invoices', headers=headers)
+    assert first.status_code == 200
+    assert 'Authorization' in first.headers['Vary']
+
+    def fail(*args, **kwargs):
+        raise AssertionError('la vista no debe ejecutarse en una revalidación')
+
+    monkeypatch.setattr(residents, 'list_resident_invoices_for_user', fail)
+    cached = client.get(
+        '/api/resident/invoices',
+        headers={**headers, 'If-None-Match': first.headers['ETag']},
+    )
+    assert cached.status_code == 304
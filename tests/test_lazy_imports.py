@@ -0,0 +1,70 @@
+"""
+Tests para la carga diferida de dependencias pesadas y el presupuesto de import
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from utils.lazy_imports import is_available, lazy_import
+
+ROOT_DIR = Path(__file__).parent.parent
+
+# Dependencias que un worker no debe cargar hasta usarlas.
+HEAVY_MODULES = ('reportlab', 'PIL', 'pytesseract', 'requests', 'google.generativeai')
+# Tiempo acumulado máximo de ``import app`` (microsegundos, -X importtime).
+IMPORT_BUDGET_US = 3_000_000
+
+
+def _importtime(tmp_path) -> dict:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = str(ROOT_DIR)
+    env['TESTING'] = 'True'
+    env['BUILDING_MAINTENANCE_DB'] = str(tmp_path / 'import_budget.db')
+    env['METRICS_DIR'] = str(tmp_path / 'metrics')
+    env['JINJA_BYTECODE_CACHE_DIR'] = str(tmp_path / 'jinja_cache')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, total, name = line.split('|', 2)
+        cumulative[name.strip()] = int(total.strip())
+    return cumulative
+
+
+def test_import_app_skips_heavy_dependencies_and_stays_in_budget(tmp_path):
+    cumulative = _importtime(tmp_path)
+
+    loaded = [name for name in HEAVY_MODULES if name in cumulative]
+    assert loaded == []
+    assert 'invoice_pdf' not in cumulative
+    assert cumulative['app'] < IMPORT_BUDGET_US
+
+
+def test_lazy_import_runs_module_on_first_attribute_access(tmp_path, monkeypatch):
+    (tmp_path / 'lazy_probe_mod.py').write_text(
+        "import builtins\nbuiltins.lazy_probe_runs = getattr(builtins, 'lazy_probe_runs', 0) + 1\nVALUE = 42\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'lazy_probe_mod', raising=False)
+    import builtins
+    monkeypatch.setattr(builtins, 'lazy_probe_runs', 0, raising=False)
+
+    module = lazy_import('lazy_probe_mod')
+    assert builtins.lazy_probe_runs == 0
+    assert module.VALUE == 42
+    assert builtins.lazy_probe_runs == 1
+    assert lazy_import('lazy_probe_mod') is module
+    import lazy_probe_mod
+    assert lazy_probe_mod is module
+    assert builtins.lazy_probe_runs == 1
+
+    assert is_available('lazy_probe_mod')
+    assert not is_available('no_such_package.sub')
@@ -0,0 +1,122 @@
+"""
+Tests para el exportador de métricas Prometheus
+"""
+
+import json
+import os
+
+import pytest
+
+import metrics
+from extensions import cache
+
+
+def _sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+@pytest.mark.unit
+def test_track_external_and_job_record_histograms():
+    with metrics.track_external('test_service'):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.track_external('test_service'):
+            raise RuntimeError('boom')
+
+    @metrics.track_job('test_job')
+    def job():
+        return 'done'
+
+    assert job() == 'done'
+    text = metrics.render_prometheus()
+
+    assert '# TYPE app_external_call_duration_seconds histogram' in text
+    assert _sample(text, 'app_external_call_duration_seconds_count{service="test_service",status="ok"}') >= 1
+    assert _sample(text, 'app_external_call_duration_seconds_count{service="test_service",status="error"}') >= 1
+    assert 'app_scheduler_job_duration_seconds_bucket{job="test_job",status="ok",le="+Inf"}' in text
+
+
+@pytest.mark.unit
+def test_cache_reads_are_counted_by_key_prefix(app):
+    prefix = 'metrics_test'
+    before = metrics.render_prometheus()
+    cache.set(f'{prefix}/present', 1)
+    cache.get(f'{prefix}/present')
+    cache.get(f'{prefix}/absent')
+    after = metrics.render_prometheus()
+
+    hit = f'app_cache_requests_total{{prefix="{prefix}",result="hit"}}'
+    miss = f'app_cache_requests_total{{prefix="{prefix}",result="miss"}}'
+    assert _sample(after, hit) - _sample(before, hit) == 1
+    assert _sample(after, miss) - _sample(before, miss) == 1
+    assert metrics.cache_key_prefix('view//ventas/facturas') == 'view'
+
+
+@pytest.mark.unit
+def test_export_merges_files_from_other_workers(tmp_path, monkeypatch):
+    other_worker = {
+        'counters': [['app_requests_total', {'endpoint': 'merge.test', 'status': '200'}, 5]],
+        'histograms': [[
+            'app_request_duration_seconds',
+            {'blueprint': 'merge', 'endpoint': 'merge.test', 'method': 'GET'},
+            {'buckets': [1] + [0] * (len(metrics.LATENCY_BUCKETS) - 1), 'sum': 0.004, 'count': 1},
+        ]],
+    }
+    (tmp_path / 'metrics_999999.json').write_text(json.dumps(other_worker), encoding='utf-8')
+    monkeypatch.setattr(metrics._registry, 'directory', tmp_path)
+
+    metrics.inc_counter('app_requests_total', 2, endpoint='merge.test', status='200')
+    text = metrics.render_prometheus()
+
+    assert (tmp_path / f'metrics_{os.getpid()}.json').exists()
+    assert _sample(text, 'app_requests_total{endpoint="merge.test",status="200"}') == 7
+    assert _sample(
+        text,
+        'app_request_duration_seconds_bucket{blueprint="merge",endpoint="merge.test",method="GET",le="+Inf"}',
+    ) == 1
+
+
+@pytest.mark.integration
+def test_metrics_endpoint_reports_request_latency_and_db_time(auth_client):
+    auth_client.get('/ventas/facturas')
+
+    response = auth_client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'app_request_duration_seconds_count{blueprint="billing",endpoint="billing.invoices",method="GET"}' in text
+    assert _sample(text, 'app_db_queries_total{endpoint="billing.invoices"}') > 0
+
+
+@pytest.mark.integration
+def test_metrics_endpoint_requires_token_for_anonymous_scrapers(app, client):
+    app.config['METRICS_TOKEN'] = 'scrape-secret'
+    try:
+        denied = client.get('/metrics')
+        allowed = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+    finally:
+        app.config['METRICS_TOKEN'] = ''
+
+    assert denied.status_code == 403
+    assert allowed.status_code == 200
+
+
+@pytest.mark.integration
+def test_metrics_endpoint_ignores_loopback_unless_allowed(app, client):
+    assert app.config['METRICS_TOKEN'] == ''
+
+    denied = client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+    app.config['METRICS_ALLOW_LOOPBACK'] = True
+    try:
+        allowed = client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+        remote = client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.7'})
+    finally:
+        app.config['METRICS_ALLOW_LOOPBACK'] = False
+
+    assert denied.status_code == 403
+    assert allowed.status_code == 200
+    assert remote.status_code == 403
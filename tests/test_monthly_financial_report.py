@@ -1,4 +1,5 @@
 from datetime import datetime
+import sqlite3
 import sys
 
 import pytest
@@ -233,6 +234,62 @@ def test_get_monthly_financial_report_data_uses_previous_month(app):
     assert report['expenses'][0]['description'] == 'Limpieza áreas comunes'
 
 
+@pytest.mark.unit
+def test_get_monthly_financial_report_data_serves_closed_period_from_snapshot(app, monkeypatch):
+    with app.app_context():
+        _seed_monthly_report_data()
+        first = get_monthly_financial_report_data(reference_dt=datetime(2026, 5, 3, 8, 0, 0))
+
+        def _fail(*args, **kwargs):
+            raise AssertionError('closed period should be served from snapshot')
+
+        monkeypatch.setattr(accounting, 'get_income_statement', _fail)
+        monkeypatch.setattr(accounting, 'get_cash_flow_statement', _fail)
+        second = get_monthly_financial_report_data(reference_dt=datetime(2026, 5, 20, 8, 0, 0))
+
+    assert second['generated_at'] == first['generated_at']
+    assert second['closing_balance'] == pytest.approx(first['closing_balance'])
+    assert second['collections'][0]['apt_number'] == 'A-101'
+
+
+@pytest.mark.unit
+def test_monthly_report_snapshot_invalidated_only_by_entries_up_to_period(app):
+    reference_dt = datetime(2026, 5, 3, 8, 0, 0)
+    with app.app_context():
+        _seed_monthly_report_data()
+        first = get_monthly_financial_report_data(reference_dt=reference_dt)
+        version = accounting.get_ledger_version(first['date_to'])
+
+        conn = get_conn()
+        try:
+            conn.execute(
+                "INSERT INTO expenses (description, amount, category, date) VALUES (?, ?, ?, ?)",
+                ('Pintura mayo', 40.0, 'Mantenimiento', '2026-05-15'),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        assert accounting.get_ledger_version(first['date_to']) == version
+        cached = get_monthly_financial_report_data(reference_dt=reference_dt)
+        assert cached['generated_at'] == first['generated_at']
+
+        conn = get_conn()
+        try:
+            conn.execute(
+                "INSERT INTO expenses (description, amount, category, date) VALUES (?, ?, ?, ?)",
+                ('Reparación portón', 15.0, 'Mantenimiento', '2026-04-20'),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        refreshed = get_monthly_financial_report_data(reference_dt=reference_dt)
+
+    assert refreshed['total_expenses'] == pytest.approx(45.0)
+    assert len(refreshed['expenses']) == 2
+
+
 @pytest.mark.unit
 def test_monthly_report_pending_days_overdue_never_negative(app):
     with app.app_context():
@@ -539,6 +596,93 @@ def test_send_previous_month_financial_report_sends_once_per_unique_recipient(ap
     ]
 
 
+@pytest.mark.integration
+def test_send_previous_month_financial_report_reuses_smtp_sessions_and_reports_progress(app, monkeypatch, tmp_path):
+    connections = []
+
+    class FakeSMTP:
+        def __init__(self, host, port):
+            self.messages = []
+            connections.append(self)
+
+        def ehlo(self):
+            return 250, b'OK'
+
+        def starttls(self):
+            return 220, b'ready'
+
+        def has_extn(self, name):
+            return False
+
+        def login(self, user, password):
+            pass
+
+        def send_message(self, msg):
+            self.messages.append(msg['To'])
+
+        def quit(self):
+            pass
+
+    monkeypatch.setenv('SMTP_HOST', 'smtp.example.com')
+    monkeypatch.setenv('SMTP_PORT', '587')
+    monkeypatch.setenv('SMTP_USER', 'user@example.com')
+    monkeypatch.setenv('SMTP_PASSWORD', 'secret')
+    monkeypatch.setattr(senders.smtplib, 'SMTP', FakeSMTP)
+
+    progress_updates = []
+
+    with app.app_context():
+        _seed_monthly_report_data()
+        result = send_previous_month_financial_report(
+            reference_dt=datetime(2026, 5, 3, 8, 0, 0),
+            output_path=str(tmp_path / 'monthly_financial_report_2026-04.pdf'),
+            max_workers=2,
+            progress_callback=progress_updates.append,
+        )
+
+    assert result['failed'] == []
+    assert result['sent'] == [
+        'admin@toscana.com',
+        'ana@example.com',
+        'bruno@example.com',
+        'carla@example.com',
+    ]
+    assert 1 <= len(connections) <= 2
+    assert sorted(to for client in connections for to in client.messages) == sorted(result['sent'])
+    assert len(progress_updates) == 4
+    assert max(update['processed'] for update in progress_updates) == 4
+    assert all(update['total'] == 4 for update in progress_updates)
+
+
+@pytest.mark.integration
+def test_send_previous_month_financial_report_records_claim_errors_per_recipient(app, monkeypatch, tmp_path):
+    sent_messages = []
+    original_claim = reports_module.claim_monthly_report_dispatch
+
+    def flaky_claim(report_period, recipient_email, **kwargs):
+        if recipient_email == 'bruno@example.com':
+            raise sqlite3.OperationalError('database is locked')
+        return original_claim(report_period, recipient_email, **kwargs)
+
+    def fake_send_email(to_email, subject, html, attach_pdf=None, attachments=None):
+        sent_messages.append(to_email)
+
+    monkeypatch.setattr(reports_module, 'claim_monthly_report_dispatch', flaky_claim)
+    monkeypatch.setattr(senders, 'send_email', fake_send_email)
+
+    with app.app_context():
+        _seed_monthly_report_data()
+        result = send_previous_month_financial_report(
+            reference_dt=datetime(2026, 5, 3, 8, 0, 0),
+            output_path=str(tmp_path / 'monthly_financial_report_2026-04.pdf'),
+            max_workers=2,
+        )
+
+    assert result['failed'] == [{'email': 'bruno@example.com', 'error': 'database is locked'}]
+    assert result['sent'] == ['admin@toscana.com', 'ana@example.com', 'carla@example.com']
+    assert sorted(sent_messages) == result['sent']
+
+
 @pytest.mark.integration
 def test_monthly_report_preview_route_renders(preview_auth_client, app):
     with app.app_context():
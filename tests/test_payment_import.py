@@ -0,0 +1,160 @@
+"""
+Tests para la importación masiva de pagos desde estados de cuenta bancarios
+"""
+
+import io
+
+import pytest
+
+import payment_import
+from db import get_conn
+from extensions import db as sa_db
+
+
+def _seed_open_invoices():
+    sa_db.session.remove()
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        for table in ('payments', 'accounting_transactions', 'invoices', 'apartments'):
+            cur.execute(f'DELETE FROM {table}')
+
+        cur.execute("INSERT INTO apartments (number, resident_name) VALUES (?, ?)", ('A-101', 'Ana Perez'))
+        unit_a = cur.lastrowid
+        cur.execute("INSERT INTO apartments (number, resident_name) VALUES (?, ?)", ('B-202', 'Bruno Diaz'))
+        unit_b = cur.lastrowid
+
+        invoice_ids = {}
+        for key, unit_id, amount, issued in (
+            ('a_march', unit_a, 100.0, '2026-03-01'),
+            ('a_april', unit_a, 100.0, '2026-04-01'),
+            ('b_april', unit_b, 250.0, '2026-04-01'),
+            ('b_extra', unit_b, 80.0, '2026-04-05'),
+        ):
+            cur.execute(
+                """
+                INSERT INTO invoices (unit_id, description, amount, issued_date, due_date, paid, pending_amount)
+                VALUES (?, ?, ?, ?, ?, 0, ?)
+                """,
+                (unit_id, f'Mantenimiento {key}', amount, issued, issued, amount),
+            )
+            invoice_ids[key] = cur.lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+    return invoice_ids
+
+
+@pytest.fixture
+def captured_followups(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        payment_import,
+        'enqueue_payment_followups',
+        lambda items, **kwargs: calls.append((items, kwargs)),
+    )
+    return calls
+
+
+@pytest.mark.unit
+def test_parse_bank_statement_reads_csv_and_ofx():
+    csv_content = (
+        "Fecha;Descripción;Monto\n"
+        "15/04/2026;Pago apto A-101;1.250,50\n"
+        "16/04/2026;Cargo comisión;-35,00\n"
+    ).encode('latin-1')
+    ofx_content = (
+        "OFXHEADER:100\n<OFX><BANKTRANLIST>"
+        "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260417120000[-4:AST]<TRNAMT>250.00"
+        "<FITID>TX-9<NAME>TRANSFERENCIA<MEMO>FACTURA 12</STMTTRN>"
+        "</BANKTRANLIST></OFX>"
+    )
+
+    csv_deposits = payment_import.parse_bank_statement(csv_content, 'banco.csv')
+    ofx_deposits = payment_import.parse_bank_statement(ofx_content, 'banco.ofx')
+
+    assert len(csv_deposits) == 1
+    assert csv_deposits[0]['date'] == '2026-04-15'
+    assert csv_deposits[0]['amount'] == pytest.approx(1250.50)
+    assert csv_deposits[0]['bank_id']
+    assert ofx_deposits == [{
+        'line': 1,
+        'date': '2026-04-17',
+        'amount': 250.0,
+        'reference': 'TRANSFERENCIA FACTURA 12',
+        'unit': None,
+        'bank_id': 'TX-9',
+    }]
+
+
+@pytest.mark.integration
+def test_import_bank_statement_matches_and_records_in_bulk(app, captured_followups):
+    invoice_ids = _seed_open_invoices()
+    statement = (
+        "fecha,referencia,monto,id\n"
+        f"2026-04-10,Pago factura #{invoice_ids['b_april']},250.00,T1\n"
+        "2026-04-11,Deposito apto A 101,100.00,T2\n"
+        "2026-04-12,Transferencia sin referencia,80.00,T3\n"
+        "2026-04-13,Transferencia sin referencia,999.00,T4\n"
+    )
+
+    result = payment_import.import_bank_statement(statement, 'banco.csv')
+
+    matched = {item['bank_id']: item for item in result['matched']}
+    assert matched['T1']['invoice_id'] == invoice_ids['b_april']
+    assert matched['T1']['match'] == 'referencia'
+    assert matched['T2']['invoice_id'] == invoice_ids['a_march']
+    assert matched['T3']['invoice_id'] == invoice_ids['b_extra']
+    assert [item['bank_id'] for item in result['unmatched']] == ['T4']
+    assert len(result['imported']) == 3
+
+    conn = get_conn()
+    try:
+        paid = {
+            row['id']: row['paid']
+            for row in conn.execute("SELECT id, paid FROM invoices").fetchall()
+        }
+        payment_dates = [row['paid_date'] for row in conn.execute("SELECT paid_date FROM payments ORDER BY id")]
+        entries = conn.execute("SELECT COUNT(*) FROM accounting_transactions WHERE reference LIKE 'INV-%'").fetchone()[0]
+    finally:
+        conn.close()
+
+    assert paid[invoice_ids['b_april']] == 1
+    assert paid[invoice_ids['a_march']] == 1
+    assert paid[invoice_ids['a_april']] == 0
+    assert payment_dates == ['2026-04-10 00:00:00', '2026-04-11 00:00:00', '2026-04-12 00:00:00']
+    assert entries == 3
+    assert len(captured_followups) == 1
+    assert [item['payment_id'] for item in captured_followups[0][0]] == [item['payment_id'] for item in result['imported']]
+
+
+@pytest.mark.integration
+def test_import_bank_statement_skips_already_imported_deposits(app, captured_followups):
+    invoice_ids = _seed_open_invoices()
+    statement = f"fecha,referencia,monto\n2026-04-10,Factura {invoice_ids['a_march']},60.00\n"
+
+    first = payment_import.import_bank_statement(statement, 'banco.csv')
+    second = payment_import.import_bank_statement(statement, 'banco.csv')
+
+    assert len(first['imported']) == 1
+    assert second['imported'] == []
+    assert len(second['duplicates']) == 1
+
+
+@pytest.mark.integration
+def test_import_payments_route_dry_run_does_not_write(auth_client, captured_followups):
+    _seed_open_invoices()
+    data = {
+        'statement': (io.BytesIO(b"fecha,referencia,monto\n2026-04-12,Pago,80.00\n"), 'banco.csv'),
+        'dry_run': '1',
+    }
+
+    response = auth_client.post('/ventas/pagos/importar', data=data, content_type='multipart/form-data')
+
+    assert response.status_code == 302
+    conn = get_conn()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM payments").fetchone()[0] == 0
+    finally:
+        conn.close()
+    assert captured_followups == []
@@ -0,0 +1,78 @@
+"""
+Tests para el contador de queries por request y el log de queries lentas
+"""
+
+import logging
+
+import pytest
+
+import db
+from extensions import db as sa_db
+from utils import query_profiler
+
+
+@pytest.mark.unit
+def test_legacy_connections_are_instrumented(app):
+    assert app.config['SQL_PROFILING_ENABLED'] is True
+
+    conn = db.get_conn()
+    try:
+        assert isinstance(conn, query_profiler.ProfiledConnection)
+        assert isinstance(conn.execute("SELECT 1"), query_profiler.ProfiledCursor)
+    finally:
+        conn.close()
+
+
+@pytest.mark.unit
+def test_counts_sqlite3_and_sqlalchemy_queries_per_request(app):
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        conn = db.get_conn()
+        try:
+            conn.execute("SELECT COUNT(*) FROM invoices").fetchone()
+            conn.cursor().execute("SELECT COUNT(*) FROM payments").fetchone()
+        finally:
+            conn.close()
+        sa_db.session.execute(sa_db.text("SELECT 1")).scalar()
+
+        stats = query_profiler.get_request_query_stats()
+        assert stats['sqlite3'] >= 3  # incluye el PRAGMA foreign_keys de get_conn()
+        assert stats['sqlalchemy'] == 1
+        assert stats['count'] == stats['sqlite3'] + stats['sqlalchemy']
+
+        response = app.process_response(app.response_class('ok'))
+
+    header = response.headers['Server-Timing']
+    assert header.startswith('db;dur=')
+    assert f'desc="{stats["count"]} queries"' in header
+    assert 'app;dur=' in header
+
+
+@pytest.mark.unit
+def test_slow_queries_are_logged_with_query_plan(app, caplog):
+    app.config['SQL_SLOW_QUERY_MS'] = 0
+    try:
+        with app.test_request_context('/'), caplog.at_level(logging.WARNING):
+            app.preprocess_request()
+            conn = db.get_conn()
+            try:
+                conn.execute("SELECT id FROM invoices WHERE id = ?", (1,)).fetchall()
+            finally:
+                conn.close()
+            stats = query_profiler.get_request_query_stats()
+    finally:
+        app.config['SQL_SLOW_QUERY_MS'] = 100
+
+    slow_logs = [r.getMessage() for r in caplog.records if '[SQL lenta]' in r.getMessage()]
+    assert stats['slow'] == stats['count']
+    assert any('SELECT id FROM invoices WHERE id = ?' in msg and 'plan=[(' in msg for msg in slow_logs)
+    # El EXPLAIN no cuenta como query del request.
+    assert not any('EXPLAIN QUERY PLAN' in msg for msg in slow_logs)
+
+
+@pytest.mark.integration
+def test_page_response_includes_server_timing(auth_client):
+    response = auth_client.get('/ventas/facturas')
+
+    assert response.status_code == 200
+    assert 'db;dur=' in response.headers.get('Server-Timing', '')
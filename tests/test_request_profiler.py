@@ -0,0 +1,74 @@
+"""
+Tests para el perfilado opcional de requests
+"""
+
+import pytest
+from markupsafe import escape
+
+from utils import request_profiler
+
+
+@pytest.fixture
+def profiling(app, tmp_path):
+    previous = {
+        key: app.config.get(key)
+        for key in ('REQUEST_PROFILING_ENABLED', 'REQUEST_PROFILING_DIR',
+                    'REQUEST_PROFILING_SAMPLE_RATE', 'REQUEST_PROFILING_MIN_MS', 'REQUEST_PROFILING_KEEP')
+    }
+    app.config.update(
+        REQUEST_PROFILING_ENABLED=True,
+        REQUEST_PROFILING_DIR=str(tmp_path),
+        REQUEST_PROFILING_SAMPLE_RATE=0,
+        REQUEST_PROFILING_MIN_MS=500,
+        REQUEST_PROFILING_KEEP=50,
+    )
+    yield tmp_path
+    app.config.update(previous)
+
+
+@pytest.mark.integration
+def test_admin_header_profiles_request_and_page_lists_it(app, auth_client, profiling):
+    response = auth_client.get('/ventas/facturas', headers={'X-Profile': '1'})
+
+    profile_id = response.headers.get('X-Profile-Id')
+    assert response.status_code == 200
+    assert profile_id
+    profile = request_profiler.load_profile(app, profile_id)
+    assert profile['endpoint'] == 'billing.invoices'
+    assert profile['trigger'] == 'header'
+    assert profile['user'] == 'admin'
+    assert profile['top_functions']
+    assert {'function', 'ncalls', 'tottime_ms', 'cumtime_ms'} <= set(profile['top_functions'][0])
+
+    listing = auth_client.get('/configuracion/perfiles')
+    detail = auth_client.get(f'/configuracion/perfiles?id={profile_id}')
+    assert b'/ventas/facturas' in listing.data
+    assert str(escape(profile['top_functions'][0]['function'])).encode() in detail.data
+
+
+@pytest.mark.integration
+def test_header_is_ignored_for_anonymous_users(client, profiling):
+    response = client.get('/login', headers={'X-Profile': '1'})
+
+    assert 'X-Profile-Id' not in response.headers
+    assert list(profiling.glob('*.json')) == []
+
+
+@pytest.mark.integration
+def test_sampled_requests_are_kept_only_when_slow(app, client, profiling):
+    app.config['REQUEST_PROFILING_SAMPLE_RATE'] = 1.0
+
+    client.get('/login')
+    assert list(profiling.glob('*.json')) == []
+
+    app.config['REQUEST_PROFILING_MIN_MS'] = 0
+    client.get('/login')
+    profiles = request_profiler.list_profiles(app)
+    assert len(profiles) == 1
+    assert profiles[0]['trigger'] == 'sample'
+
+
+@pytest.mark.unit
+def test_profile_ids_are_validated(app, profiling):
+    assert request_profiler.load_profile(app, '../../etc/passwd') is None
+    assert request_profiler.get_collapsed_path(app, '../secret') is None
@@ -5,8 +5,10 @@ import pytest
 import apartments
 import db
 import receipt_pdf
+import resident_auth
 import residents
 import user_model
+from blueprints import resident_api
 
 
 def _reset_api_state():
@@ -446,4 +448,491 @@ def test_resident_api_logout_revokes_refresh_token(client, app):
 
     assert logout_response.status_code == 200
     assert logout_response.get_json()['revoked_tokens'] == 1
-    assert refresh_after_logout_response.status_code == 401
\ No newline at end of file
+    assert refresh_after_logout_response.status_code == 401
+
+def _create_linked_resident(app, number: str, username: str):
+    with app.app_context():
+        _reset_api_state()
+        unit_id = apartments.add_apartment(number=number, resident_name='Cursor Resident', resident_email='')
+        user_id = user_model.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='password123',
+            full_name='Cursor Resident',
+            role='resident',
+        )
+        residents.link_user_to_apartment(
+            user_id,
+            unit_id,
+            resident_email=f'{username}@example.com',
+            resident_name='Cursor Resident',
+            created_by=1,
+        )
+    return unit_id, user_id
+
+
+@pytest.mark.integration
+def test_resident_api_paginates_invoices_and_payments_with_cursors(client, app):
+    unit_id, user_id = _create_linked_resident(app, 'M-505', 'cursor_resident')
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        for month in range(1, 6):
+            cur.execute(
+                "INSERT INTO invoices (unit_id, description, amount, issued_date, due_date, paid) VALUES (?, ?, ?, ?, ?, ?)",
+                (unit_id, f'Cuota {month}', 100.0, f'2026-0{month}-01', f'2026-0{month}-15', 1),
+            )
+            cur.execute(
+                "INSERT INTO payments (invoice_id, amount, paid_date, method) VALUES (?, ?, ?, ?)",
+                (cur.lastrowid, 100.0, f'2026-0{month}-05', 'transfer' if month % 2 else 'cash'),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+    _login_user_session(client, user_id)
+
+    seen = []
+    cursor = None
+    while True:
+        query = '/api/resident/invoices?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        payload = client.get(query).get_json()
+        seen.extend(invoice['description'] for invoice in payload['invoices'])
+        if not payload['pagination']['has_more']:
+            break
+        cursor = payload['pagination']['next_cursor']
+    assert seen == [f'Cuota {month}' for month in range(5, 0, -1)]
+
+    first_page = client.get('/api/resident/payments?limit=3').get_json()
+    second_page = client.get(
+        f"/api/resident/payments?limit=3&cursor={first_page['pagination']['next_cursor']}"
+    ).get_json()
+    assert [p['paid_date'] for p in first_page['payments']] == ['2026-05-05', '2026-04-05', '2026-03-05']
+    assert [p['paid_date'] for p in second_page['payments']] == ['2026-02-05', '2026-01-05']
+    assert second_page['pagination']['has_more'] is False
+    assert {m['value'] for m in second_page['filters']['methods']} == {'cash', 'transfer'}
+    assert second_page['filters']['months'][0] == '2026-05'
+
+    assert client.get('/api/resident/invoices?cursor=%%%').status_code == 400
+
+
+@pytest.mark.integration
+def test_resident_api_lists_everything_for_clients_without_cursor_or_limit(client, app):
+    unit_id, user_id = _create_linked_resident(app, 'M-515', 'legacy_resident')
+    total = resident_api.DEFAULT_PAGE_SIZE + 5
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        for index in range(total):
+            cur.execute(
+                "INSERT INTO invoices (unit_id, description, amount, issued_date, paid) VALUES (?, ?, ?, ?, ?)",
+                (unit_id, f'Cuota {index}', 10.0, '2026-01-01', 1),
+            )
+            cur.execute(
+                "INSERT INTO payments (invoice_id, amount, paid_date, method) VALUES (?, ?, ?, ?)",
+                (cur.lastrowid, 10.0, '2026-01-05', 'cash'),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+    _login_user_session(client, user_id)
+
+    invoices_payload = client.get('/api/resident/invoices').get_json()
+    assert len(invoices_payload['invoices']) == total
+    assert invoices_payload['pagination']['has_more'] is False
+    assert invoices_payload['sync']['token']
+
+    payments_payload = client.get('/api/resident/payments').get_json()
+    assert len(payments_payload['payments']) == total
+    assert payments_payload['pagination']['total'] == total
+
+    paged = client.get('/api/resident/invoices?limit=10').get_json()
+    assert len(paged['invoices']) == 10
+    assert paged['pagination']['next_cursor']
+
+
+@pytest.mark.integration
+def test_resident_api_delta_sync_returns_only_changed_rows(client, app):
+    unit_id, user_id = _create_linked_resident(app, 'M-606', 'delta_resident')
+    other_unit_id = apartments.add_apartment(number='M-607', resident_name='Otro', resident_email='')
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO invoices (unit_id, description, amount, issued_date, paid) VALUES (?, ?, ?, ?, ?)",
+            (unit_id, 'Sin cambios', 100.0, '2026-01-01', 0),
+        )
+        cur.execute(
+            "INSERT INTO invoices (unit_id, description, amount, issued_date, paid) VALUES (?, ?, ?, ?, ?)",
+            (unit_id, 'Se paga', 80.0, '2026-02-01', 0),
+        )
+        paid_invoice_id = cur.lastrowid
+        cur.execute(
+            "INSERT INTO invoices (unit_id, description, amount, issued_date, paid) VALUES (?, ?, ?, ?, ?)",
+            (unit_id, 'Se borra', 60.0, '2026-03-01', 0),
+        )
+        deleted_invoice_id = cur.lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+
+    _login_user_session(client, user_id)
+    token = client.get('/api/resident/invoices').get_json()['sync']['token']
+
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO payments (invoice_id, amount, paid_date, method) VALUES (?, ?, ?, ?)",
+            (paid_invoice_id, 80.0, '2026-02-10', 'cash'),
+        )
+        cur.execute("DELETE FROM invoices WHERE id = ?", (deleted_invoice_id,))
+        cur.execute(
+            "INSERT INTO invoices (unit_id, description, amount, issued_date, paid) VALUES (?, ?, ?, ?, ?)",
+            (other_unit_id, 'Otra unidad', 50.0, '2026-02-01', 0),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    delta = client.get(f'/api/resident/invoices?updated_since={token}').get_json()
+    assert [invoice['description'] for invoice in delta['invoices']] == ['Se paga']
+    assert delta['invoices'][0]['remaining'] == 0
+    assert delta['removed_ids'] == [deleted_invoice_id]
+
+    payments_delta = client.get(f'/api/resident/payments?updated_since={token}').get_json()
+    assert [payment['amount'] for payment in payments_delta['payments']] == [80.0]
+
+    empty = client.get(f"/api/resident/invoices?updated_since={delta['sync']['token']}").get_json()
+    assert empty['invoices'] == [] and empty['removed_ids'] == []
+
+    stale_units = client.get(f"/api/resident/invoices?updated_since={token.split('.')[0]}.0000000000")
+    assert stale_units.status_code == 410
+
+
+@pytest.mark.integration
+def test_resident_api_delta_sync_removes_payments_deleted_with_their_invoice(client, app):
+    unit_id, user_id = _create_linked_resident(app, 'M-616', 'cascade_resident')
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO invoices (unit_id, description, amount, issued_date, paid) VALUES (?, ?, ?, ?, ?)",
+            (unit_id, 'Se borra pagada', 70.0, '2026-04-01', 1),
+        )
+        invoice_id = cur.lastrowid
+        cur.execute(
+            "INSERT INTO payments (invoice_id, amount, paid_date, method) VALUES (?, ?, ?, ?)",
+            (invoice_id, 70.0, '2026-04-05', 'cash'),
+        )
+        payment_id = cur.lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+
+    _login_user_session(client, user_id)
+    token = client.get('/api/resident/payments').get_json()['sync']['token']
+
+    conn = db.get_conn()
+    try:
+        conn.execute("DELETE FROM invoices WHERE id = ?", (invoice_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+    payments_delta = client.get(f'/api/resident/payments?updated_since={token}').get_json()
+    assert payments_delta['payments'] == []
+    assert payments_delta['removed_ids'] == [payment_id]
+
+
+@pytest.mark.integration
+def test_resident_api_delta_sync_moves_payments_with_reassigned_invoice(client, app):
+    old_unit_id, old_user_id = _create_linked_resident(app, 'M-626', 'old_unit_resident')
+    with app.app_context():
+        new_unit_id = apartments.add_apartment(number='M-627', resident_name='New Unit', resident_email='')
+        new_user_id = user_model.create_user(
+            username='new_unit_resident',
+            email='new_unit_resident@example.com',
+            password='password123',
+            full_name='New Unit',
+            role='resident',
+        )
+        residents.link_user_to_apartment(
+            new_user_id,
+            new_unit_id,
+            resident_email='new_unit_resident@example.com',
+            resident_name='New Unit',
+            created_by=1,
+        )
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO invoices (unit_id, description, amount, issued_date, paid) VALUES (?, ?, ?, ?, ?)",
+            (old_unit_id, 'Se mueve', 90.0, '2026-05-01', 1),
+        )
+        invoice_id = cur.lastrowid
+        cur.execute(
+            "INSERT INTO payments (invoice_id, amount, paid_date, method) VALUES (?, ?, ?, ?)",
+            (invoice_id, 90.0, '2026-05-05', 'transfer'),
+        )
+        payment_id = cur.lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+
+    # Bearer por usuario: la sesión de Flask-Login se queda con el primer usuario
+    # cargado mientras siga abierto el contexto de la app.
+    with app.app_context():
+        old_headers = _authorization_headers(
+            resident_auth.issue_token_pair(user_model.get_user_by_id(old_user_id))['access_token']
+        )
+        new_headers = _authorization_headers(
+            resident_auth.issue_token_pair(user_model.get_user_by_id(new_user_id))['access_token']
+        )
+    old_token = client.get('/api/resident/payments', headers=old_headers).get_json()['sync']['token']
+    new_token = client.get('/api/resident/payments', headers=new_headers).get_json()['sync']['token']
+    assert old_token != new_token
+
+    conn = db.get_conn()
+    try:
+        conn.execute("UPDATE invoices SET unit_id = ? WHERE id = ?", (new_unit_id, invoice_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+    new_delta = client.get(f'/api/resident/payments?updated_since={new_token}', headers=new_headers).get_json()
+    assert [payment['id'] for payment in new_delta['payments']] == [payment_id]
+    assert new_delta['removed_ids'] == []
+
+    old_delta = client.get(f'/api/resident/payments?updated_since={old_token}', headers=old_headers).get_json()
+    assert old_delta['payments'] == []
+    assert old_delta['removed_ids'] == [payment_id]
+
+
+@pytest.mark.integration
+def test_statement_summary_reads_unit_balances_kept_by_triggers(app):
+    with app.app_context():
+        _reset_api_state()
+        unit_id = apartments.add_apartment(number='S-101', resident_name='Summary Resident', resident_email='')
+        other_unit_id = apartments.add_apartment(number='S-102', resident_name='Other Resident', resident_email='')
+        user_id = user_model.create_user(
+            username='summary_resident',
+            email='summary_resident@example.com',
+            password='password123',
+            full_name='Summary Resident',
+            role='resident',
+        )
+        residents.link_user_to_apartment(user_id, unit_id, resident_email='summary_resident@example.com', created_by=1)
+
+        conn = db.get_conn()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO invoices (unit_id, description, amount, issued_date, due_date, paid) VALUES (?, ?, ?, ?, ?, ?)",
+                (unit_id, 'Cuota junio', 100.0, '2026-06-01', '2026-06-15', 0),
+            )
+            june_id = cur.lastrowid
+            cur.execute(
+                "INSERT INTO invoices (unit_id, description, amount, issued_date, due_date, paid) VALUES (?, ?, ?, ?, ?, ?)",
+                (unit_id, 'Cuota julio', 80.0, '2026-07-01', '2026-07-15', 0),
+            )
+            july_id = cur.lastrowid
+            # Un pago mayor que la factura no deja saldo negativo.
+            cur.execute(
+                "INSERT INTO payments (invoice_id, amount, paid_date, method) VALUES (?, ?, ?, ?)",
+                (june_id, 120.0, '2026-06-10', 'transfer'),
+            )
+            cur.execute("UPDATE invoices SET paid = 1 WHERE id = ?", (june_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+        totals = residents.get_resident_statement_summary_for_user(user_id)['totals']
+        assert totals == {
+            'apartments': 1,
+            'pending_invoices': 1,
+            'invoice_count': 2,
+            'balance': 80.0,
+            'total_invoiced': 180.0,
+            'total_paid': 120.0,
+        }
+
+        conn = db.get_conn()
+        try:
+            conn.execute("UPDATE invoices SET unit_id = ? WHERE id = ?", (other_unit_id, july_id))
+            conn.commit()
+            rows = {
+                row['unit_id']: (row['invoice_count'], row['balance'])
+                for row in conn.execute("SELECT unit_id, invoice_count, balance FROM unit_balance_summary")
+            }
+        finally:
+            conn.close()
+
+        assert rows == {unit_id: (1, 0.0), other_unit_id: (1, 80.0)}
+        summary = residents.get_resident_statement_summary_for_user(user_id)
+        assert summary['apartments'][0]['apartment_number'] == 'S-101'
+        assert summary['totals']['balance'] == 0.0
+        assert summary['totals']['pending_invoices'] == 0
+
+        conn = db.get_conn()
+        try:
+            conn.execute("DELETE FROM payments WHERE invoice_id = ?", (june_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+        assert residents.get_resident_statement_summary_for_user(user_id)['totals']['balance'] == 100.0
+
+
+@pytest.mark.integration
+def test_allowed_units_resolve_once_and_follow_link_changes(app, monkeypatch):
+    from utils import cache_versions
+
+    with app.app_context():
+        _reset_api_state()
+        unit_id = apartments.add_apartment(number='L-101', resident_name='Links Resident', resident_email='')
+        second_unit_id = apartments.add_apartment(number='L-102', resident_name='Links Resident', resident_email='')
+        user_id = user_model.create_user(
+            username='links_resident',
+            email='links_resident@example.com',
+            password='password123',
+            full_name='Links Resident',
+            role='resident',
+        )
+        residents.link_user_to_apartment(user_id, unit_id, resident_email='links_resident@example.com', created_by=1)
+
+    cache_versions.clear_process_cache()
+    queries = []
+    original_query = residents._query_linked_apartments
+
+    def counting_query(*args):
+        queries.append(args)
+        return original_query(*args)
+
+    monkeypatch.setattr(residents, '_query_linked_apartments', counting_query)
+
+    with app.test_request_context('/'):
+        assert residents.get_allowed_unit_ids_for_user(user_id) == {unit_id}
+        assert residents.get_allowed_unit_ids_for_user(user_id) == {unit_id}
+        linked = residents.list_linked_apartments_for_user(user_id)
+        linked[0]['number'] = 'mutado'
+        assert residents.list_linked_apartments_for_user(user_id)[0]['number'] == 'L-101'
+    assert len(queries) == 1
+
+    with app.test_request_context('/'):
+        assert residents.get_allowed_unit_ids_for_user(user_id) == {unit_id}
+    assert len(queries) == 1
+
+    with app.test_request_context('/'):
+        residents.link_user_to_apartment(user_id, second_unit_id, is_primary=False, created_by=1)
+        assert residents.get_allowed_unit_ids_for_user(user_id) == {unit_id, second_unit_id}
+    assert len(queries) == 2
+
+
+@pytest.mark.integration
+def test_access_tokens_verify_from_memory_and_honor_version_bumps(client, app, monkeypatch):
+    _, user_id = _create_linked_resident(app, 'T-101', 'version_resident')
+    login_payload = client.post(
+        '/api/resident/auth/login',
+        json={'identifier': 'version_resident', 'password': 'password123'},
+    ).get_json()
+    headers = _authorization_headers(login_payload['tokens']['access_token'])
+
+    loads = []
+    original_load = resident_auth._load_token_versions
+
+    def counting_load():
+        loads.append(1)
+        return original_load()
+
+    monkeypatch.setattr(resident_auth, '_load_token_versions', counting_load)
+    monkeypatch.setitem(app.config, 'RESIDENT_API_TOKEN_VERSION_REFRESH_SECONDS', 3600)
+    resident_auth.clear_token_version_cache()
+
+    assert client.get('/api/resident/profile', headers=headers).status_code == 200
+    assert client.get('/api/resident/apartments', headers=headers).status_code == 200
+    assert len(loads) == 1
+
+    # Cerrar todas las sesiones invalida el access token en este proceso.
+    logout_response = client.post('/api/resident/auth/logout', json={'all_sessions': True}, headers=headers)
+    assert logout_response.status_code == 200
+    rejected = client.get('/api/resident/profile', headers=headers)
+    assert rejected.status_code == 401
+    assert rejected.get_json()['error'] == 'Token revocado'
+
+    new_tokens = client.post(
+        '/api/resident/auth/login',
+        json={'identifier': 'version_resident', 'password': 'password123'},
+    ).get_json()['tokens']
+    new_headers = _authorization_headers(new_tokens['access_token'])
+    assert client.get('/api/resident/profile', headers=new_headers).status_code == 200
+
+    # Una desactivación hecha en otro proceso se ve al releer las versiones.
+    with app.app_context():
+        user_model.deactivate_user(user_id)
+        resident_auth.clear_token_version_cache()
+    assert client.get('/api/resident/profile', headers=new_headers).status_code == 401
+
+    with app.app_context():
+        conn = db.get_conn()
+        try:
+            conn.execute(
+                "INSERT INTO resident_api_refresh_tokens (user_id, jti, expires_at, issued_at) VALUES (?, ?, ?, ?)",
+                (user_id, 'expired-jti', 1, 0),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        assert resident_auth.purge_expired_refresh_tokens() == 1
+
+
+@pytest.mark.integration
+def test_resident_api_bootstrap_bundles_startup_data_on_one_connection(client, app, monkeypatch):
+    unit_id, user_id = _create_linked_resident(app, 'B-101', 'bootstrap_resident')
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        for month in range(1, 4):
+            cur.execute(
+                "INSERT INTO invoices (unit_id, description, amount, issued_date, due_date, paid) VALUES (?, ?, ?, ?, ?, ?)",
+                (unit_id, f'Cuota {month}', 100.0, f'2026-0{month}-01', f'2026-0{month}-15', 0),
+            )
+            cur.execute(
+                "INSERT INTO payments (invoice_id, amount, paid_date, method) VALUES (?, ?, ?, ?)",
+                (cur.lastrowid, 40.0, f'2026-0{month}-10', 'cash'),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+    _login_user_session(client, user_id)
+    opened = []
+    original_open = db._open_connection
+
+    def counting_open():
+        opened.append(1)
+        return original_open()
+
+    monkeypatch.setattr(db, '_open_connection', counting_open)
+    response = client.get('/api/resident/bootstrap?limit=2')
+    monkeypatch.undo()
+
+    assert response.status_code == 200
+    assert len(opened) == 1
+    payload = response.get_json()
+    assert payload['profile']['apartment_count'] == 1
+    assert payload['apartments'][0]['number'] == 'B-101'
+    assert payload['invitations'] == []
+    assert payload['summary']['totals']['balance'] == 180.0
+    assert [invoice['description'] for invoice in payload['invoices']['items']] == ['Cuota 3', 'Cuota 2']
+    assert payload['invoices']['pagination']['has_more'] is True
+    assert len(payload['payments']['items']) == 2
+    assert payload['payments']['filters']['methods']
+    assert payload['sync']['token']
+
+    next_page = client.get(
+        f"/api/resident/invoices?limit=2&cursor={payload['invoices']['pagination']['next_cursor']}"
+    ).get_json()
+    assert [invoice['description'] for invoice in next_page['invoices']] == ['Cuota 1']
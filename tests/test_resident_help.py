@@ -0,0 +1,114 @@
+"""
+Tests para el cache de contexto y respuestas del asistente de residentes
+"""
+
+import threading
+import time
+
+import pytest
+
+import apartments
+import db
+import residents
+import user_model
+from services import resident_help
+
+
+def _create_help_resident(app, number: str, username: str) -> tuple[int, int]:
+    with app.app_context():
+        conn = db.get_conn()
+        try:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM resident_user_units")
+            cur.execute("DELETE FROM payments")
+            cur.execute("DELETE FROM invoices")
+            cur.execute("DELETE FROM apartments")
+            cur.execute("DELETE FROM users WHERE username != 'admin'")
+            conn.commit()
+        finally:
+            conn.close()
+        unit_id = apartments.add_apartment(number=number, resident_name='Help Resident', resident_email='')
+        user_id = user_model.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='password123',
+            full_name='Help Resident',
+            role='resident',
+        )
+        residents.link_user_to_apartment(user_id, unit_id, resident_email=f'{username}@example.com', created_by=1)
+    return unit_id, user_id
+
+
+def _login(client, user_id: int):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+@pytest.mark.integration
+def test_help_context_is_built_once_per_data_version(client, app, monkeypatch):
+    unit_id, user_id = _create_help_resident(app, 'H-101', 'help_context_resident')
+    _login(client, user_id)
+
+    builds = []
+    original_build = resident_help._build_common_context
+
+    def counting_build():
+        builds.append(1)
+        return original_build()
+
+    monkeypatch.setattr(resident_help, '_build_common_context', counting_build)
+
+    assert client.get('/dashboard/ayuda').status_code == 200
+    assert client.get('/dashboard/ayuda').status_code == 200
+    assert len(builds) == 1
+
+    conn = db.get_conn()
+    try:
+        conn.execute(
+            "INSERT INTO invoices (unit_id, description, amount, issued_date, due_date, paid) VALUES (?, ?, ?, ?, ?, ?)",
+            (unit_id, 'Cuota nueva', 75.0, '2026-09-01', '2026-09-15', 0),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    response = client.get('/dashboard/ayuda')
+    assert response.status_code == 200
+    assert len(builds) == 2
+
+
+@pytest.mark.integration
+def test_slow_ai_answer_falls_back_and_is_served_from_cache(client, app, monkeypatch):
+    _, user_id = _create_help_resident(app, 'H-202', 'help_ai_resident')
+    _login(client, user_id)
+
+    release = threading.Event()
+    calls = []
+
+    def slow_generate(**kwargs):
+        calls.append(kwargs['question'])
+        release.wait(5)
+        return 'Tu saldo esta al dia, segun la IA.'
+
+    monkeypatch.setattr(resident_help, '_generate_ai_text', slow_generate)
+    monkeypatch.setitem(app.config, 'RESIDENT_AI_CHAT_ENABLED', True)
+    monkeypatch.setitem(app.config, 'RESIDENT_AI_API_KEY', 'test-key')
+    monkeypatch.setitem(app.config, 'RESIDENT_AI_WAIT_SECONDS', 0.2)
+
+    first = client.post('/dashboard/ayuda/api', json={'question': 'Cual es mi saldo actual?'})
+    assert first.status_code == 200
+    pending_answer = first.get_json()['answer']
+    assert pending_answer['source'] == 'rules'
+    assert 'segundo' in pending_answer['detail']
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while resident_help._ai_pending and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    second = client.post('/dashboard/ayuda/api', json={'question': '  cual es mi SALDO actual  '})
+    answer = second.get_json()['answer']
+    assert answer['source'] == 'ai'
+    assert answer['content'] == 'Tu saldo esta al dia, segun la IA.'
+    assert calls == ['Cual es mi saldo actual?']
@@ -0,0 +1,89 @@
+"""
+Tests para el lease del scheduler entre procesos
+"""
+
+import pytest
+
+import db
+import scheduler_lease
+
+
+@pytest.fixture
+def empty_lease(monkeypatch):
+    conn = db.get_conn()
+    try:
+        conn.execute("DELETE FROM scheduler_leases")
+        conn.commit()
+    finally:
+        conn.close()
+    monkeypatch.setattr(scheduler_lease, '_mode', 'lease')
+    monkeypatch.setattr(scheduler_lease, '_expires_at', 0.0)
+    yield
+    conn = db.get_conn()
+    try:
+        conn.execute("DELETE FROM scheduler_leases")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_lease_has_one_holder_and_fails_over_after_expiry(app, empty_lease):
+    assert scheduler_lease.try_acquire('worker-a', 60, now=1000.0) == 1060.0
+    assert scheduler_lease.try_acquire('worker-b', 60, now=1010.0) is None
+
+    # El dueño renueva sin perder la fecha en que lo tomó
+    assert scheduler_lease.try_acquire('worker-a', 60, now=1030.0) == 1090.0
+    lease = scheduler_lease.get_lease()
+    assert lease['holder'] == 'worker-a'
+    assert lease['acquired_at'] == 1000.0
+    assert lease['heartbeat_at'] == 1030.0
+
+    # worker-a deja de latir: al vencer, worker-b lo toma
+    assert scheduler_lease.try_acquire('worker-b', 60, now=1089.0) is None
+    assert scheduler_lease.try_acquire('worker-b', 60, now=1090.0) == 1150.0
+    assert scheduler_lease.get_lease()['holder'] == 'worker-b'
+    assert scheduler_lease.try_acquire('worker-a', 60, now=1100.0) is None
+
+    assert scheduler_lease.release_lease('worker-a') is False
+    assert scheduler_lease.release_lease('worker-b') is True
+    assert scheduler_lease.try_acquire('worker-a', 60, now=1101.0) == 1161.0
+
+
+def test_leader_only_jobs_run_in_the_process_holding_the_lease(app, empty_lease):
+    runs = []
+
+    @scheduler_lease.leader_only('test_job')
+    def job():
+        runs.append(1)
+        return 'done'
+
+    assert scheduler_lease.try_acquire('other-worker', 60) is not None
+    assert scheduler_lease.heartbeat() is False
+    assert job() is None
+    assert runs == []
+
+    conn = db.get_conn()
+    try:
+        conn.execute("UPDATE scheduler_leases SET expires_at = 0")
+        conn.commit()
+    finally:
+        conn.close()
+
+    assert scheduler_lease.heartbeat() is True
+    assert scheduler_lease.get_lease()['holder'] == scheduler_lease.holder_id()
+    assert job() == 'done'
+    assert runs == [1]
+
+    scheduler_lease.release()
+    assert scheduler_lease.get_lease() is None
+    assert job() is None
+
+
+def test_scheduler_mode_is_validated(monkeypatch):
+    monkeypatch.setattr(scheduler_lease, '_mode', 'lease')
+    monkeypatch.setattr(scheduler_lease, '_ttl', scheduler_lease.DEFAULT_TTL_SECONDS)
+    with pytest.raises(ValueError):
+        scheduler_lease.configure('everywhere')
+
+    scheduler_lease.configure('always', 30)
+    assert scheduler_lease.is_leader() is True
@@ -0,0 +1,94 @@
+"""
+Tests para el cache de bytecode de Jinja y los fragmentos por versión de datos
+"""
+
+import pytest
+from flask import Flask
+from flask_caching import make_template_fragment_key
+from jinja2 import DictLoader, FileSystemBytecodeCache
+
+import db
+from extensions import cache
+from utils import cache_versions
+from utils.http_cache import data_stamp
+from utils.template_cache import init_template_cache
+
+
+@pytest.fixture
+def invoice_id(app):
+    conn = db.get_conn()
+    cur = conn.execute(
+        "INSERT INTO invoices (description, amount, issued_date, due_date) "
+        "VALUES ('Fragmento original', 150, '2026-01-05', '2026-01-20')"
+    )
+    conn.commit()
+    new_id = cur.lastrowid
+    conn.close()
+    yield new_id
+    conn = db.get_conn()
+    conn.execute("DELETE FROM invoices WHERE id = ?", (new_id,))
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.unit
+def test_bytecode_cache_persists_compiled_templates(tmp_path):
+    app = Flask(__name__)
+    app.config['JINJA_BYTECODE_CACHE_DIR'] = str(tmp_path)
+    app.jinja_loader = DictLoader({'hola.html': 'Hola {{ nombre }}'})
+    init_template_cache(app)
+
+    assert isinstance(app.jinja_env.bytecode_cache, FileSystemBytecodeCache)
+    with app.app_context():
+        assert app.jinja_env.get_template('hola.html').render(nombre='Toscana') == 'Hola Toscana'
+    assert any(tmp_path.iterdir())
+
+
+@pytest.mark.integration
+def test_sidebar_fragment_is_reused_and_invoice_rows_follow_the_ledger(app, auth_client, invoice_id):
+    cache.clear()
+    first = auth_client.get('/ventas/facturas')
+    assert b'Fragmento original' in first.data
+
+    with app.test_request_context():
+        stamp = data_stamp(('customization',))
+    assert cache.get(make_template_fragment_key('sidebar_menu', vary_on=['billing.invoices', stamp])) is not None
+
+    conn = db.get_conn()
+    conn.execute("UPDATE invoices SET description = 'Fragmento editado' WHERE id = ?", (invoice_id,))
+    conn.commit()
+    conn.close()
+
+    second = auth_client.get('/ventas/facturas')
+    assert b'Fragmento editado' in second.data
+    assert b'Fragmento original' not in second.data
+
+
+@pytest.mark.integration
+def test_fragments_are_not_stored_without_data_versions(auth_client, monkeypatch):
+    cache.clear()
+    stored = []
+    original_set = cache.set
+
+    def recording_set(key, *args, **kwargs):
+        stored.append(key)
+        return original_set(key, *args, **kwargs)
+
+    monkeypatch.setattr(cache_versions, 'get_versions', lambda: None)
+    monkeypatch.setattr(cache, 'set', recording_set)
+
+    response = auth_client.get('/ventas/facturas')
+
+    assert response.status_code == 200
+    assert 'submenu-item active" href="/ventas/facturas"' in response.data.decode('utf-8')
+    assert not [key for key in stored if key.startswith('_template_fragment_cache_')]
+
+
+@pytest.mark.integration
+def test_sidebar_fragment_keeps_the_active_item_per_endpoint(auth_client):
+    invoices_page = auth_client.get('/ventas/facturas').data.decode('utf-8')
+    payments_page = auth_client.get('/ventas/pagos').data.decode('utf-8')
+
+    assert 'submenu-item active" href="/ventas/facturas"' in invoices_page
+    assert 'submenu-item active" href="/ventas/pagos"' in payments_page
+    assert 'submenu-item active" href="/ventas/facturas"' not in payments_page
@@ -0,0 +1,57 @@
+"""
+Tests para el cache en memoria del user loader
+"""
+
+import pytest
+
+import db
+import resident_auth
+import user_model
+
+
+@pytest.fixture
+def resident_user(app):
+    user_id = user_model.create_user(
+        username='cached_resident',
+        email='cached_resident@example.com',
+        password='password123',
+        full_name='Cached Resident',
+        role='resident',
+    )
+    yield user_model.get_user_by_id(user_id)
+    user_model.invalidate_user_cache(user_id)
+    conn = db.get_conn()
+    conn.execute("DELETE FROM resident_api_refresh_tokens WHERE user_id = ?", (user_id,))
+    conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.integration
+def test_authenticated_requests_reuse_the_cached_user(auth_client, monkeypatch):
+    auth_client.get('/ventas/facturas')
+
+    lookups = []
+    real_get_user_by_id = user_model.get_user_by_id
+    monkeypatch.setattr(
+        user_model, 'get_user_by_id',
+        lambda user_id: lookups.append(user_id) or real_get_user_by_id(user_id),
+    )
+    first = auth_client.get('/ventas/facturas')
+    second = auth_client.get('/ventas/facturas')
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert lookups == []
+
+
+@pytest.mark.integration
+def test_deactivating_a_user_drops_the_cached_copy(client, resident_user):
+    token = resident_auth.issue_token_pair(resident_user)['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    assert client.get('/api/resident/profile', headers=headers).status_code == 200
+
+    user_model.deactivate_user(resident_user.id)
+
+    assert client.get('/api/resident/profile', headers=headers).status_code == 401
@@ -5,11 +5,22 @@ Maneja usuarios, roles y autenticación del sistema
 Refactorizado para usar SQLAlchemy (ORM).
 """
 
+import threading
+import time
 from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from flask import current_app, has_app_context
 from flask_login import AnonymousUserMixin
+from sqlalchemy.orm import make_transient_to_detached
 from extensions import db
 from data_models.models import User
 
+DEFAULT_USER_CACHE_TTL_SECONDS = 30
+
+_user_cache: Dict[int, Tuple[float, Dict]] = {}
+_user_cache_lock = threading.Lock()
+
 class AnonymousUser(AnonymousUserMixin):
     """Usuario anónimo para Flask-Login.
 
@@ -39,6 +50,45 @@ def get_user_by_id(user_id):
     """Obtiene un usuario por ID"""
     return db.session.get(User, user_id)
 
+def _user_cache_ttl() -> float:
+    if not has_app_context():
+        return 0
+    return float(current_app.config.get('USER_CACHE_TTL_SECONDS', DEFAULT_USER_CACHE_TTL_SECONDS))
+
+def get_cached_user(user_id) -> Optional[User]:
+    """
+    Obtiene un usuario por ID sin consultar la BD si hay una copia reciente.
+
+    Se guarda una instantánea de las columnas durante ``USER_CACHE_TTL_SECONDS``
+    y se reconstruye la instancia en la sesión con ``merge(load=False)``, que no
+    emite SQL. Las funciones de este módulo que modifican usuarios invalidan la
+    entrada; en otros procesos la copia vence con el TTL.
+    """
+    ttl = _user_cache_ttl()
+    if ttl <= 0:
+        return get_user_by_id(user_id)
+
+    entry = _user_cache.get(user_id)
+    if entry is not None and entry[0] > time.monotonic():
+        user = User(**entry[1])
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = get_user_by_id(user_id)
+    if user is not None:
+        snapshot = {column.key: getattr(user, column.key) for column in User.__table__.columns}
+        with _user_cache_lock:
+            _user_cache[user_id] = (time.monotonic() + ttl, snapshot)
+    return user
+
+def invalidate_user_cache(user_id=None) -> None:
+    """Descarta la copia en memoria de un usuario (o de todos)."""
+    with _user_cache_lock:
+        if user_id is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop(user_id, None)
+
 def get_user_by_username(username):
     """Obtiene un usuario por nombre de usuario"""
     return User.query.filter_by(username=username).first()
@@ -93,6 +143,7 @@ def update_last_login(user_id):
     if user:
         user.last_login = datetime.now(timezone.utc)
         db.session.commit()
+        invalidate_user_cache(user_id)
 
 def update_password(user_id, new_password):
     """Actualiza la contraseña de un usuario"""
@@ -100,6 +151,7 @@ def update_password(user_id, new_password):
     if user:
         user.set_password(new_password)
         db.session.commit()
+        invalidate_user_cache(user_id)
 
 def list_users():
     """Lista todos los usuarios (Retorna diccionarios para compatibilidad retroactiva)"""
@@ -121,6 +173,7 @@ def deactivate_user(user_id):
     if user:
         user.is_active = False
         db.session.commit()
+        invalidate_user_cache(user_id)
 
 def activate_user(user_id):
     """Activa un usuario desactivado"""
@@ -128,3 +181,4 @@ def activate_user(user_id):
     if user:
         user.is_active = True
         db.session.commit()
+        invalidate_user_cache(user_id)
@@ -9,6 +9,7 @@ from .permissions import (
     get_all_permissions,
     get_permissions_by_module,
     get_user_permissions,
+    get_user_permission_set,
     user_has_permission,
     check_permission,
     grant_permission,
@@ -27,6 +28,7 @@ __all__ = [
     'get_all_permissions',
     'get_permissions_by_module',
     'get_user_permissions',
+    'get_user_permission_set',
     'user_has_permission',
     'check_permission',
     'grant_permission',
@@ -0,0 +1,242 @@
+"""
+Async Logging
+=============
+Logs de archivo (``run.log``, ``notifications.log``, ``audit.log``) escritos
+desde una cola.
+
+El código del request solo encola el registro (``QueueHandler``); un
+``QueueListener`` por proceso lo escribe en segundo plano como una línea JSON
+(``ts``, ``level``, ``logger``, ``pid``, ``message`` y los campos de
+``extra={'fields': {...}}``). El listener se arranca en el primer registro de
+cada proceso, así que también funciona en workers de gunicorn creados con fork.
+
+Varios procesos escriben el mismo archivo: cada línea se escribe completa en
+modo append bajo un ``flock`` del archivo ``<log>.lock``, que también protege
+la rotación. Un proceso que encuentra el archivo rotado por otro lo reabre
+antes de escribir. Rotación por tamaño (``LOG_MAX_BYTES``, ``LOG_BACKUP_COUNT``)
+y opcionalmente por tiempo (``LOG_ROTATE_INTERVAL_HOURS``, 0 = desactivada).
+Sin ``fcntl`` (Windows) no hay bloqueo entre procesos.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RUN_LOG_PATH = BASE_DIR / 'run.log'
+NOTIFICATIONS_LOG_PATH = BASE_DIR / 'notifications.log'
+AUDIT_LOG_PATH = BASE_DIR / 'audit.log'
+
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', '10'))
+LOG_ROTATE_INTERVAL_HOURS = float(os.environ.get('LOG_ROTATE_INTERVAL_HOURS', '0'))
+
+_state_lock = threading.Lock()
+_queue: Optional[queue.SimpleQueue] = None
+_listener: Optional[QueueListener] = None
+_listener_pid: Optional[int] = None
+_router: Optional['_FileRouter'] = None
+_TRACE_FORMATTER = logging.Formatter()
+
+
+# ========== FORMATO ==========
+
+class JsonLineFormatter(logging.Formatter):
+    """Una línea JSON por registro."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if isinstance(fields, dict):
+            for key, value in fields.items():
+                payload.setdefault(key, value)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+# ========== ESCRITURA ENTRE PROCESOS ==========
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """``RotatingFileHandler`` seguro con varios procesos sobre el mismo archivo."""
+
+    def __init__(self, filename, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT,
+                 interval_seconds: float = LOG_ROTATE_INTERVAL_HOURS * 3600):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.interval_seconds = interval_seconds
+        self._lock_file = None
+
+    @contextmanager
+    def _interprocess_lock(self):
+        if fcntl is None:
+            yield
+            return
+        if self._lock_file is None:
+            self._lock_file = open(self.baseFilename + '.lock', 'a')
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _reopen_if_rotated(self) -> None:
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename)
+            rotated = current.st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self.stream.close()
+            self.stream = None
+
+    def shouldRollover(self, record) -> bool:
+        # Tamaño y fecha del archivo en disco: otros procesos también escriben
+        try:
+            stat = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return False
+        if not stat.st_size:
+            return False
+        if self.maxBytes > 0 and stat.st_size >= self.maxBytes:
+            return True
+        if self.interval_seconds > 0:
+            return int(stat.st_mtime // self.interval_seconds) != int(time.time() // self.interval_seconds)
+        return False
+
+    def emit(self, record) -> None:
+        try:
+            with self._interprocess_lock():
+                self._reopen_if_rotated()
+                if self.shouldRollover(record):
+                    self.doRollover()
+                logging.FileHandler.emit(self, record)
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        super().close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class _FileRouter(logging.Handler):
+    """Handler del listener: envía cada registro al archivo de su logger."""
+
+    def __init__(self):
+        super().__init__()
+        self._handlers: Dict[str, SharedRotatingFileHandler] = {}
+
+    def handle(self, record) -> bool:
+        path = getattr(record, 'log_path', None)
+        if not path:
+            return False
+        handler = self._handlers.get(path)
+        if handler is None:
+            handler = SharedRotatingFileHandler(path)
+            handler.setFormatter(JsonLineFormatter())
+            self._handlers[path] = handler
+        handler.handle(record)
+        return True
+
+    def emit(self, record) -> None:
+        self.handle(record)
+
+    def close(self) -> None:
+        for handler in self._handlers.values():
+            handler.close()
+        self._handlers.clear()
+        super().close()
+
+
+# ========== COLA POR PROCESO ==========
+
+def _ensure_listener() -> queue.SimpleQueue:
+    global _queue, _listener, _listener_pid, _router
+    pid = os.getpid()
+    if _listener_pid == pid and _queue is not None:
+        return _queue
+    with _state_lock:
+        if _listener_pid != pid or _queue is None:
+            # Tras un fork el hilo del listener del padre no existe en el hijo
+            _queue = queue.SimpleQueue()
+            _router = _FileRouter()
+            _listener = QueueListener(_queue, _router)
+            _listener.start()
+            _listener_pid = pid
+        return _queue
+
+
+class _FileQueueHandler(QueueHandler):
+    """Encola el registro marcado con su archivo de destino."""
+
+    def __init__(self, path: Path):
+        super().__init__(None)
+        self.log_path = str(path)
+
+    def prepare(self, record):
+        # Como QueueHandler.prepare, pero la traza queda aparte (campo ``exc``)
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = _TRACE_FORMATTER.formatException(record.exc_info)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        record.log_path = self.log_path
+        return record
+
+    def enqueue(self, record) -> None:
+        _ensure_listener().put_nowait(record)
+
+
+def get_file_logger(name: str, path: Path, level: int = logging.INFO) -> logging.Logger:
+    """Logger ``name`` que escribe en ``path`` a través de la cola del proceso."""
+    logger = logging.getLogger(name)
+    with _state_lock:
+        if not any(isinstance(h, _FileQueueHandler) for h in logger.handlers):
+            logger.addHandler(_FileQueueHandler(path))
+            logger.setLevel(level)
+            logger.propagate = False
+    return logger
+
+
+def flush() -> None:
+    """Escribe todo lo encolado y detiene el listener (se reinicia en el siguiente registro)."""
+    global _queue, _listener, _listener_pid, _router
+    with _state_lock:
+        listener, router = _listener, _router
+        if listener is None or _listener_pid != os.getpid():
+            return
+        _queue = _listener = _listener_pid = _router = None
+    listener.stop()
+    router.close()
+
+
+atexit.register(flush)
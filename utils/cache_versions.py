@@ -0,0 +1,182 @@
+"""
+Cache Versions
+==============
+Memoización por request y por proceso de consultas casi estáticas (datos de la
+empresa, personalización, permisos) con invalidación por versión.
+
+La tabla ``cache_versions`` (migración 017) guarda un contador por espacio de
+nombres que los triggers incrementan en cada escritura. Cada request lee todas
+las versiones una sola vez; un valor en memoria del proceso se reutiliza solo
+si fue calculado con la versión vigente, así que una escritura en otro worker
+lo invalida en el siguiente request.
+
+Si la tabla no existe (migración sin aplicar) la memoización queda limitada al
+request actual.
+"""
+
+import sqlite3
+import threading
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+from flask import g, has_app_context, has_request_context, request
+
+import db
+
+COMPANY_INFO = 'company_info'
+CUSTOMIZATION = 'customization'
+PERMISSIONS = 'permissions'
+# Migración 018: datos que muestran las listas y la API de residentes.
+LEDGER = 'ledger'
+UNITS = 'units'
+CATALOG = 'catalog'
+USERS = 'users'
+
+MAX_ENTRIES_PER_NAMESPACE = 1024
+
+_process_memo: Dict[str, Dict[tuple, tuple]] = {}
+_process_lock = threading.Lock()
+
+
+# ==========================================
+# ALCANCE DEL REQUEST
+# ==========================================
+
+def _scope() -> Optional[Dict]:
+    """
+    Estado del request (o del app context fuera de un request).
+
+    Se guarda en ``request.environ`` y no en ``g`` porque un app context puede
+    abarcar varios requests (por ejemplo, en los tests).
+    """
+    if has_request_context():
+        return request.environ.setdefault('app.cache_versions', {})
+    if has_app_context():
+        if '_cache_versions_scope' not in g:
+            g._cache_versions_scope = {}
+        return g._cache_versions_scope
+    return None
+
+
+def _load_snapshot() -> Optional[Dict[str, tuple]]:
+    try:
+        with db.get_db() as conn:
+            rows = conn.execute("SELECT namespace, version, updated_at FROM cache_versions").fetchall()
+    except sqlite3.OperationalError:
+        return None
+    return {row['namespace']: (row['version'], row['updated_at']) for row in rows}
+
+
+def _snapshot() -> Optional[Dict[str, tuple]]:
+    scope = _scope()
+    if scope is None:
+        return _load_snapshot()
+    if 'versions' not in scope:
+        scope['versions'] = _load_snapshot()
+    return scope['versions']
+
+
+def get_versions() -> Optional[Dict[str, int]]:
+    """Versiones vigentes, leídas una vez por request. ``None`` sin la tabla."""
+    snapshot = _snapshot()
+    if snapshot is None:
+        return None
+    return {namespace: entry[0] for namespace, entry in snapshot.items()}
+
+
+def get_updated_at(*namespaces: str) -> Optional[str]:
+    """Última escritura (UTC, formato SQLite) entre los espacios indicados."""
+    snapshot = _snapshot()
+    if not snapshot:
+        return None
+    stamps = [snapshot[ns][1] for ns in (namespaces or snapshot) if ns in snapshot and snapshot[ns][1]]
+    return max(stamps) if stamps else None
+
+
+def get_version(namespace: str) -> Optional[int]:
+    snapshot = _snapshot()
+    if snapshot is None:
+        return None
+    return snapshot.get(namespace, (0, None))[0]
+
+
+def invalidate(*namespaces: str) -> None:
+    """
+    Descarta lo memoizado en el request actual para los espacios indicados.
+
+    Debe llamarse después de escribir: los triggers ya incrementaron la versión en
+    la BD y esto obliga a releerla, de modo que el propio request vea el cambio.
+    """
+    scope = _scope()
+    if scope is not None:
+        scope.pop('versions', None)
+        memo = scope.get('memo', {})
+        for namespace in namespaces:
+            memo.pop(namespace, None)
+    if _snapshot() is None:
+        # Sin versiones compartidas solo se puede limpiar la memoria de este proceso.
+        with _process_lock:
+            for namespace in namespaces:
+                _process_memo.pop(namespace, None)
+
+
+def clear_process_cache() -> None:
+    with _process_lock:
+        _process_memo.clear()
+
+
+# ==========================================
+# DECORADOR
+# ==========================================
+
+def _copy(value):
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def memoized(namespace: str) -> Callable:
+    """
+    Memoiza una función por argumentos dentro del espacio ``namespace``.
+
+    Devuelve copias superficiales de dicts y listas para que los llamadores
+    puedan modificarlos sin alterar el valor compartido.
+    """
+    def decorator(func: Callable) -> Callable:
+        func_key = f'{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func_key, args, tuple(sorted(kwargs.items())))
+            scope = _scope()
+            request_memo = None
+            if scope is not None:
+                request_memo = scope.setdefault('memo', {}).setdefault(namespace, {})
+                if key in request_memo:
+                    return _copy(request_memo[key])
+
+            version = get_version(namespace)
+            if version is not None:
+                cached = _process_memo.get(namespace, {}).get(key)
+                if cached is not None and cached[0] == version:
+                    value = cached[1]
+                    if request_memo is not None:
+                        request_memo[key] = value
+                    return _copy(value)
+
+            value = func(*args, **kwargs)
+            if request_memo is not None:
+                request_memo[key] = value
+            if version is not None:
+                with _process_lock:
+                    entries = _process_memo.setdefault(namespace, {})
+                    if len(entries) >= MAX_ENTRIES_PER_NAMESPACE:
+                        entries.clear()
+                    entries[key] = (version, value)
+            return _copy(value)
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
@@ -0,0 +1,123 @@
+"""
+Compression
+===========
+Compresión gzip/brotli de respuestas dinámicas (HTML, JSON, CSV...).
+
+- Solo se comprime si el cliente lo acepta, el tipo es textual y el cuerpo
+  supera ``COMPRESS_MIN_SIZE`` bytes.
+- Las respuestas en streaming se comprimen por fragmentos, vaciando el
+  compresor en cada uno para que el cliente reciba los datos sin esperar al
+  final.
+- Los archivos estáticos (``direct_passthrough``) no pasan por aquí: se sirven
+  precomprimidos desde ``static/dist`` (ver ``utils.static_assets``).
+
+Brotli es opcional: sin el paquete ``brotli`` se usa solo gzip.
+"""
+
+import gzip
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Flask, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/csv',
+    'text/javascript',
+    'text/xml',
+    'application/json',
+    'application/javascript',
+    'application/manifest+json',
+    'application/xml',
+    'image/svg+xml',
+}
+
+
+def choose_encoding(accept_encoding, allow_brotli: bool = True) -> Optional[str]:
+    """Codificación preferida entre las que acepta el cliente (``br`` > ``gzip``)."""
+    if allow_brotli and brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _encoded(chunks: Iterable) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+def _stream_chunks(chunks: Iterable, encoding: str, level: int) -> Iterator[bytes]:
+    chunks = _encoded(chunks)
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(level, 11))
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: formato gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _should_compress(app: Flask, response) -> bool:
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return False
+    if request.method == 'HEAD' or response.direct_passthrough:
+        return False
+    if response.status_code < 200 or response.status_code >= 300 or response.status_code in (204, 206):
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    if response.is_streamed:
+        return True
+    return (response.content_length or 0) >= int(app.config.get('COMPRESS_MIN_SIZE', 500))
+
+
+def init_compression(app: Flask) -> None:
+    """
+    Registra la compresión de respuestas.
+
+    Debe llamarse antes que los demás ``after_request`` para que corra al final
+    (Flask los ejecuta en orden inverso) y vea el cuerpo definitivo.
+    """
+
+    @app.after_request
+    def _compress_response(response):
+        response.vary.add('Accept-Encoding')
+        if not _should_compress(app, response):
+            return response
+
+        encoding = choose_encoding(request.accept_encodings, app.config.get('COMPRESS_BROTLI', True))
+        if encoding is None:
+            return response
+
+        level = int(app.config.get('COMPRESS_LEVEL', 6))
+        if response.is_streamed:
+            response.response = _stream_chunks(response.response, encoding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(compress_bytes(response.get_data(), encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        return response
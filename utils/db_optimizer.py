@@ -272,7 +272,7 @@ def get_index_stats():
         conn.close()
 
 
-def explain_query(query, params=None):
+def explain_query(query, params=None, verbose=True):
     """
     Muestra el plan de ejecución de un query.
     Útil para debug de performance.
@@ -282,6 +282,7 @@ def explain_query(query, params=None):
     Args:
         query: SQL query a analizar (solo SELECT permitido)
         params: Parámetros del query
+        verbose: Imprime el plan en consola
     
     Returns:
         list: Plan de ejecución
@@ -311,9 +312,10 @@ def explain_query(query, params=None):
         
         plan = cur.fetchall()
         
-        print("\n[QUERY PLAN]")
-        for row in plan:
-            print(f"  {row}")
+        if verbose:
+            print("\n[QUERY PLAN]")
+            for row in plan:
+                print(f"  {row}")
         
         return plan
     except ValueError:
@@ -6,19 +6,25 @@ Decoradores personalizados para control de acceso
 from functools import wraps
 from flask import abort, flash, redirect, url_for, request, jsonify
 from flask_login import current_user
-import logging
+import audit_trail
+from utils.async_logging import AUDIT_LOG_PATH, get_file_logger
 from utils.permissions import check_permission
 
-# Configurar logger
-audit_logger = logging.getLogger('audit')
-audit_logger.setLevel(logging.INFO)
+# Logger de auditoría: líneas JSON en audit.log escritas desde la cola del proceso
+# y, por lotes, la tabla audit_events (audit_trail.py)
+audit_logger = get_file_logger('audit', AUDIT_LOG_PATH)
+if not any(isinstance(h, audit_trail.AuditTrailHandler) for h in audit_logger.handlers):
+    audit_logger.addHandler(audit_trail.AuditTrailHandler())
 
-# Handler para archivo de auditoría
-audit_handler = logging.FileHandler('audit.log')
-audit_handler.setLevel(logging.INFO)
-audit_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-audit_handler.setFormatter(audit_formatter)
-audit_logger.addHandler(audit_handler)
+
+def _entity_from_params(params: dict, entity=None):
+    """(entidad, id) desde los parámetros de la ruta: ``payment_id=7`` -> ('payment', 7)."""
+    for key, value in params.items():
+        if key == 'id':
+            return entity or request.blueprint, value
+        if key.endswith('_id'):
+            return entity or key[:-3], value
+    return entity, None
 
 
 def role_required(*roles):
@@ -53,7 +59,15 @@ def role_required(*roles):
                 audit_logger.warning(
                     f"ACCESO DENEGADO - Usuario: {current_user.username} "
                     f"(Rol: {current_user.role}) - Intentó acceder: {request.endpoint} "
-                    f"- Roles requeridos: {roles}"
+                    f"- Roles requeridos: {roles}",
+                    extra={'fields': {
+                        'action': 'ACCESS_DENIED',
+                        'user_id': current_user.id,
+                        'user': current_user.username,
+                        'role': current_user.role,
+                        'endpoint': request.endpoint,
+                        'ip': request.remote_addr,
+                    }},
                 )
                 
                 # Para solicitudes AJAX, devolver JSON
@@ -92,7 +106,15 @@ def admin_required(f):
         if not current_user.is_admin():
             audit_logger.warning(
                 f"ACCESO DENEGADO - Usuario: {current_user.username} "
-                f"(Rol: {current_user.role}) - Intentó acceder a área de admin: {request.endpoint}"
+                f"(Rol: {current_user.role}) - Intentó acceder a área de admin: {request.endpoint}",
+                extra={'fields': {
+                    'action': 'ACCESS_DENIED',
+                    'user_id': current_user.id,
+                    'user': current_user.username,
+                    'role': current_user.role,
+                    'endpoint': request.endpoint,
+                    'ip': request.remote_addr,
+                }},
             )
             
             # Para solicitudes AJAX, devolver JSON
@@ -155,7 +177,16 @@ def permission_required(permission_name):
                 audit_logger.warning(
                     f"PERMISO DENEGADO - Usuario: {current_user.username} "
                     f"(Rol: {current_user.role}) - Permiso: {permission_name} "
-                    f"- Endpoint: {request.endpoint}"
+                    f"- Endpoint: {request.endpoint}",
+                    extra={'fields': {
+                        'action': 'PERMISSION_DENIED',
+                        'user_id': current_user.id,
+                        'user': current_user.username,
+                        'role': current_user.role,
+                        'permission': permission_name,
+                        'endpoint': request.endpoint,
+                        'ip': request.remote_addr,
+                    }},
                 )
                 
                 # Para solicitudes AJAX, devolver JSON
@@ -173,7 +204,7 @@ def permission_required(permission_name):
     return decorator
 
 
-def audit_log(action_type, description=None):
+def audit_log(action_type, description=None, entity=None):
     """
     Decorador para registrar acciones en el log de auditoría
     
@@ -188,6 +219,8 @@ def audit_log(action_type, description=None):
     Args:
         action_type: Tipo de acción (CREATE, UPDATE, DELETE, VIEW, LOGIN, LOGOUT, etc.)
         description: Descripción opcional de la acción
+        entity: Entidad afectada; por defecto se deduce del parámetro ``*_id`` de
+            la ruta (o del blueprint si el parámetro es ``id``)
     """
     def decorator(f):
         @wraps(f)
@@ -211,7 +244,18 @@ def audit_log(action_type, description=None):
             client_ip = request.remote_addr
             log_msg += f" - IP: {client_ip}"
             
-            audit_logger.info(log_msg)
+            entity_name, entity_id = _entity_from_params(kwargs, entity)
+            audit_logger.info(log_msg, extra={'fields': {
+                'action': action_type,
+                'user_id': current_user.id if current_user.is_authenticated else None,
+                'user': current_user.username if current_user.is_authenticated else None,
+                'entity': entity_name,
+                'entity_id': entity_id,
+                'endpoint': endpoint_info,
+                'description': description,
+                'params': kwargs or None,
+                'ip': client_ip,
+            }})
             
             return result
         return decorated_function
@@ -235,5 +279,12 @@ def log_action(action_type, message):
     client_ip = request.remote_addr if request else "N/A"
     
     audit_logger.info(
-        f"{action_type} - Usuario: {user_info} - {message} - IP: {client_ip}"
+        f"{action_type} - Usuario: {user_info} - {message} - IP: {client_ip}",
+        extra={'fields': {
+            'action': action_type,
+            'user_id': current_user.id if current_user.is_authenticated else None,
+            'user': current_user.username if current_user.is_authenticated else None,
+            'description': message,
+            'ip': client_ip,
+        }},
     )
@@ -0,0 +1,191 @@
+"""
+HTTP Cache
+==========
+GET condicional (ETag / Last-Modified) para las listas pesadas y la API JSON
+de residentes.
+
+El ETag se calcula sin tocar las consultas de la vista: combina las versiones
+de ``cache_versions`` (una sola lectura por request), la fecha del día (los
+estados "vencida" dependen de ella), la identidad del usuario y la versión de
+la aplicación. Si el cliente envía un ETag vigente (``If-None-Match``) o una
+fecha posterior a la última escritura (``If-Modified-Since``) se responde 304
+sin ejecutar la vista.
+
+Las respuestas llevan ``Cache-Control: private, no-cache``: el navegador (y el
+service worker, que delega en su cache HTTP) las guarda pero revalida siempre.
+"""
+
+import hashlib
+import os
+from datetime import date, datetime, timezone
+from functools import wraps
+from typing import Callable, Iterable, Optional
+from urllib.parse import urlencode
+
+from flask import current_app, g, request, session
+from flask_login import current_user
+
+from utils import cache_versions
+
+# Espacios por defecto: todo lo que puede aparecer en una página (datos,
+# encabezado, menú según permisos).
+PAGE_NAMESPACES = (
+    cache_versions.LEDGER,
+    cache_versions.UNITS,
+    cache_versions.CATALOG,
+    cache_versions.USERS,
+    cache_versions.PERMISSIONS,
+    cache_versions.COMPANY_INFO,
+    cache_versions.CUSTOMIZATION,
+)
+RESIDENT_API_NAMESPACES = (
+    cache_versions.LEDGER,
+    cache_versions.UNITS,
+    cache_versions.USERS,
+)
+
+_build_id: Optional[str] = None
+
+
+def _app_build_id() -> str:
+    """Identifica la versión desplegada (plantillas y código) para el ETag."""
+    global _build_id
+    configured = current_app.config.get('HTTP_CACHE_BUILD_ID')
+    if configured:
+        return str(configured)
+    if _build_id is None:
+        latest = 0.0
+        roots = [current_app.template_folder, 'blueprints', '.']
+        for root in roots:
+            folder = os.path.join(current_app.root_path, root or '')
+            recursive = root == current_app.template_folder
+            for dirpath, dirnames, filenames in os.walk(folder):
+                for filename in filenames:
+                    if filename.endswith(('.py', '.html')):
+                        latest = max(latest, os.path.getmtime(os.path.join(dirpath, filename)))
+                if not recursive:
+                    break
+        _build_id = str(int(latest))
+    return _build_id
+
+
+def data_stamp(namespaces: Iterable[str] = PAGE_NAMESPACES) -> Optional[str]:
+    """Versiones de los espacios indicados, o ``None`` sin la tabla."""
+    versions = cache_versions.get_versions()
+    if versions is None:
+        return None
+    return '.'.join(str(versions.get(namespace, 0)) for namespace in namespaces)
+
+
+def versioned_cache_key(*namespaces: str) -> Callable:
+    """
+    ``make_cache_key`` para ``cache.cached`` que incluye las versiones de datos.
+
+    Así una entrada guardada por otro proceso deja de usarse en cuanto cambia la
+    versión, y nunca se sirve un cuerpo viejo con un ETag nuevo.
+    """
+    namespaces = namespaces or PAGE_NAMESPACES
+
+    def make_cache_key(*args, **kwargs) -> str:
+        args_hash = hashlib.md5(
+            urlencode(sorted(request.args.items(multi=True))).encode('utf-8')
+        ).hexdigest()
+        return f'view/{request.path}?{args_hash}@{data_stamp(namespaces) or ""}'
+
+    return make_cache_key
+
+
+def _request_identity() -> str:
+    user = getattr(g, 'resident_api_user', None)
+    if user is None and current_user.is_authenticated:
+        user = current_user
+    if user is None:
+        return 'anonymous'
+    # El token CSRF de la sesión va incrustado en los formularios de la página.
+    csrf_token = session.get('csrf_token') or ''
+    csrf_digest = hashlib.sha1(csrf_token.encode('utf-8')).hexdigest()[:12] if csrf_token else ''
+    return f'{user.id}:{user.role}:{csrf_digest}'
+
+
+def _compute_etag(stamp: str) -> str:
+    parts = [
+        request.full_path,
+        stamp,
+        date.today().isoformat(),
+        _request_identity(),
+        _app_build_id(),
+    ]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _last_modified(namespaces: Iterable[str]) -> Optional[datetime]:
+    updated_at = cache_versions.get_updated_at(*namespaces)
+    if not updated_at:
+        return None
+    try:
+        modified = datetime.strptime(updated_at, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    # Al cambiar el día cambian los vencimientos aunque no haya escrituras.
+    midnight = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(modified, midnight.astimezone(timezone.utc))
+
+
+def _is_not_modified(etag: str, last_modified: Optional[datetime]) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _apply_validators(response, etag: str, last_modified: Optional[datetime]):
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    response.vary.add('Authorization')
+    return response
+
+
+def conditional_get(*namespaces: str) -> Callable:
+    """
+    Responde 304 si el cliente ya tiene la versión vigente de la respuesta.
+
+    Uso (debajo de los controles de acceso y encima de ``cache.cached``):
+        @billing_bp.route('/facturas')
+        @login_required
+        @permission_required('facturacion.view')
+        @conditional_get()
+        @cache.cached(timeout=60, query_string=True, make_cache_key=versioned_cache_key())
+        def invoices():
+            ...
+    """
+    namespaces = namespaces or PAGE_NAMESPACES
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or not current_app.config.get('CONDITIONAL_GET_ENABLED', True)
+                or session.get('_flashes')
+            ):
+                return f(*args, **kwargs)
+
+            stamp = data_stamp(namespaces)
+            if stamp is None:
+                return f(*args, **kwargs)
+
+            etag = _compute_etag(stamp)
+            last_modified = _last_modified(namespaces)
+            if _is_not_modified(etag, last_modified):
+                return _apply_validators(current_app.response_class(status=304), etag, last_modified)
+
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                _apply_validators(response, etag, last_modified)
+            return response
+        return decorated_function
+    return decorator
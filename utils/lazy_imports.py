@@ -0,0 +1,61 @@
+"""
+Lazy Imports
+============
+Carga diferida de dependencias pesadas y opcionales (reportlab, PIL,
+pytesseract, requests, google.generativeai).
+
+``lazy_import`` registra el módulo en ``sys.modules`` sin ejecutarlo; el código
+del módulo corre la primera vez que se accede a uno de sus atributos. Así un
+worker que nunca genera un PDF ni llama a un servicio externo no paga su
+import ni su memoria. Como el objeto registrado es el módulo real, ``import
+invoice_pdf`` en otro sitio (o un ``monkeypatch`` en tests) usa el mismo.
+
+``is_available`` comprueba si un paquete está instalado sin importarlo, para
+las banderas ``HAS_*`` que antes se calculaban con un ``try: import``.
+"""
+
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+
+_lock = threading.Lock()
+
+
+def is_available(name: str) -> bool:
+    """True si ``name`` se puede importar; no ejecuta el módulo."""
+    if name in sys.modules:
+        return sys.modules[name] is not None
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        # find_spec de 'a.b' importa 'a' y falla si el paquete padre no existe
+        return False
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Devuelve el módulo ``name`` sin ejecutarlo hasta su primer uso.
+
+    Lanza ``ModuleNotFoundError`` si el módulo no existe; un error dentro del
+    módulo (p. ej. una dependencia suya que falta) aparece en el primer acceso.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+
+        spec = importlib.util.find_spec(name)
+        if spec is None or spec.loader is None:
+            raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+        return module
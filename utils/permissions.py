@@ -12,6 +12,7 @@ from typing import List, Dict, Optional
 # Añadir el directorio padre al path para importar db
 sys.path.insert(0, str(Path(__file__).parent.parent))
 import db
+from utils.cache_versions import PERMISSIONS, invalidate, memoized
 
 
 def get_conn():
@@ -66,15 +67,20 @@ def get_permissions_by_module() -> Dict[str, List[Dict]]:
     return grouped
 
 
-def get_user_permissions(user_id: int) -> List[str]:
+@memoized(PERMISSIONS)
+def get_user_permission_set(user_id: int) -> frozenset:
     """
-    Obtiene lista de nombres de permisos que tiene un usuario
+    Conjunto de nombres de permisos de un usuario.
+    
+    Se calcula una vez (al iniciar sesión o en la primera verificación) y queda
+    en memoria del proceso hasta que cambia la versión de permisos; cualquier
+    escritura en user_permissions la incrementa.
     
     Args:
         user_id: ID del usuario
         
     Returns:
-        Lista de nombres de permisos (ej: ['apartamentos.view', 'apartamentos.create'])
+        frozenset con los nombres de permisos
     """
     conn = get_conn()
     try:
@@ -85,14 +91,27 @@ def get_user_permissions(user_id: int) -> List[str]:
             INNER JOIN user_permissions up ON p.id = up.permission_id
             WHERE up.user_id = ?
         """, (user_id,))
-        return [row['name'] for row in cur.fetchall()]
+        return frozenset(row['name'] for row in cur.fetchall())
     finally:
         conn.close()
 
 
+def get_user_permissions(user_id: int) -> List[str]:
+    """
+    Obtiene lista de nombres de permisos que tiene un usuario
+    
+    Args:
+        user_id: ID del usuario
+        
+    Returns:
+        Lista de nombres de permisos (ej: ['apartamentos.view', 'apartamentos.create'])
+    """
+    return sorted(get_user_permission_set(user_id))
+
+
 def user_has_permission(user_id: int, permission_name: str) -> bool:
     """
-    Verifica si un usuario tiene un permiso específico
+    Verifica si un usuario tiene un permiso específico (O(1) sobre el conjunto precalculado)
     
     Args:
         user_id: ID del usuario
@@ -101,19 +120,7 @@ def user_has_permission(user_id: int, permission_name: str) -> bool:
     Returns:
         True si tiene el permiso, False si no
     """
-    conn = get_conn()
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT COUNT(*) as count
-            FROM user_permissions up
-            INNER JOIN permissions p ON up.permission_id = p.id
-            WHERE up.user_id = ? AND p.name = ?
-        """, (user_id, permission_name))
-        result_row = cur.fetchone()
-        return dict(result_row)['count'] > 0
-    finally:
-        conn.close()
+    return permission_name in get_user_permission_set(user_id)
 
 
 def grant_permission(user_id: int, permission_name: str, granted_by: int = None) -> bool:
@@ -148,6 +155,7 @@ def grant_permission(user_id: int, permission_name: str, granted_by: int = None)
         """, (user_id, permission_id, granted_by))
         
         conn.commit()
+        invalidate(PERMISSIONS)
         return True
     except Exception as e:
         conn.rollback()
@@ -178,6 +186,7 @@ def revoke_permission(user_id: int, permission_name: str) -> bool:
         """, (user_id, permission_name))
         
         conn.commit()
+        invalidate(PERMISSIONS)
         return True
     except Exception as e:
         conn.rollback()
@@ -210,6 +219,7 @@ def set_user_permissions(user_id: int, permission_names: List[str], granted_by:
             """, (user_id, granted_by, perm_name))
         
         conn.commit()
+        invalidate(PERMISSIONS)
     except Exception as e:
         conn.rollback()
         raise e
@@ -217,6 +227,7 @@ def set_user_permissions(user_id: int, permission_names: List[str], granted_by:
         conn.close()
 
 
+@memoized(PERMISSIONS)
 def get_module_permissions(user_id: int, module: str) -> List[str]:
     """
     Obtiene los permisos de un usuario para un módulo específico
@@ -267,6 +278,7 @@ def revoke_all_permissions(user_id: int):
         cur = conn.cursor()
         cur.execute("DELETE FROM user_permissions WHERE user_id = ?", (user_id,))
         conn.commit()
+        invalidate(PERMISSIONS)
     finally:
         conn.close()
 
@@ -0,0 +1,205 @@
+"""
+Query Profiler
+==============
+Contador de queries SQL por request y log de queries lentas.
+
+Instrumenta los dos caminos de acceso a datos de la aplicación:
+
+- ``db.get_conn()`` / ``db.get_db()``: conexión ``sqlite3`` con cursor envuelto.
+- ``db.session`` (SQLAlchemy): listeners ``before/after_cursor_execute``.
+
+Por cada request acumula cantidad de queries y tiempo total en base de datos,
+registra las queries que superan ``SQL_SLOW_QUERY_MS`` junto a su plan
+(``utils.db_optimizer.explain_query``) y agrega el encabezado ``Server-Timing``
+para que las regresiones N+1 se vean en las herramientas del navegador.
+Fuera de un request (scheduler, scripts) no se registra nada.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from flask import Flask, current_app, g, has_request_context, request
+
+import db
+from utils.db_optimizer import explain_query
+
+_local = threading.local()
+_sqlalchemy_listeners_installed = False
+
+
+# ==========================================
+# REGISTRO POR REQUEST
+# ==========================================
+
+def get_request_query_stats() -> Optional[Dict]:
+    """Estadísticas SQL del request actual (o None fuera de un request instrumentado)."""
+    if not has_request_context():
+        return None
+    return g.get('_sql_stats')
+
+
+def _explain(statement: str, parameters) -> list:
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return []
+    _local.suspended = True
+    try:
+        return [tuple(row) for row in explain_query(statement.strip(), parameters or None, verbose=False)]
+    except ValueError:
+        return []
+    finally:
+        _local.suspended = False
+
+
+def _record(statement: str, parameters, elapsed: float, source: str, explainable: bool = True) -> None:
+    if getattr(_local, 'suspended', False):
+        return
+    stats = get_request_query_stats()
+    if stats is None:
+        return
+
+    elapsed_ms = elapsed * 1000
+    stats['count'] += 1
+    stats['time_ms'] += elapsed_ms
+    stats[source] = stats.get(source, 0) + 1
+
+    if elapsed_ms >= stats['slow_threshold_ms']:
+        plan = _explain(statement, parameters) if explainable else []
+        stats['slow'] += 1
+        current_app.logger.warning(
+            "[SQL lenta] %.1f ms (%s) %s | params=%r | plan=%s",
+            elapsed_ms,
+            source,
+            ' '.join(statement.split()),
+            parameters,
+            plan,
+        )
+
+
+# ==========================================
+# SQLITE3 (db.get_conn)
+# ==========================================
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor que mide cada ``execute``/``executemany``."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record(sql, parameters, time.perf_counter() - start, 'sqlite3')
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record(sql, None, time.perf_counter() - start, 'sqlite3', explainable=False)
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _record(sql_script, None, time.perf_counter() - start, 'sqlite3', explainable=False)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Conexión cuyos cursores (incluidos los de ``conn.execute``) están instrumentados."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# ==========================================
+# SQLALCHEMY (db.session)
+# ==========================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    explainable = not executemany and conn.dialect.name == 'sqlite'
+    _record(statement, parameters, elapsed, 'sqlalchemy', explainable=explainable)
+
+
+def _install_sqlalchemy_listeners() -> None:
+    global _sqlalchemy_listeners_installed
+    if _sqlalchemy_listeners_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _sqlalchemy_listeners_installed = True
+
+
+# ==========================================
+# INTEGRACIÓN CON FLASK
+# ==========================================
+
+def init_query_profiler(app: Flask) -> None:
+    """
+    Activa la instrumentación si ``SQL_PROFILING_ENABLED`` o ``METRICS_ENABLED``
+    están encendidos. El encabezado ``Server-Timing`` solo se emite con el primero.
+    """
+    server_timing = bool(app.config.get('SQL_PROFILING_ENABLED'))
+    if not (server_timing or app.config.get('METRICS_ENABLED')):
+        return
+
+    db.set_connection_factory(ProfiledConnection)
+    _install_sqlalchemy_listeners()
+
+    @app.before_request
+    def _start_query_stats():
+        g._sql_stats = {
+            'count': 0,
+            'time_ms': 0.0,
+            'slow': 0,
+            'slow_threshold_ms': float(app.config.get('SQL_SLOW_QUERY_MS', 100)),
+            'started_at': time.perf_counter(),
+        }
+
+    @app.after_request
+    def _emit_server_timing(response):
+        stats = g.get('_sql_stats')
+        if stats is None:
+            return response
+
+        if server_timing:
+            total_ms = (time.perf_counter() - stats['started_at']) * 1000
+            timing = (
+                f'db;dur={stats["time_ms"]:.1f};desc="{stats["count"]} queries", '
+                f'app;dur={total_ms:.1f}'
+            )
+            existing = response.headers.get('Server-Timing')
+            response.headers['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        query_count_warn = app.config.get('SQL_QUERY_COUNT_WARN', 50)
+        if query_count_warn and stats['count'] >= query_count_warn:
+            app.logger.warning(
+                "[SQL] %s %s ejecutó %s queries (%.1f ms en BD)",
+                request.method,
+                request.path,
+                stats['count'],
+                stats['time_ms'],
+            )
+        return response
+
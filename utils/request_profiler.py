@@ -0,0 +1,246 @@
+"""
+Request Profiler
+================
+Perfilado opcional de requests en producción.
+
+Un request se perfila cuando ``REQUEST_PROFILING_ENABLED`` está encendido y:
+
+- un administrador autenticado envía el encabezado ``X-Profile: 1``
+  (``REQUEST_PROFILING_HEADER``), o
+- el request cae en la muestra aleatoria ``REQUEST_PROFILING_SAMPLE_RATE``.
+
+Se usa ``cProfile`` para las N funciones más costosas y, opcionalmente, un hilo
+que muestrea la pila del request cada ``REQUEST_PROFILING_INTERVAL_MS`` para
+generar un archivo de pilas colapsadas (formato de ``flamegraph.pl`` /
+speedscope). Los perfiles muestreados solo se guardan si el request superó
+``REQUEST_PROFILING_MIN_MS``; los pedidos por encabezado se guardan siempre.
+Cada perfil es un JSON en ``REQUEST_PROFILING_DIR`` y se conservan los
+``REQUEST_PROFILING_KEEP`` más recientes.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from flask import Flask, g, request
+from flask_login import current_user
+
+DEFAULT_PROFILE_DIR = Path(__file__).resolve().parent.parent / 'data' / 'profiles'
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$')
+
+
+# ==========================================
+# MUESTREO DE PILAS
+# ==========================================
+
+class StackSampler(threading.Thread):
+    """Muestrea la pila de un hilo a intervalos fijos y acumula pilas colapsadas."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name='request-profiler-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})')
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self) -> str:
+        self._stop_event.set()
+        self.join(timeout=1)
+        return '\n'.join(f'{stack} {count}' for stack, count in self.samples.most_common())
+
+
+# ==========================================
+# ALMACENAMIENTO
+# ==========================================
+
+def _profile_dir(app: Flask) -> Path:
+    return Path(app.config.get('REQUEST_PROFILING_DIR') or DEFAULT_PROFILE_DIR)
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> List[Dict]:
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (cc, ncalls, tottime, cumtime, _callers) in stats.stats.items():
+        rows.append({
+            'function': function,
+            'file': filename,
+            'line': line,
+            'ncalls': ncalls,
+            'primitive_calls': cc,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda row: row['tottime_ms'], reverse=True)
+    return rows[:limit]
+
+
+def _prune(directory: Path, keep: int) -> None:
+    profiles = sorted(directory.glob('*.json'), reverse=True)
+    for path in profiles[keep:]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.collapsed').unlink(missing_ok=True)
+
+
+def list_profiles(app: Flask, limit: int = 50) -> List[Dict]:
+    """Resúmenes de los perfiles guardados, más recientes primero."""
+    directory = _profile_dir(app)
+    if not directory.exists():
+        return []
+    summaries = []
+    for path in sorted(directory.glob('*.json'), reverse=True)[:limit]:
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        data.pop('top_functions', None)
+        summaries.append(data)
+    return summaries
+
+
+def load_profile(app: Flask, profile_id: str) -> Optional[Dict]:
+    if not PROFILE_ID_PATTERN.match(profile_id or ''):
+        return None
+    path = _profile_dir(app) / f'{profile_id}.json'
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def get_collapsed_path(app: Flask, profile_id: str) -> Optional[Path]:
+    if not PROFILE_ID_PATTERN.match(profile_id or ''):
+        return None
+    path = _profile_dir(app) / f'{profile_id}.collapsed'
+    return path if path.exists() else None
+
+
+# ==========================================
+# INTEGRACIÓN CON FLASK
+# ==========================================
+
+def _requested_by_admin(app: Flask) -> bool:
+    header = app.config.get('REQUEST_PROFILING_HEADER', 'X-Profile')
+    if request.headers.get(header, '').strip().lower() not in {'1', 'true', 'yes', 'on'}:
+        return False
+    return current_user.is_authenticated and current_user.is_admin()
+
+
+def init_request_profiler(app: Flask) -> None:
+    """
+    Registra los hooks. ``REQUEST_PROFILING_ENABLED`` se consulta en cada request,
+    así que el perfilado se puede encender sin reiniciar la aplicación.
+    """
+
+    @app.before_request
+    def _start_request_profile():
+        if not app.config.get('REQUEST_PROFILING_ENABLED') or request.endpoint == 'static':
+            return
+        if _requested_by_admin(app):
+            trigger = 'header'
+        elif random.random() < float(app.config.get('REQUEST_PROFILING_SAMPLE_RATE', 0) or 0):
+            trigger = 'sample'
+        else:
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Otro perfilador ya está activo en este hilo.
+            return
+
+        sampler = None
+        if app.config.get('REQUEST_PROFILING_COLLAPSED', True):
+            interval_ms = float(app.config.get('REQUEST_PROFILING_INTERVAL_MS', 5))
+            sampler = StackSampler(threading.get_ident(), interval_ms / 1000)
+            sampler.start()
+
+        g._request_profile = {
+            'profiler': profiler,
+            'sampler': sampler,
+            'trigger': trigger,
+            'started_at': time.perf_counter(),
+        }
+
+    @app.after_request
+    def _finish_request_profile(response):
+        state = g.pop('_request_profile', None)
+        if state is None:
+            return response
+
+        state['profiler'].disable()
+        collapsed = state['sampler'].stop() if state['sampler'] else ''
+        duration_ms = (time.perf_counter() - state['started_at']) * 1000
+        if state['trigger'] == 'sample' and duration_ms < float(app.config.get('REQUEST_PROFILING_MIN_MS', 500)):
+            return response
+
+        try:
+            profile_id = _store_profile(app, state, response, duration_ms, collapsed)
+        except OSError as exc:
+            app.logger.warning('No se pudo guardar el perfil del request: %s', exc)
+            return response
+        if state['trigger'] == 'header':
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def _abort_request_profile(_exc=None):
+        # Si el request terminó en excepción, after_request no corre: detener igual.
+        state = g.pop('_request_profile', None)
+        if state is not None:
+            state['profiler'].disable()
+            if state['sampler']:
+                state['sampler'].stop()
+
+
+def _store_profile(app: Flask, state: Dict, response, duration_ms: float, collapsed: str) -> str:
+    directory = _profile_dir(app)
+    directory.mkdir(parents=True, exist_ok=True)
+    now = datetime.now()
+    profile_id = f"{now.strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(4)}"
+
+    sql_stats = g.get('_sql_stats') or {}
+    data = {
+        'id': profile_id,
+        'created_at': now.strftime('%Y-%m-%d %H:%M:%S'),
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'endpoint': request.endpoint,
+        'status_code': response.status_code,
+        'duration_ms': round(duration_ms, 1),
+        'trigger': state['trigger'],
+        'user': current_user.username if current_user.is_authenticated else None,
+        'pid': os.getpid(),
+        'sql_queries': sql_stats.get('count'),
+        'sql_time_ms': round(sql_stats['time_ms'], 1) if sql_stats else None,
+        'has_collapsed': bool(collapsed),
+        'top_functions': _top_functions(state['profiler'], int(app.config.get('REQUEST_PROFILING_TOP_N', 30))),
+    }
+    (directory / f'{profile_id}.json').write_text(json.dumps(data), encoding='utf-8')
+    if collapsed:
+        (directory / f'{profile_id}.collapsed').write_text(collapsed + '\n', encoding='utf-8')
+    _prune(directory, int(app.config.get('REQUEST_PROFILING_KEEP', 50)))
+    return profile_id
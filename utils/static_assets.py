@@ -0,0 +1,87 @@
+"""
+Static Assets
+=============
+Sirve las copias con huella (fingerprint) de ``static/dist`` que genera
+``scripts/build_static.py``.
+
+- ``url_for('static', filename='css/app.css')`` apunta a la copia con huella si
+  existe en el manifiesto; sin build se usan los archivos originales.
+- Las copias con huella son inmutables: se sirven con cache de un año y, si el
+  cliente lo acepta, en su variante precomprimida (``.br`` / ``.gz``).
+"""
+
+import json
+import mimetypes
+import os
+from typing import Dict
+
+from flask import Flask, request, send_from_directory
+
+DIST_DIRNAME = 'dist'
+MANIFEST_FILENAME = 'assets-manifest.json'
+PRECACHE_FILENAME = 'sw-precache.js'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+# Generados por el build pero sin huella: se revalidan como cualquier estático.
+_MUTABLE_DIST_FILES = {f'{DIST_DIRNAME}/{MANIFEST_FILENAME}', f'{DIST_DIRNAME}/{PRECACHE_FILENAME}'}
+
+
+def load_manifest(static_folder: str) -> Dict[str, str]:
+    """Mapa ``ruta lógica -> ruta con huella`` (relativas a ``static``)."""
+    path = os.path.join(static_folder, DIST_DIRNAME, MANIFEST_FILENAME)
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle).get('files', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def reload_manifest(app: Flask) -> Dict[str, str]:
+    manifest = load_manifest(app.static_folder) if app.config.get('STATIC_FINGERPRINTS_ENABLED', True) else {}
+    app.extensions['static_assets'] = manifest
+    return manifest
+
+
+def _send_fingerprinted(app: Flask, filename: str):
+    static_folder = app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding, variant = None, filename
+    for candidate in ('br', 'gzip'):
+        compressed = filename + _ENCODING_SUFFIXES[candidate]
+        if request.accept_encodings[candidate] and os.path.isfile(os.path.join(static_folder, compressed)):
+            encoding, variant = candidate, compressed
+            break
+
+    response = send_from_directory(static_folder, variant, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+
+def init_static_assets(app: Flask) -> None:
+    """Registra la resolución de nombres con huella y la vista de ``static/dist``."""
+    if not app.static_folder or 'static' not in app.view_functions:
+        return
+    reload_manifest(app)
+
+    @app.url_defaults
+    def _fingerprinted_static_url(endpoint, values):
+        if endpoint != 'static':
+            return
+        filename = values.get('filename')
+        fingerprinted = app.extensions.get('static_assets', {}).get(filename)
+        if fingerprinted:
+            values['filename'] = fingerprinted
+
+    original_view = app.view_functions['static']
+
+    def static(filename):
+        if filename.startswith(f'{DIST_DIRNAME}/') and filename not in _MUTABLE_DIST_FILES \
+                and not filename.endswith(('.gz', '.br')):
+            return _send_fingerprinted(app, filename)
+        return original_view(filename=filename)
+
+    app.view_functions['static'] = static
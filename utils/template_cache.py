@@ -0,0 +1,52 @@
+"""
+Template Cache
+==============
+Cache de bytecode de Jinja en disco y versiones de datos para fragmentos.
+
+- El bytecode compilado de cada plantilla se guarda en
+  ``JINJA_BYTECODE_CACHE_DIR``; un worker nuevo lo carga en lugar de volver a
+  compilar. Jinja lo descarta solo si cambia el fuente de la plantilla.
+- ``data_version(*espacios)`` (global de plantillas) devuelve las versiones de
+  ``cache_versions`` para usarlas como clave del tag ``{% cache %}`` de
+  Flask-Caching. Un fragmento guardado se reutiliza hasta que una escritura
+  cambia la versión, en cualquier proceso::
+
+      {% set version = data_version('customization') %}
+      {% if version %}
+          {% cache None, 'sidebar_menu', request.endpoint|string, version %}...{% endcache %}
+      {% else %}
+          ...
+      {% endif %}
+
+  Sin la tabla de versiones devuelve ``None`` y la plantilla renderiza sin
+  ``{% cache %}``: guardar fragmentos que nunca se leen solo llenaría el cache.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from flask import Flask
+from jinja2 import FileSystemBytecodeCache
+
+from utils.http_cache import data_stamp
+
+DEFAULT_BYTECODE_CACHE_DIR = Path(__file__).resolve().parent.parent / 'data' / 'jinja_cache'
+
+
+def data_version(*namespaces: str) -> Optional[str]:
+    """Clave de fragmento con las versiones de los espacios indicados, o ``None``."""
+    return data_stamp(namespaces)
+
+
+def init_template_cache(app: Flask) -> None:
+    """Activa el cache de bytecode y registra ``data_version`` en las plantillas."""
+    if app.config.get('JINJA_BYTECODE_CACHE_ENABLED', True):
+        directory = Path(app.config.get('JINJA_BYTECODE_CACHE_DIR') or DEFAULT_BYTECODE_CACHE_DIR)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+        except OSError as exc:
+            app.logger.warning('Cache de bytecode de Jinja desactivado (%s): %s', directory, exc)
+        else:
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(str(directory))
+
+    app.add_template_global(data_version, 'data_version')